@@ -0,0 +1,120 @@
+import os
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, Iterable, List, Tuple
+
+from api.source import spool_to_disk
+
+# Ingesta por lotes: varias subidas, cada una un PDF o un ZIP con PDFs. Cada
+# subida se copia a disco por bloques; de los ZIP se extrae un miembro a la
+# vez, también por bloques (se descomprime en flujo), de modo que ni el
+# archivo ni sus miembros se cargan completos en memoria. Los límites de
+# cantidad y de tamaño descomprimido protegen contra ZIP maliciosos.
+
+BATCH_MAX_FILES = int(os.environ.get("SCANER_BATCH_MAX_FILES", "500"))  # PDFs por lote
+BATCH_MAX_BYTES = 2 * 1024 * 1024 * 1024  # Tamaño total de los PDFs del lote (igual que una subida)
+
+PDF_MAGIC = b"%PDF"
+SKIPPED_PREFIXES = ("__MACOSX/",)  # Metadatos que agregan algunos compresores
+
+# Miembro del lote listo para extraer: (ruta en disco, nombre, sha256)
+BatchMember = Tuple[str, str, str]
+
+
+class BatchError(ValueError):
+    """El lote no se puede aceptar (vacío, demasiado grande o con demasiados archivos)"""
+
+
+class _LimitedReader:
+    """Stream que falla si se leen más de ``limit`` bytes (el tamaño de un ZIP puede mentir)"""
+
+    def __init__(self, stream: BinaryIO, limit: int):
+        self.stream = stream
+        self.remaining = limit
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.stream.read(size)
+        self.remaining -= len(chunk)
+        if self.remaining < 0:
+            raise BatchError(f"El lote supera el máximo de {BATCH_MAX_BYTES // 2**20} MB descomprimidos")
+        return chunk
+
+
+def _is_pdf(path: str) -> bool:
+    with open(path, "rb") as fh:
+        return fh.read(len(PDF_MAGIC)) == PDF_MAGIC
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def spool_batch(uploads: Iterable[Tuple[str, BinaryIO]]) -> Tuple[List[BatchMember], List[Dict[str, str]]]:
+    """Copia a disco los PDFs del lote: los subidos directamente y los de cada ZIP.
+
+    Devuelve los miembros aceptados, en orden de subida, y los rechazados
+    como {"archivo", "error"}. El llamador borra los archivos aceptados;
+    ante un BatchError se borran aquí.
+    """
+    members: List[BatchMember] = []
+    rejected: List[Dict[str, str]] = []
+    budget = BATCH_MAX_BYTES
+
+    def accept(path: str, size: int, digest: str, name: str) -> bool:
+        """Agrega el archivo copiado si es un PDF; devuelve si se conserva"""
+        nonlocal budget
+        if not _is_pdf(path):
+            rejected.append({"archivo": name, "error": "No es un archivo PDF"})
+            return False
+        if len(members) >= BATCH_MAX_FILES:
+            raise BatchError(f"El lote supera el máximo de {BATCH_MAX_FILES} archivos PDF")
+        budget -= size
+        if budget < 0:
+            raise BatchError(f"El lote supera el máximo de {BATCH_MAX_BYTES // 2**20} MB descomprimidos")
+        members.append((path, name, digest))
+        return True
+
+    try:
+        for name, stream in uploads:
+            path, size, digest = spool_to_disk(stream)
+            keep = False
+            try:
+                if zipfile.is_zipfile(path) and not _is_pdf(path):
+                    with zipfile.ZipFile(path) as archive:
+                        for info in archive.infolist():
+                            if info.is_dir() or info.filename.startswith(SKIPPED_PREFIXES):
+                                continue
+                            member_name = f"{name}/{info.filename}"
+                            if not info.filename.lower().endswith(".pdf"):
+                                rejected.append({"archivo": member_name, "error": "No es un archivo PDF"})
+                                continue
+                            try:
+                                # Se descomprime en flujo hacia disco, sin pasar del presupuesto restante
+                                with archive.open(info) as member:
+                                    member_path, member_size, member_digest = spool_to_disk(
+                                        _LimitedReader(member, budget))
+                            except (zipfile.BadZipFile, zlib.error, NotImplementedError, RuntimeError) as e:
+                                # Miembro dañado, cifrado o con compresión no soportada
+                                rejected.append({"archivo": member_name, "error": f"No se pudo extraer: {e}"})
+                                continue
+                            try:
+                                kept = accept(member_path, member_size, member_digest, member_name)
+                            except BaseException:
+                                _remove(member_path)  # Aún no está en ``members``
+                                raise
+                            if not kept:
+                                _remove(member_path)
+                else:
+                    keep = accept(path, size, digest, name)
+            finally:
+                if not keep:
+                    _remove(path)
+    except BaseException:
+        for path, _, _ in members:
+            _remove(path)
+        raise
+
+    return members, rejected
@@ -0,0 +1,214 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from api import __version__
+
+# Caché de resultados direccionada por contenido (SHA-256 del PDF subido)
+CACHE_DIR = os.environ.get("SCANER_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "scaner-cache")
+CACHE_MAX_BYTES = int(os.environ.get("SCANER_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))  # 0 = desactivada
+# Días sin uso tras los cuales se borra el directorio de otra versión del extractor
+STALE_VERSION_DAYS = float(os.environ.get("SCANER_CACHE_STALE_DAYS", "7"))
+
+
+def _extractor_version() -> str:
+    """Versión del extractor: cambia con la versión del paquete o con cualquier cambio en su código"""
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(package_dir, name), "rb") as fh:
+                digest.update(name.encode())
+                digest.update(fh.read())
+    return f"{__version__}-{digest.hexdigest()[:12]}"
+
+
+EXTRACTOR_VERSION = _extractor_version()
+
+# Archivos de la caché: <sha256>.json.gz (resultado) y <sha256>.<ext> (exportaciones)
+_ENTRY_RE = re.compile(r"^[0-9a-f]{64}\.")
+# Directorios de versión creados por esta caché: <versión del paquete>-<hash del código>
+_VERSION_DIR_RE = re.compile(r"^\d+(?:\.\d+)*-[0-9a-f]{12}$")
+
+
+def _last_used(path: str) -> float:
+    """Último uso de un directorio de versión: la fecha más reciente entre él y sus archivos"""
+    latest = os.stat(path).st_mtime
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                latest = max(latest, entry.stat(follow_symlinks=False).st_mtime)
+            except OSError:
+                pass
+    return latest
+
+
+class ResultCache:
+    """Almacén en disco de resultados por hash del PDF y versión del extractor.
+
+    Cada entrada es un JSON comprimido en ``<dir>/<versión>/<sha256>.json.gz``,
+    acompañado de los archivos exportados a partir de él (``<sha256>.xlsx``).
+    La fecha de modificación marca el último uso, y al superar ``max_bytes`` se
+    eliminan los archivos menos usados recientemente. Cada versión del
+    extractor usa su propio directorio, lo que invalida la caché cuando cambia
+    el código de extracción. Al iniciar se borran solo los directorios de otras
+    versiones sin uso en STALE_VERSION_DAYS: otra instancia con una versión
+    distinta puede compartir el directorio, y nada que no haya creado la
+    caché se toca.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 version: str = EXTRACTOR_VERSION):
+        self.max_bytes = max_bytes
+        self.version = version
+        self.directory = os.path.join(directory, version)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._remove_stale_versions(directory)
+
+    def _remove_stale_versions(self, directory: str) -> None:
+        """Borra los directorios de otras versiones del extractor que llevan STALE_VERSION_DAYS sin uso"""
+        limit = time.time() - STALE_VERSION_DAYS * 86400
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if (name == self.version or not _VERSION_DIR_RE.match(name)
+                    or os.path.islink(path) or not os.path.isdir(path)):
+                continue
+            try:
+                stale = _last_used(path) < limit
+            except OSError:
+                continue
+            if stale:
+                shutil.rmtree(path, ignore_errors=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, digest: str, extension: str = "json.gz") -> str:
+        return os.path.join(self.directory, f"{digest}.{extension}")
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """Devuelve el resultado guardado para el hash o None"""
+        if not self.enabled:
+            return None
+
+        path = self._path(digest)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                payload = json.load(fh)
+            os.utime(path)  # Marcar como usado recientemente (LRU)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return payload
+
+    def put(self, digest: str, payload: Dict) -> None:
+        """Guarda el resultado de forma atómica y aplica el límite de tamaño"""
+        if not self.enabled:
+            return
+
+        path = self._path(digest)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) as fh:
+                fh.write(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"No se pudo guardar en caché {digest[:12]}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._evict()
+
+    def get_file(self, digest: str, extension: str) -> Optional[str]:
+        """Ruta de un archivo exportado para el hash, o None si no existe"""
+        if not self.enabled:
+            return None
+
+        path = self._path(digest, extension)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put_file(self, digest: str, extension: str, chunks: Iterable[bytes]) -> Optional[str]:
+        """Guarda (de forma atómica) un archivo exportado generado por bloques"""
+        if not self.enabled:
+            return None
+
+        path = self._path(digest, extension)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        self._evict(keep=path)
+        return path
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not _ENTRY_RE.match(name):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if keep and os.path.join(self.directory, name) == keep:
+                    continue
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                    total -= size
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict:
+        entries = self._entries() if self.enabled else []
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": sum(1 for _, _, name in entries if name.endswith(".json.gz")),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,106 @@
+import re
+from typing import List
+
+from pdfminer.pdfdevice import PDFDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter
+
+# Pre-clasificador de páginas: decide si una página es un reporte de muestra
+# leyendo solo el texto de su content stream (sin posiciones ni layout), que
+# cuesta una fracción de page.extract_text().
+
+PAGE_REPORT = "reporte"          # Reporte de muestra: pasa al análisis completo
+PAGE_OTHER = "otra"              # Portada, anexo, metodología...: se descarta
+PAGE_UNKNOWN = "desconocida"     # Texto no decodificable: se usa el filtro completo
+
+# Anclas comparadas sin espacios ni distinción de mayúsculas (los fragmentos
+# de texto del content stream no siempre separan palabras)
+REPORT_ANCHOR = "DATOSYCONDICIONES"
+SECTION_ANCHORS = ("FERTILIDADDELSUELO", "MICRONUTRIENTES", "RELACIONESENTRECATIONES")
+
+MIN_DECODED_RATIO = 0.5  # Por debajo, el texto rápido no es confiable
+CHECK_EVERY_GLYPHS = 64  # Frecuencia con la que se buscan las anclas durante la lectura
+
+_WS_RE = re.compile(r"\s+")
+
+
+class _ReportFound(Exception):
+    """Las anclas ya aparecieron: no hace falta leer el resto de la página"""
+
+
+class _TextOnlyDevice(PDFDevice):
+    """Dispositivo que solo acumula el texto Unicode de los operadores de texto.
+
+    Con ``stop_on_report`` interrumpe la lectura en cuanto el texto acumulado
+    contiene las anclas de un reporte de muestra.
+    """
+
+    def __init__(self, rsrcmgr, stop_on_report: bool = False):
+        super().__init__(rsrcmgr)
+        self.parts: List[str] = []
+        self.glyphs = 0
+        self.undecoded = 0
+        self.stop_on_report = stop_on_report
+        self._next_check = CHECK_EVERY_GLYPHS
+
+    def text(self) -> str:
+        return _WS_RE.sub("", "".join(self.parts)).upper()
+
+    def render_string(self, textstate, seq, ncs, graphicstate) -> None:
+        font = textstate.font
+        if font is None:
+            return
+        for obj in seq:
+            if not isinstance(obj, bytes):
+                continue
+            for cid in font.decode(obj):
+                self.glyphs += 1
+                try:
+                    self.parts.append(font.to_unichr(cid))
+                except PDFUnicodeNotDefined:
+                    self.undecoded += 1
+
+        if self.stop_on_report and self.glyphs >= self._next_check:
+            self._next_check = self.glyphs + CHECK_EVERY_GLYPHS
+            if self.decodable() and is_report_text(self.text()):
+                raise _ReportFound()
+
+    def decodable(self) -> bool:
+        return bool(self.glyphs) and (self.glyphs - self.undecoded) / self.glyphs >= MIN_DECODED_RATIO
+
+
+def is_report_text(text: str) -> bool:
+    """Anclas de un reporte de muestra en el texto normalizado"""
+    return REPORT_ANCHOR in text and any(anchor in text for anchor in SECTION_ANCHORS)
+
+
+def _read_page(page, stop_on_report: bool = False) -> _TextOnlyDevice:
+    device = _TextOnlyDevice(page.pdf.rsrcmgr, stop_on_report)
+    try:
+        PDFPageInterpreter(page.pdf.rsrcmgr, device).process_page(page.page_obj)
+    except _ReportFound:
+        pass
+    return device
+
+
+def quick_page_text(page) -> str:
+    """Texto de la página en orden del content stream, sin espacios y en mayúsculas.
+
+    Devuelve "" si la página no tiene texto decodificable (escaneos, fuentes
+    sin ToUnicode).
+    """
+    device = _read_page(page)
+    return device.text() if device.decodable() else ""
+
+
+def classify_page(page) -> str:
+    """PAGE_REPORT, PAGE_OTHER o PAGE_UNKNOWN a partir del texto rápido"""
+    try:
+        device = _read_page(page, stop_on_report=True)
+    except Exception as e:
+        print(f"Clasificador: no se pudo leer la página {page.page_number}: {e}")
+        return PAGE_UNKNOWN
+
+    if not device.decodable():
+        return PAGE_UNKNOWN
+    return PAGE_REPORT if is_report_text(device.text()) else PAGE_OTHER
@@ -0,0 +1,98 @@
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Plazos de una extracción: un tiempo máximo por página y un plazo total para
+# toda la petición, más la cancelación explícita (p. ej. cuando el cliente se
+# desconecta). Al vencer el plazo o cancelarse, la extracción se detiene y
+# devuelve los registros obtenidos hasta ese momento; las páginas que
+# superan su tiempo se omiten y se informan aparte.
+#
+# En los workers del pool de procesos el tiempo por página se aplica con
+# SIGALRM (interrumpe el análisis en Python); si el worker no responde, el
+# proceso principal lo detecta por su latido y recicla el pool. Un hilo no
+# se puede detener: en modo hilos la página se abandona y su resultado se
+# descarta.
+
+PAGE_TIMEOUT = float(os.environ.get("SCANER_PAGE_TIMEOUT", "30"))         # Segundos por página; 0 = sin límite
+REQUEST_TIMEOUT = float(os.environ.get("SCANER_REQUEST_TIMEOUT", "3600"))  # Segundos por extracción; 0 = sin límite
+KILL_GRACE = 5.0     # Segundos extra antes de reciclar un worker que no atendió SIGALRM
+POLL_INTERVAL = 0.5  # Segundos entre revisiones de plazos y cancelación durante una espera
+
+STOP_DEADLINE = "deadline"
+STOP_CANCELLED = "cancelled"
+
+
+class PageTimeout(BaseException):
+    """La página superó su tiempo.
+
+    Hereda de BaseException para atravesar los ``except Exception`` de los
+    extractores, que de otro modo la tratarían como un error de la página.
+    """
+
+
+def _raise_timeout(signum, frame):
+    raise PageTimeout()
+
+
+@contextmanager
+def page_deadline(seconds: float) -> Iterator[None]:
+    """Lanza PageTimeout si el bloque dura más de ``seconds``.
+
+    Usa SIGALRM, por lo que solo tiene efecto en el hilo principal de un
+    proceso (los workers del pool); en otro caso el bloque corre sin límite.
+    """
+    if (seconds <= 0 or not hasattr(signal, "setitimer")
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class ExtractionLimits:
+    """Tiempo por página, plazo total y cancelación de una extracción.
+
+    Sin valores se usan SCANER_PAGE_TIMEOUT y SCANER_REQUEST_TIMEOUT; 0 = sin límite.
+    """
+
+    def __init__(self, page_timeout: Optional[float] = None, timeout: Optional[float] = None,
+                 cancel: Optional[threading.Event] = None):
+        self.page_timeout = PAGE_TIMEOUT if page_timeout is None else page_timeout
+        timeout = REQUEST_TIMEOUT if timeout is None else timeout
+        self.expires_at = time.monotonic() + timeout if timeout > 0 else None
+        self.cancel_event = cancel if cancel is not None else threading.Event()
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    def remaining(self) -> Optional[float]:
+        """Segundos hasta el plazo total (None si no hay plazo)"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def stop_reason(self) -> Optional[str]:
+        """Motivo para detener la extracción, o None si puede continuar"""
+        if self.cancel_event.is_set():
+            return STOP_CANCELLED
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            return STOP_DEADLINE
+        return None
+
+    def wait_interval(self) -> float:
+        """Espera máxima antes de volver a revisar plazos y cancelación"""
+        remaining = self.remaining()
+        return POLL_INTERVAL if remaining is None else min(POLL_INTERVAL, remaining)
+
+    def page_expired(self, started: float, grace: float = 0.0) -> bool:
+        """Si una página iniciada en ``started`` (time.monotonic) superó su tiempo"""
+        return self.page_timeout > 0 and time.monotonic() - started > self.page_timeout + grace
@@ -0,0 +1,271 @@
+import csv
+import importlib.util
+import io
+import json
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from api.records import NUMERIC_FIELDS, SENTINELS, SOURCE_KEY, RecordStore
+from api.xlsx import iter_xlsx
+
+# Exportación de registros en streaming (el archivo no se arma en memoria):
+# Excel con el formato del ejemplo, y CSV, NDJSON y Parquet con valores
+# tipados para herramientas de GIS y estadística
+
+EXCEL_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_MIMETYPE = 'text/csv'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+SHEET_TITLE = "Analisis_Suelo_INIFAP"
+ROWS_PER_FLUSH = 1000  # Filas de CSV/NDJSON acumuladas antes de entregar un bloque
+
+# MAPEO DE COLUMNAS EN EL ORDEN CORRECTO (según tu ejemplo)
+COLUMN_MAPPING: List[Tuple[str, str]] = [
+    ('municipio', 'MUNICIPIO'),
+    ('localidad', 'LOCALIDAD'),
+    ('nombre_productor', 'NOMBRE DEL PRODUCTOR'),
+    ('cultivo_establecer', 'CULTIVO ANTERIOR'),
+    ('arcilla', 'ARCILLA'),
+    ('limo', 'LIMO'),
+    ('arena', 'ARENA'),
+    ('textura', 'TEXTURA'),
+    ('densidad_aparente', 'DA.'),
+    ('ph_agua', 'PH'),
+    ('mo', 'MO.'),
+    ('fosforo', 'FOSFORO'),
+    ('nitrogeno', 'N.INORGANICO'),
+    ('potasio', 'K'),
+    ('magnesio', 'MG'),
+    ('calcio', 'CA'),
+    ('sodio', 'NA'),
+    ('azufre', 'AL'),  # Nota: en tu ejemplo parece ser AL, ajustar según necesidad
+    ('conductividad_electrica', 'CIC'),
+    ('capacidad_campo', 'CIC CALCULADA'),  # Mapear según disponibilidad
+    ('punto_marchitez', 'H'),  # Mapear según disponibilidad
+    ('azufre', 'AZUFRE'),
+    ('hierro', 'HIERRO'),
+    ('cobre', 'COBRE'),
+    ('zinc', 'ZINC'),
+    ('manganeso', 'MANGANESO'),
+    ('boro', 'BORO'),
+    ('', 'Columna1'),  # Columnas vacías del ejemplo
+    ('', 'Columna2'),
+    ('rel_ca_mg', 'CA/MG'),
+    ('rel_mg_k', 'MG/K'),
+    ('rel_ca_k', 'CA/K'),
+    ('rel_ca_mg_k', '(CA₊MG)/K'),
+    ('rel_k_mg', 'K/MG')
+]
+
+# Columna inicial con el PDF de origen, solo cuando los registros vienen de varios archivos
+SOURCE_COLUMN: Tuple[str, str] = (SOURCE_KEY, 'ARCHIVO')
+
+MISSING_VALUES = frozenset(['No encontrado', 'No analizado', ''])
+WIDTH_SAMPLE_ROWS = 50  # Filas usadas para estimar el ancho de las columnas
+SORT_KEY = 'nombre_productor'
+
+# Valor de una celda: número (columnas numéricas) o texto
+Cell = Union[float, str]
+
+
+def as_store(records: Union[RecordStore, Iterable[Dict[str, str]]]) -> RecordStore:
+    """Los registros recibidos como dicts (p. ej. desde el cliente) pasan al almacén"""
+    return records if isinstance(records, RecordStore) else RecordStore(records)
+
+
+def sorted_rows(store: RecordStore) -> List[int]:
+    """ORDENAR ALFABÉTICAMENTE POR NOMBRE DEL PRODUCTOR"""
+    return store.order_by(SORT_KEY)
+
+
+def _text_cell(value: Optional[str]) -> str:
+    if value is None or (isinstance(value, str) and value in MISSING_VALUES):
+        return 'N/A'
+    return str(value).strip()
+
+
+def column_mapping(store: RecordStore) -> List[Tuple[str, str]]:
+    """COLUMN_MAPPING, precedido de la columna ARCHIVO si algún registro tiene archivo de origen"""
+    if any(value is not None for value in store.column(SOURCE_KEY)):
+        return [SOURCE_COLUMN] + COLUMN_MAPPING
+    return COLUMN_MAPPING
+
+
+def _export_columns(store: RecordStore,
+                    mapping: Sequence[Tuple[str, str]]) -> List[Optional[Tuple[Optional[List[float]], List[Optional[str]]]]]:
+    """(floats o None, textos) de cada columna de ``mapping``; None en las vacías"""
+    columns = []
+    for key, _ in mapping:
+        # Manejar columnas vacías
+        if key == '':
+            columns.append(None)
+            continue
+        numbers = store.numbers(key) if key in NUMERIC_FIELDS else None
+        if numbers is not None:
+            numbers = numbers.tolist() if hasattr(numbers, 'tolist') else list(numbers)
+        columns.append((numbers, store.column(key)))
+    return columns
+
+
+def _rows(columns, order: Iterable[int]) -> Iterator[List[Cell]]:
+    for row in order:
+        cells: List[Cell] = []
+        for column in columns:
+            if column is None:
+                cells.append('')
+                continue
+            numbers, texts = column
+            if numbers is not None and numbers[row] == numbers[row]:  # no es NaN
+                cells.append(numbers[row])
+            else:
+                cells.append(_text_cell(texts[row]))
+        yield cells
+
+
+def iter_rows(store: RecordStore, order: Optional[Sequence[int]] = None) -> Iterator[List[Cell]]:
+    """Filas en el orden de column_mapping(store).
+
+    Las columnas numéricas salen como float (unidades y coma decimal ya
+    resueltas por columna en el almacén); si el valor no es numérico se
+    conserva su texto, con 'N/A' para los faltantes.
+    """
+    return _rows(_export_columns(store, column_mapping(store)), order if order is not None else range(len(store)))
+
+
+def _cell_text(value: Cell) -> str:
+    return repr(value) if isinstance(value, float) else value
+
+
+def column_widths(rows: Iterable[List[Cell]], mapping: Sequence[Tuple[str, str]] = COLUMN_MAPPING) -> List[int]:
+    """Ancho de cada columna a partir del encabezado y de las filas dadas"""
+    lengths = [len(header) for _, header in mapping]
+    for row in rows:
+        for idx, value in enumerate(row):
+            length = len(_cell_text(value)) if value != '' else 0
+            if length > lengths[idx]:
+                lengths[idx] = length
+    # Establecer ancho con límites razonables
+    return [max(10, min(length + 3, 35)) for length in lengths]
+
+
+def iter_excel(records: Union[RecordStore, Iterable[Dict[str, str]]]) -> Iterator[bytes]:
+    """Genera por bloques el XLSX de los registros, ordenados por productor.
+
+    Los valores numéricos se escriben como celdas numéricas; los anchos de
+    columna se calculan con una muestra de las filas antes de empezar.
+    """
+    store = as_store(records)
+    order = sorted_rows(store)
+    mapping = column_mapping(store)
+    columns = _export_columns(store, mapping)
+    widths = column_widths(_rows(columns, order[:WIDTH_SAMPLE_ROWS]), mapping)
+    return iter_xlsx(_rows(columns, order), [header for _, header in mapping], SHEET_TITLE, widths)
+
+
+# Formatos tipados: número o None en las columnas numéricas, texto o None en
+# las demás (los valores faltantes y los marcadores "No encontrado", "N/A",
+# etc. quedan como nulos)
+TypedCell = Union[float, str, None]
+
+
+class ExportUnavailable(Exception):
+    """El formato pedido necesita una dependencia opcional que no está instalada"""
+
+
+def _typed_rows(columns, order: Iterable[int]) -> Iterator[List[TypedCell]]:
+    for row in order:
+        cells: List[TypedCell] = []
+        for column in columns:
+            if column is None:
+                cells.append(None)
+                continue
+            numbers, texts = column
+            if numbers is not None:
+                value = numbers[row]
+                cells.append(value if value == value else None)
+                continue
+            text = texts[row]
+            cells.append(None if text is None or text in SENTINELS or text == '' else text.strip())
+        yield cells
+
+
+def _typed_table(records: Union[RecordStore, Iterable[Dict[str, str]]],
+                 with_blank_columns: bool) -> Tuple[List[str], Iterator[List[TypedCell]]]:
+    """Encabezados y filas tipadas, ordenadas por productor"""
+    store = as_store(records)
+    mapping = column_mapping(store)
+    columns = _export_columns(store, mapping)
+    headers = [header for _, header in mapping]
+    if not with_blank_columns:
+        keep = [idx for idx, (key, _) in enumerate(mapping) if key]
+        headers = [headers[idx] for idx in keep]
+        columns = [columns[idx] for idx in keep]
+    return headers, _typed_rows(columns, sorted_rows(store))
+
+
+def iter_csv(records: Union[RecordStore, Iterable[Dict[str, str]]]) -> Iterator[bytes]:
+    """CSV por bloques con las mismas columnas que el Excel (nulos como celdas vacías)"""
+    headers, rows = _typed_table(records, with_blank_columns=True)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(headers)
+    for count, row in enumerate(rows, 1):
+        writer.writerow('' if value is None else repr(value) if isinstance(value, float) else value
+                        for value in row)
+        if count % ROWS_PER_FLUSH == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(records: Union[RecordStore, Iterable[Dict[str, str]]]) -> Iterator[bytes]:
+    """Un objeto JSON por línea con los encabezados de COLUMN_MAPPING como claves"""
+    headers, rows = _typed_table(records, with_blank_columns=False)
+    lines: List[str] = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(headers, row)), ensure_ascii=False))
+        if len(lines) >= ROWS_PER_FLUSH:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def iter_parquet(records: Union[RecordStore, Iterable[Dict[str, str]]]) -> Iterator[bytes]:
+    """Parquet columnar (float64 en las columnas numéricas) con pandas y pyarrow.
+
+    El formato no admite escritura por filas, así que el archivo se arma
+    completo; se lanza ExportUnavailable antes de empezar si faltan las
+    dependencias.
+    """
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ExportUnavailable(f"La exportación a Parquet requiere pandas y pyarrow ({e.name} no está instalado)")
+    # pyarrow es el motor de pandas.to_parquet: basta con comprobar que esté instalado
+    if importlib.util.find_spec('pyarrow') is None:
+        raise ExportUnavailable("La exportación a Parquet requiere pandas y pyarrow (pyarrow no está instalado)")
+
+    headers, rows = _typed_table(records, with_blank_columns=False)
+    numeric = {header for key, header in COLUMN_MAPPING if key in NUMERIC_FIELDS}
+    frame = pd.DataFrame.from_records(list(rows), columns=headers)
+    for header in headers:
+        frame[header] = frame[header].astype('float64' if header in numeric else 'string')
+    buffer = io.BytesIO()
+    frame.to_parquet(buffer, index=False, engine='pyarrow')
+    return iter([buffer.getvalue()])
+
+
+class ExportFormat(NamedTuple):
+    extension: str
+    mimetype: str
+    writer: Callable[[Union[RecordStore, Iterable[Dict[str, str]]]], Iterator[bytes]]
+
+
+# Formatos de /api/resultados/<id>/<formato>
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    'excel': ExportFormat('xlsx', EXCEL_MIMETYPE, iter_excel),
+    'csv': ExportFormat('csv', CSV_MIMETYPE, iter_csv),
+    'ndjson': ExportFormat('ndjson', NDJSON_MIMETYPE, iter_ndjson),
+    'parquet': ExportFormat('parquet', PARQUET_MIMETYPE, iter_parquet),
+}
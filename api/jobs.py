@@ -0,0 +1,349 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from api.cache import ResultCache
+from api.deadline import REQUEST_TIMEOUT
+from api.metrics import Timings
+from api.pool import BATCH_DOCUMENTS
+from api.records import SOURCE_KEY, RecordStore
+from api.scaner import ExtractionError, ExtractionStopped, iter_records
+
+# Configuración de trabajos en segundo plano
+JOB_WORKERS = int(os.environ.get("SCANER_JOB_WORKERS", "2"))            # Extracciones simultáneas
+JOB_RETENTION_SECONDS = int(os.environ.get("SCANER_JOB_RETENTION", "3600"))  # Vida de un resultado terminado
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class Job:
+    """Estado de una extracción en segundo plano"""
+
+    def __init__(self, pdf_path: str, filename: str, digest: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        self.id = uuid.uuid4().hex
+        self.pdf_path = pdf_path
+        self.filename = filename
+        self.digest = digest
+        self.cached = False
+        self.status = QUEUED
+        self.total_pages = 0
+        self.pages_done = 0
+        self.records_found = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[RecordStore] = None
+        self.error: Optional[str] = None
+        # Plazo total contado desde que se recibe el trabajo (incluye la espera en cola)
+        self.expires_at = time.monotonic() + timeout if timeout else None
+        # Resultado incompleto: plazo vencido, cancelado o páginas con tiempo agotado
+        self.partial = False
+        self._cancel = threading.Event()
+        # Registros disponibles a medida que avanzan las páginas (para streaming)
+        self.records = RecordStore()
+        # Contadores de páginas (analizadas, descartadas por el clasificador, desde caché)
+        self.page_stats: Dict[str, int] = {}
+        # Duración de cada etapa de la extracción (bloque "timings" de la respuesta)
+        self.timings = Timings()
+        self._done = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def wait_for_change(self, seen_records: int, seen_pages: int, timeout: Optional[float] = None) -> bool:
+        """Espera hasta que haya registros nuevos, más páginas procesadas o el trabajo termine"""
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: len(self.records) > seen_records or self.pages_done != seen_pages or self.finished,
+                timeout,
+            )
+
+    def cancel(self) -> None:
+        """Pide detener la extracción; el trabajo termina con los registros obtenidos hasta entonces"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def remaining_seconds(self) -> float:
+        """Plazo que le queda a la extracción (0 = sin plazo)"""
+        if self.expires_at is None:
+            return 0
+        return max(self.expires_at - time.monotonic(), 0.001)
+
+    @property
+    def result_id(self) -> Optional[str]:
+        """Id del resultado guardado: el SHA-256 del PDF, una vez terminado con éxito y completo"""
+        return self.digest if self.status == COMPLETED and not self.partial else None
+
+    def eta_seconds(self) -> Optional[float]:
+        """Tiempo restante estimado a partir del ritmo de páginas observado"""
+        if self.status != RUNNING or not self.pages_done or not self.total_pages:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed / self.pages_done * (self.total_pages - self.pages_done)
+
+    def elapsed_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def _update_progress(self, pages_done: int, total_pages: int, records_found: int) -> None:
+        with self._changed:
+            self.pages_done = pages_done
+            self.total_pages = total_pages
+            self.records_found = records_found
+            self._changed.notify_all()
+
+    def _add_records(self, registros: List[Dict[str, str]]) -> None:
+        with self._changed:
+            self.records.extend(registros)
+            self._changed.notify_all()
+
+    def _finish(self) -> None:
+        with self._changed:
+            self.status = FAILED if self.error else COMPLETED
+            self.finished_at = time.time()
+            self._done.set()
+            self._changed.notify_all()
+
+    def to_dict(self) -> Dict:
+        eta = self.eta_seconds()
+        elapsed = self.elapsed_seconds()
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "state": self.status,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "records_found": self.records_found,
+            "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "error": self.error,
+            "cached": self.cached,
+            "result_id": self.result_id,
+            "partial": self.partial,
+            "page_stats": self.page_stats,
+        }
+
+
+class BatchJob:
+    """Lote de varios PDFs: un Job por archivo, extraídos a la vez sobre el pool compartido"""
+
+    def __init__(self, jobs: List[Job], rejected: List[Dict[str, str]]):
+        self.id = uuid.uuid4().hex
+        self.jobs = jobs
+        # Archivos del lote que no se pudieron extraer (no eran PDF, ZIP dañado, ...)
+        self.rejected = rejected
+        self.created_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return all(job.finished for job in self.jobs)
+
+    @property
+    def finished_at(self) -> Optional[float]:
+        if not self.finished:
+            return None
+        return max((job.finished_at for job in self.jobs), default=self.created_at)
+
+    @property
+    def status(self) -> str:
+        if not self.finished:
+            return RUNNING if any(job.status != QUEUED for job in self.jobs) else QUEUED
+        return COMPLETED if any(job.status == COMPLETED for job in self.jobs) else FAILED
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        for job in self.jobs:
+            remaining = max(0.0, expires_at - time.monotonic()) if expires_at is not None else None
+            if not job.wait(remaining):
+                return False
+        return True
+
+    def cancel(self) -> None:
+        for job in self.jobs:
+            job.cancel()
+
+    def records(self) -> RecordStore:
+        """Registros de todos los archivos, en orden de subida, con el archivo de origen"""
+        merged = RecordStore()
+        for job in self.jobs:
+            if job.result:
+                merged.extend({**record, SOURCE_KEY: job.filename} for record in job.result)
+        return merged
+
+    def files(self) -> List[Dict]:
+        """Resumen por archivo, incluidos los rechazados"""
+        summary = []
+        for job in self.jobs:
+            elapsed = job.elapsed_seconds()
+            summary.append({
+                "archivo": job.filename,
+                "job_id": job.id,
+                "state": job.status,
+                "total_pages": job.total_pages,
+                "pages_done": job.pages_done,
+                "records_found": len(job.result) if job.result is not None else len(job.records),
+                "elapsed_seconds": round(elapsed, 1) if elapsed is not None else None,
+                "cached": job.cached,
+                "partial": job.partial,
+                "timed_out_pages": job.page_stats.get("timed_out_pages", []),
+                "failed_pages": job.page_stats.get("failed_pages", []),
+                "result_id": job.result_id,
+                "error": job.error,
+            })
+        summary += [{"archivo": item["archivo"], "state": "rejected", "error": item["error"]}
+                    for item in self.rejected]
+        return summary
+
+    def to_dict(self) -> Dict:
+        return {
+            "batch_id": self.id,
+            "state": self.status,
+            "finished": self.finished,
+            "files_total": len(self.jobs),
+            "files_done": sum(job.finished for job in self.jobs),
+            "files_rejected": len(self.rejected),
+            "pages_done": sum(job.pages_done for job in self.jobs),
+            "total_pages": sum(job.total_pages for job in self.jobs),
+            "records_found": sum(job.records_found for job in self.jobs),
+            "files": self.files(),
+        }
+
+
+class JobManager:
+    """Ejecuta extracciones en segundo plano y conserva sus resultados por un tiempo limitado"""
+
+    def __init__(self, workers: int = JOB_WORKERS, retention_seconds: int = JOB_RETENTION_SECONDS,
+                 cache: Optional[ResultCache] = None, timeout: float = REQUEST_TIMEOUT):
+        self.retention_seconds = retention_seconds
+        self.cache = cache
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scaner-job")
+        # Los lotes tienen su propio executor para no ocupar el de las subidas individuales
+        self._batch_executor = ThreadPoolExecutor(max_workers=BATCH_DOCUMENTS, thread_name_prefix="scaner-batch")
+        self._jobs: Dict[str, Job] = {}
+        self._batches: Dict[str, BatchJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, pdf_path: str, filename: str, digest: Optional[str] = None) -> Job:
+        """Encola la extracción; el archivo en pdf_path se borra al terminar.
+
+        Si se conoce el SHA-256 del PDF y su resultado está en caché, el
+        trabajo se devuelve ya completado sin volver a extraer.
+        """
+        self.purge_expired()
+        return self._start(Job(pdf_path, filename, digest, self.timeout), self._executor)
+
+    def submit_batch(self, members: Iterable[Tuple[str, str, Optional[str]]],
+                     rejected: Optional[List[Dict[str, str]]] = None) -> BatchJob:
+        """Encola un lote de PDFs (ruta, nombre, sha256); cada archivo se borra al terminar su extracción.
+
+        Hasta BATCH_DOCUMENTS documentos se extraen a la vez, de modo que las
+        páginas de varios archivos pequeños ocupan juntas el pool de procesos.
+        """
+        self.purge_expired()
+        jobs = [Job(pdf_path, filename, digest, self.timeout) for pdf_path, filename, digest in members]
+        batch = BatchJob(jobs, rejected or [])
+        with self._lock:
+            self._batches[batch.id] = batch
+        for job in jobs:
+            self._start(job, self._batch_executor)
+        return batch
+
+    def _start(self, job: Job, executor: ThreadPoolExecutor) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+
+        cached = self.cache.get(job.digest) if self.cache is not None and job.digest else None
+        if cached is not None:
+            job.cached = True
+            job.started_at = time.time()
+            job._update_progress(cached["total_pages"], cached["total_pages"], len(cached["records"]))
+            job._add_records(cached["records"])
+            job.result = job.records
+            _remove(job.pdf_path)
+            job._finish()
+        else:
+            executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_batch(self, batch_id: str) -> Optional[BatchJob]:
+        self.purge_expired()
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def find_result(self, result_id: str) -> Optional[RecordStore]:
+        """Registros de un trabajo terminado y aún retenido con ese id de resultado"""
+        with self._lock:
+            for job in reversed(list(self._jobs.values())):
+                if job.result_id == result_id:
+                    return job.result
+        return None
+
+    def purge_expired(self) -> None:
+        """Elimina los trabajos terminados cuyo periodo de retención ya venció"""
+        limit = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < limit]
+            for job_id in expired:
+                del self._jobs[job_id]
+            expired = [batch_id for batch_id, batch in self._batches.items()
+                       if batch.finished and batch.finished_at < limit]
+            for batch_id in expired:
+                del self._batches[batch_id]
+
+    def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            # Los registros solo se guardan en job.records, a medida que llegan
+            try:
+                for _, registro in iter_records(job.pdf_path, progress=job._update_progress, stats=job.page_stats,
+                                                timings=job.timings, timeout=job.remaining_seconds(),
+                                                cancel=job._cancel):
+                    job._add_records([registro])
+            except ExtractionStopped:
+                pass  # Plazo vencido o cancelado: queda lo extraído hasta entonces
+
+            job.result = job.records
+            job.records_found = len(job.records)
+            # Un resultado parcial (detenido, o con páginas omitidas por tiempo o por error) no se
+            # guarda en la caché: otra petición debe extraer todo
+            job.partial = any(job.page_stats.get(key) for key in ("stopped", "pages_timed_out", "pages_failed"))
+            if self.cache is not None and job.digest and not job.partial:
+                self.cache.put(job.digest, {"total_pages": job.total_pages, "records": job.result.to_dicts()})
+        except ExtractionError as e:
+            job.error = str(e)
+        except Exception as e:
+            job.error = f"Error al procesar PDF: {str(e)}"
+        finally:
+            _remove(job.pdf_path)
+            job._finish()
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
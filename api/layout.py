@@ -0,0 +1,135 @@
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, List, Optional
+
+import pdfplumber
+
+from api.metrics import Timings, timed
+from api.template import SectionTemplate
+
+
+class PageLayout:
+    """Análisis de layout de una página, calculado una sola vez y compartido por
+    todos los extractores de sección (texto, palabras 2/2 y palabras 3/3).
+
+    ``template`` es la plantilla del documento (posiciones aprendidas de las
+    secciones), opcional. Con ``timings`` se mide cada extracción de texto y
+    de palabras (la primera incluye la conversión de los caracteres)."""
+
+    __slots__ = ("page", "template", "timings", "_text", "_words", "_words_loose", "_rows", "_rows_loose")
+
+    def __init__(self, page: pdfplumber.page.Page, template: Optional[SectionTemplate] = None,
+                 timings: Optional[Timings] = None):
+        self.page = page
+        self.template = template
+        self.timings = timings
+        self._text = None
+        self._words = None
+        self._words_loose = None
+        self._rows = None
+        self._rows_loose = None
+
+    @property
+    def chars(self) -> List[dict]:
+        # pdfplumber ya guarda en caché los objetos de la página
+        return self.page.chars
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            with timed(self.timings, "extract_text"):
+                self._text = self.page.extract_text() or ""
+        return self._text
+
+    @property
+    def words(self) -> List[dict]:
+        """Palabras con tolerancia 2/2 (fertilidad y relaciones entre cationes)"""
+        if self._words is None:
+            with timed(self.timings, "extract_words"):
+                self._words = _with_ymid(self.page.extract_words(x_tolerance=2, y_tolerance=2, keep_blank_chars=False))
+        return self._words
+
+    @property
+    def words_loose(self) -> List[dict]:
+        """Palabras con tolerancia 3/3 (micronutrientes)"""
+        if self._words_loose is None:
+            with timed(self.timings, "extract_words_loose"):
+                self._words_loose = _with_ymid(self.page.extract_words(x_tolerance=3, y_tolerance=3, keep_blank_chars=False))
+        return self._words_loose
+
+    @property
+    def rows(self) -> "RowIndex":
+        if self._rows is None:
+            self._rows = RowIndex(self.words)
+        return self._rows
+
+    @property
+    def rows_loose(self) -> "RowIndex":
+        if self._rows_loose is None:
+            self._rows_loose = RowIndex(self.words_loose)
+        return self._rows_loose
+
+
+class RowIndex:
+    """Índice espacial de palabras ordenado por ymid.
+
+    Las búsquedas por banda vertical se resuelven con bisect en lugar de
+    recorrer toda la lista de palabras. Los empates se resuelven por el orden
+    original de extracción, de modo que los resultados son idénticos a los de
+    un filtrado lineal seguido de ``sorted``.
+    """
+
+    __slots__ = ("_entries", "_ys")
+
+    def __init__(self, words: List[dict]):
+        self._entries = sorted(enumerate(words), key=lambda e: (e[1]["ymid"], e[0]))
+        self._ys = [w["ymid"] for _, w in self._entries]
+
+    def _open_band(self, lo: float, hi: float):
+        """Entradas con lo < ymid < hi, en orden vertical"""
+        i = bisect_right(self._ys, lo)
+        j = bisect_left(self._ys, hi, lo=i)
+        return self._entries[i:j]
+
+    def _closed_band(self, lo: float, hi: float):
+        """Entradas con lo <= ymid <= hi, en orden vertical"""
+        i = bisect_left(self._ys, lo)
+        j = bisect_right(self._ys, hi, lo=i)
+        return self._entries[i:j]
+
+    @staticmethod
+    def _by_x(entries) -> List[dict]:
+        return [w for _, w in sorted(entries, key=lambda e: (e[1]["x0"], e[0]))]
+
+    def line_at(self, y: float, tol: float = 3.0) -> List[dict]:
+        """Palabras con |ymid - y| <= tol, ordenadas por x0"""
+        # Margen mínimo en la banda; el filtro exacto se aplica después
+        band = self._closed_band(y - tol - 1e-6, y + tol + 1e-6)
+        return self._by_x([e for e in band if abs(e[1]["ymid"] - y) <= tol])
+
+    def within(self, lo: float, hi: float) -> List[dict]:
+        """Palabras con lo <= ymid <= hi, ordenadas por x0"""
+        return self._by_x(self._closed_band(lo, hi))
+
+    def ys_between(self, lo: float, hi: float) -> List[int]:
+        """Coordenadas y redondeadas (únicas y ordenadas) de las palabras con lo < ymid < hi"""
+        return sorted({round(y) for y in self._ys[bisect_right(self._ys, lo):bisect_left(self._ys, hi)]})
+
+    def first_between(self, lo: float, hi: float, pred: Callable[[dict], bool]) -> Optional[dict]:
+        """Primera palabra (la de menor ymid) con lo < ymid < hi que cumple pred"""
+        for _, w in self._open_band(lo, hi):
+            if pred(w):
+                return w
+        return None
+
+    def first(self, pred: Callable[[dict], bool]) -> Optional[dict]:
+        """Primera palabra de la página (la de menor ymid) que cumple pred"""
+        for _, w in self._entries:
+            if pred(w):
+                return w
+        return None
+
+
+def _with_ymid(words: List[Dict]) -> List[Dict]:
+    for w in words:
+        w["ymid"] = (w["top"] + w["bottom"]) / 2.0
+    return words
@@ -0,0 +1,175 @@
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import psutil
+
+# Gobernador de memoria: las decisiones se toman con la memoria residente de
+# este proceso más la de sus workers, comparada con un presupuesto, y no con
+# el porcentaje de memoria de todo el equipo. Según el uso, la ventana de
+# páginas en vuelo crece o se reduce y, por encima del presupuesto, se deja de
+# despachar páginas hasta que haya espacio. El GC completo solo se fuerza
+# cuando se supera el presupuesto.
+#
+# Una pausa solo sirve si hay trabajo en curso que vaya a liberar memoria: las
+# páginas en vuelo de la misma extracción (quien despacha deja de enviar y
+# recoge resultados) u otras extracciones activas del proceso.
+
+# Presupuesto en MB; 0 = automático (una fracción del límite del contenedor o
+# de la memoria física)
+MEMORY_BUDGET_MB = int(os.environ.get("SCANER_MEMORY_BUDGET_MB", "0"))
+AUTO_BUDGET_FRACTION = 0.75
+
+LOW_WATER = 0.60    # Por debajo (fracción del presupuesto) la ventana crece
+HIGH_WATER = 0.85   # Por encima la ventana se reduce
+SAMPLE_INTERVAL = 0.25  # Segundos que se reutiliza una medición
+PAUSE_INTERVAL = 0.1    # Segundos entre comprobaciones durante una pausa
+MAX_PAUSE = 30.0        # Pausa máxima antes de continuar con la ventana mínima
+
+# Archivos con el límite de memoria del contenedor (cgroup v2 y v1)
+_CGROUP_LIMITS = ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+
+
+def _container_limit() -> Optional[int]:
+    for path in _CGROUP_LIMITS:
+        try:
+            with open(path) as fh:
+                value = fh.read().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            limit = int(value)
+            # cgroup v1 informa un número enorme cuando no hay límite
+            if limit < psutil.virtual_memory().total:
+                return limit
+    return None
+
+
+def default_budget() -> int:
+    """Presupuesto en bytes: el configurado o una fracción de la memoria disponible para el proceso"""
+    if MEMORY_BUDGET_MB > 0:
+        return MEMORY_BUDGET_MB * 1024 * 1024
+    limit = _container_limit() or psutil.virtual_memory().total
+    return int(limit * AUTO_BUDGET_FRACTION)
+
+
+def process_rss() -> int:
+    """Memoria residente del proceso más la de todos sus procesos hijos (workers)"""
+    process = psutil.Process()
+    total = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass  # El worker terminó entre la lista y la medición
+    return total
+
+
+class MemoryGovernor:
+    """Ajusta la ventana de páginas en vuelo y frena el despacho según la memoria del proceso.
+
+    Es compartido por todas las extracciones del proceso, ya que la memoria
+    residente también lo es.
+    """
+
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = budget or default_budget()
+        self.peak = 0
+        self.pauses = 0
+        self.paused_seconds = 0.0
+        self.collections = 0
+        self.active = 0
+        self._usage = 0
+        self._sampled_at = 0.0
+        self._lock = threading.Lock()
+
+    def usage(self, fresh: bool = False) -> int:
+        """RSS del proceso y sus workers; se mide como mucho cada SAMPLE_INTERVAL"""
+        now = time.monotonic()
+        with self._lock:
+            if not fresh and now - self._sampled_at < SAMPLE_INTERVAL:
+                return self._usage
+        usage = process_rss()
+        with self._lock:
+            self._usage = usage
+            self._sampled_at = now
+            self.peak = max(self.peak, usage)
+        return usage
+
+    @contextmanager
+    def extraction(self) -> Iterator[None]:
+        """Marca una extracción activa mientras dura el bloque"""
+        with self._lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def over_budget(self) -> bool:
+        return self.usage() >= self.budget
+
+    @property
+    def pressure(self) -> float:
+        """Uso como fracción del presupuesto"""
+        return self.usage() / self.budget
+
+    def window_size(self, current: int, minimum: int, maximum: int) -> int:
+        """Siguiente tamaño de ventana: duplica con holgura y reduce a la mitad con presión"""
+        pressure = self.pressure
+        if pressure >= HIGH_WATER:
+            return max(minimum, current // 2)
+        if pressure <= LOW_WATER:
+            return min(maximum, current * 2)
+        return current
+
+    def wait_for_room(self) -> float:
+        """Si el uso supera el presupuesto, libera memoria y espera antes de despachar.
+
+        Se llama sin páginas propias en vuelo: solo se espera mientras haya
+        otras extracciones activas. Devuelve los segundos de pausa; pasado
+        MAX_PAUSE se continúa de todos modos (con la ventana mínima).
+        """
+        if not self.over_budget():
+            return 0.0
+        started = time.monotonic()
+        gc.collect()
+        with self._lock:
+            self.collections += 1
+        while (self.usage(fresh=True) >= self.budget and self.active > 1
+               and time.monotonic() - started < MAX_PAUSE):
+            time.sleep(PAUSE_INTERVAL)
+        paused = time.monotonic() - started
+        with self._lock:
+            self.pauses += 1
+            self.paused_seconds += paused
+        print(f"Memoria sobre el presupuesto ({self._usage / 2**20:.0f} MB de "
+              f"{self.budget / 2**20:.0f} MB): despacho pausado {paused:.2f} s")
+        return paused
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rss_mb": round(self.usage() / 2**20, 1),
+            "peak_mb": round(self.peak / 2**20, 1),
+            "budget_mb": round(self.budget / 2**20, 1),
+            "pauses": self.pauses,
+            "paused_seconds": round(self.paused_seconds, 2),
+            "collections": self.collections,
+            "active_extractions": self.active,
+        }
+
+
+_governor: Optional[MemoryGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_memory_governor() -> MemoryGovernor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = MemoryGovernor()
+        return _governor
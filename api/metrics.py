@@ -0,0 +1,156 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from api.memory import get_memory_governor
+
+# Instrumentación por etapa: cada etapa caliente (texto, palabras, extractores
+# de sección, rechazos por relevancia, programación de lotes, exportaciones)
+# suma su duración a un histograma. Cada extracción acumula los suyos en un
+# Timings propio, que se devuelve en la respuesta y al terminar se agrega al
+# global que expone /metrics en formato Prometheus. En el pool de procesos
+# cada worker mide localmente y devuelve una copia con sus resultados.
+
+# Límites superiores de los buckets (segundos)
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4"  # Flask agrega el charset
+
+# Copia serializable: {etapa: (cantidad, segundos, conteo por bucket)}
+TimingsSnapshot = Dict[str, Tuple[int, float, List[int]]]
+
+
+class Timings:
+    """Histogramas de duración por etapa; se puede usar desde varios hilos"""
+
+    def __init__(self):
+        self._stages: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        bucket = bisect_left(STAGE_BUCKETS, seconds)
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0.0, [0] * (len(STAGE_BUCKETS) + 1)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2][bucket] += 1
+
+    def snapshot(self) -> TimingsSnapshot:
+        with self._lock:
+            return {stage: (count, total, list(buckets)) for stage, (count, total, buckets) in self._stages.items()}
+
+    def merge(self, snapshot: TimingsSnapshot) -> None:
+        """Suma las observaciones de otra medición (p. ej. de un worker)"""
+        with self._lock:
+            for stage, (count, total, buckets) in snapshot.items():
+                entry = self._stages.get(stage)
+                if entry is None:
+                    entry = self._stages[stage] = [0, 0.0, [0] * (len(STAGE_BUCKETS) + 1)]
+                entry[0] += count
+                entry[1] += total
+                entry[2] = [a + b for a, b in zip(entry[2], buckets)]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Bloque ``timings`` de las respuestas: cantidad, tiempo total y promedio por etapa"""
+        return {
+            stage: {
+                "count": count,
+                "seconds": round(total, 4),
+                "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+            }
+            for stage, (count, total, _) in sorted(self.snapshot().items())
+        }
+
+
+@contextmanager
+def timed(timings: Optional[Timings], stage: str) -> Iterator[None]:
+    """Mide el bloque como una observación de ``stage`` (sin efecto si timings es None)"""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.observe(stage, time.perf_counter() - start)
+
+
+def timed_iter(chunks: Iterable, timings: Timings, stage: str) -> Iterator:
+    """Recorre un generador midiendo solo el tiempo de producir sus elementos"""
+    elapsed = 0.0
+    iterator = iter(chunks)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                return
+            elapsed += time.perf_counter() - start
+            yield chunk
+    finally:
+        timings.observe(stage, elapsed)
+
+
+# Métricas globales del proceso
+METRICS = Timings()
+_page_counts: Dict[str, int] = {}
+_extractions: Dict[str, int] = {}
+_counts_lock = threading.Lock()
+
+
+def record_extraction(timings: Timings, stats: Dict[str, Any], ok: bool) -> None:
+    """Agrega una extracción terminada a las métricas globales"""
+    METRICS.merge(timings.snapshot())
+    with _counts_lock:
+        for key in ("pages_analyzed", "pages_skipped", "pages_cached", "pages_timed_out", "pages_failed"):
+            outcome = key[len("pages_"):]
+            _page_counts[outcome] = _page_counts.get(outcome, 0) + stats.get(key, 0)
+        # Las detenidas por plazo o cancelación se cuentan con su motivo
+        status = stats.get("stopped") or ("ok" if ok else "error")
+        _extractions[status] = _extractions.get(status, 0) + 1
+
+
+def render_prometheus() -> str:
+    """Métricas globales en el formato de texto de Prometheus"""
+    lines = [
+        "# HELP scaner_stage_seconds Duración de cada etapa de la extracción",
+        "# TYPE scaner_stage_seconds histogram",
+    ]
+    for stage, (count, total, buckets) in sorted(METRICS.snapshot().items()):
+        cumulative = 0
+        for bound, n in zip(STAGE_BUCKETS, buckets):
+            cumulative += n
+            lines.append(f'scaner_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'scaner_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'scaner_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'scaner_stage_seconds_count{{stage="{stage}"}} {count}')
+
+    with _counts_lock:
+        pages = sorted(_page_counts.items())
+        extractions = sorted(_extractions.items())
+    lines += ["# HELP scaner_pages_total Páginas procesadas por resultado",
+              "# TYPE scaner_pages_total counter"]
+    lines += [f'scaner_pages_total{{outcome="{outcome}"}} {n}' for outcome, n in pages]
+    lines += ["# HELP scaner_extractions_total Extracciones terminadas por estado",
+              "# TYPE scaner_extractions_total counter"]
+    lines += [f'scaner_extractions_total{{status="{status}"}} {n}' for status, n in extractions]
+
+    governor = get_memory_governor()
+    lines += [
+        "# HELP scaner_memory_rss_bytes Memoria residente del proceso y sus workers",
+        "# TYPE scaner_memory_rss_bytes gauge",
+        f"scaner_memory_rss_bytes {governor.usage()}",
+        "# HELP scaner_memory_budget_bytes Presupuesto de memoria del gobernador",
+        "# TYPE scaner_memory_budget_bytes gauge",
+        f"scaner_memory_budget_bytes {governor.budget}",
+        "# HELP scaner_memory_pauses_total Pausas de despacho por memoria sobre el presupuesto",
+        "# TYPE scaner_memory_pauses_total counter",
+        f"scaner_memory_pauses_total {governor.pauses}",
+    ]
+    return "\n".join(lines) + "\n"
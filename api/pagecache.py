@@ -0,0 +1,222 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pdfminer.psparser import PSKeyword, PSLiteral
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+
+from api.cache import CACHE_DIR, EXTRACTOR_VERSION
+
+# Caché de registros por página: los reportes acumulativos repiten las páginas
+# de ediciones anteriores, así que solo las páginas nuevas o modificadas pasan
+# por el análisis de layout.
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("SCANER_PAGE_CACHE_MAX_ENTRIES", "200000"))  # 0 = desactivada
+# Tamaño máximo de la base (bytes); 0 = solo el límite de entradas
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("SCANER_PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PAGE_CACHE_EVICT_TARGET = 0.9  # Al pasar el límite de tamaño se libera hasta esta fracción
+WAL_SIZE_LIMIT = 4 * 1024 * 1024  # Tamaño al que se recorta el WAL tras cada checkpoint
+
+
+class PageFingerprinter:
+    """Calcula la huella de las páginas de un documento.
+
+    La huella cubre el contenido (streams de la página ya decodificados), los
+    recursos que usa (fuentes, XObjects, etc., resueltos recursivamente) y la
+    geometría (MediaBox, CropBox y rotación). No depende de los números de
+    objeto del PDF, de modo que una misma página tiene la misma huella aunque
+    el documento se regenere con más páginas. Los objetos compartidos, como
+    las fuentes, se resumen una sola vez por documento.
+    """
+
+    def __init__(self):
+        self._memo: Dict[int, bytes] = {}
+
+    def page(self, page) -> str:
+        page_obj = page.page_obj
+        digest = hashlib.sha256()
+        digest.update(repr((page_obj.mediabox, page_obj.cropbox, page_obj.rotate)).encode())
+        for content in page_obj.contents:
+            self._feed(digest, content, ())
+        digest.update(b"/Resources")
+        self._feed(digest, page_obj.resources, ())
+        return digest.hexdigest()
+
+    def _feed(self, digest, obj, path: Tuple[int, ...]) -> None:
+        if isinstance(obj, PDFObjRef):
+            if obj.objid in path:
+                # Referencia cíclica (p. ej. /Parent): solo su profundidad relativa
+                digest.update(b"^%d" % (len(path) - path.index(obj.objid)))
+                return
+            cached = self._memo.get(obj.objid)
+            if cached is None:
+                sub = hashlib.sha256()
+                self._feed(sub, obj.resolve(), path + (obj.objid,))
+                cached = self._memo[obj.objid] = sub.digest()
+            digest.update(b"R")
+            digest.update(cached)
+        elif isinstance(obj, PDFStream):
+            digest.update(b"S")
+            self._feed(digest, obj.attrs, path)
+            data = obj.get_data()
+            digest.update(b"%d:" % len(data))
+            digest.update(data)
+        elif isinstance(obj, dict):
+            digest.update(b"{")
+            for key in sorted(obj, key=str):
+                digest.update(str(key).encode())
+                self._feed(digest, obj[key], path)
+            digest.update(b"}")
+        elif isinstance(obj, (list, tuple)):
+            digest.update(b"[")
+            for item in obj:
+                self._feed(digest, item, path)
+            digest.update(b"]")
+        elif isinstance(obj, (PSLiteral, PSKeyword)):
+            digest.update(b"/" + str(obj.name).encode())
+        elif isinstance(obj, bytes):
+            digest.update(b"%d:" % len(obj))
+            digest.update(obj)
+        else:
+            digest.update(repr(obj).encode())
+
+
+class PageCache:
+    """Registros por huella de página, en SQLite junto a la caché de resultados.
+
+    Se guarda también el resultado de las páginas descartadas (sin registro),
+    para no volver a analizarlas. Cuando se supera ``max_entries`` o el
+    archivo ocupa más de ``max_bytes`` se borran las entradas menos usadas
+    recientemente, y las páginas liberadas se devuelven al disco.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_entries: int = PAGE_CACHE_MAX_ENTRIES,
+                 version: str = EXTRACTOR_VERSION, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if self.enabled:
+            version_dir = os.path.join(directory, version)
+            os.makedirs(version_dir, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(version_dir, "pages.sqlite3"),
+                                         check_same_thread=False, timeout=30)
+            # auto_vacuum solo tiene efecto si se fija antes de crear la tabla
+            self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA journal_size_limit={WAL_SIZE_LIMIT}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages (fingerprint TEXT PRIMARY KEY, record TEXT, used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages (used)")
+            self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get_many(self, fingerprints: List[str]) -> Dict[str, Optional[Dict[str, str]]]:
+        """Devuelve {huella: registro o None si la página se descartó} para las huellas conocidas"""
+        if not self.enabled or not fingerprints:
+            return {}
+
+        found: Dict[str, Optional[Dict[str, str]]] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(fingerprints))
+            for i in range(0, len(unique), 500):
+                chunk = unique[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT fingerprint, record FROM pages WHERE fingerprint IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for fingerprint, record in rows:
+                    found[fingerprint] = json.loads(record)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE pages SET used = ? WHERE fingerprint = ?",
+                                       [(now, fingerprint) for fingerprint in found])
+                self._conn.commit()
+            self.hits += sum(1 for fingerprint in fingerprints if fingerprint in found)
+            self.misses += sum(1 for fingerprint in fingerprints if fingerprint not in found)
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, Optional[Dict[str, str]]]]) -> None:
+        """Guarda pares (huella, registro o None)"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        rows = [(fingerprint, json.dumps(record, ensure_ascii=False), now) for fingerprint, record in items]
+        if not rows:
+            return
+
+        with self._lock:
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)", rows)
+                evicted = self._evict()
+                self._conn.commit()
+                if evicted:
+                    self._conn.execute("PRAGMA incremental_vacuum").fetchall()
+            except sqlite3.Error as e:
+                print(f"No se pudo guardar la caché de páginas: {e}")
+                self._conn.rollback()
+
+    def _used_bytes(self) -> int:
+        """Bytes ocupados por las páginas en uso de la base (sin las libres)"""
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free) * page_size
+
+    def _evict(self) -> int:
+        """Borra las entradas menos usadas que excedan los límites; devuelve cuántas (con el lock tomado)"""
+        count = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        excess = count - self.max_entries
+        if self.max_bytes > 0 and count:
+            used = self._used_bytes()
+            if used > self.max_bytes:
+                # Tamaño medio por entrada; se libera de más para no borrar en cada escritura
+                excess = max(excess, math.ceil((used - self.max_bytes * PAGE_CACHE_EVICT_TARGET) * count / used))
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM pages WHERE fingerprint IN (SELECT fingerprint FROM pages ORDER BY used LIMIT ?)",
+            (excess,),
+        )
+        return excess
+
+    def stats(self) -> Dict:
+        entries = size = 0
+        with self._lock:
+            if self.enabled:
+                entries = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+                size = self._used_bytes()
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    """Caché de páginas compartida por el proceso (se crea al primer uso)"""
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache()
+        return _page_cache
@@ -0,0 +1,215 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from api.source import open_pdf
+
+# Configuración del pool de procesos (persistente entre peticiones)
+PROCESS_WORKERS = int(os.environ.get("SCANER_WORKERS", "0")) or (os.cpu_count() or 4)
+START_METHOD = os.environ.get("SCANER_START_METHOD", "spawn")
+# Documentos de un lote extraídos a la vez; sus páginas comparten el pool de procesos
+BATCH_DOCUMENTS = int(os.environ.get("SCANER_BATCH_DOCUMENTS", "0")) or PROCESS_WORKERS
+# PDFs que cada worker mantiene abiertos: los rangos de los documentos de un
+# lote se intercalan, así que uno por worker obligaría a reabrirlos casi siempre
+WORKER_PDFS = int(os.environ.get("SCANER_WORKER_PDFS", "0")) or BATCH_DOCUMENTS
+# Cada cuánto un worker revisa si el PDF que mantiene abierto sigue en disco (segundos)
+WORKER_PDF_CHECK_INTERVAL = float(os.environ.get("SCANER_WORKER_PDF_CHECK", "5"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_generation = 0  # Aumenta cada vez que el pool se recicla
+_pool_lock = threading.Lock()
+
+# Latido de los workers en memoria compartida: por worker (pid, token del
+# rango en curso, índice de la página en curso, inicio de la página según
+# time.monotonic, que es común a todos los procesos). Token 0 = inactivo.
+HEARTBEAT_FIELDS = 4
+_heartbeats = None
+
+# Tokens de rangos abandonados por su extracción (detenida o cancelada), en
+# un búfer circular compartido: el worker que los tenga en curso o en cola
+# deja de procesarlos en la siguiente página en lugar de ocupar el pool.
+_abandoned = None
+_abandoned_next = 0
+
+
+def get_process_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Devuelve el pool compartido, creándolo la primera vez o si cambia el número de workers"""
+    global _pool, _pool_workers, _heartbeats, _abandoned, _abandoned_next
+    workers = max(1, workers or PROCESS_WORKERS)
+
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+        if _pool is None:
+            print(f"Iniciando pool de procesos con {workers} workers ({START_METHOD})")
+            context = multiprocessing.get_context(START_METHOD)
+            _heartbeats = context.Array("d", workers * HEARTBEAT_FIELDS)
+            _abandoned = context.Array("q", max(64, workers * 8))
+            _abandoned_next = 0
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(_heartbeats, _abandoned),
+            )
+            _pool_workers = workers
+
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    """Detiene el pool compartido (al salir del proceso o si quedó roto)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+def terminate_process_pool() -> None:
+    """Mata los workers (p. ej. uno que no responde) para que el próximo uso cree un pool nuevo.
+
+    Los rangos en vuelo de todas las extracciones fallan con
+    BrokenProcessPool; con ``pool_generation`` cada una distingue este
+    reciclado de una falla real y los vuelve a enviar.
+    """
+    global _pool, _pool_workers, _pool_generation, _heartbeats, _abandoned
+    with _pool_lock:
+        if _pool is not None:
+            # _processes es interno del executor, pero es la única vía para matar un worker
+            for process in list((_pool._processes or {}).values()):
+                process.kill()
+            _pool.shutdown(wait=False, cancel_futures=True)
+            print("Pool de procesos reciclado")
+        _pool = None
+        _pool_workers = 0
+        _pool_generation += 1
+        _heartbeats = None
+        _abandoned = None
+
+
+def pool_generation() -> int:
+    return _pool_generation
+
+
+def busy_workers() -> List[Tuple[int, int, float]]:
+    """(token, índice de página, inicio) de cada worker ocupado en una página"""
+    heartbeats = _heartbeats
+    if heartbeats is None:
+        return []
+    values = heartbeats[:]
+    busy = []
+    for slot in range(0, len(values), HEARTBEAT_FIELDS):
+        _, token, page_idx, started = values[slot:slot + HEARTBEAT_FIELDS]
+        if token:
+            busy.append((int(token), int(page_idx), started))
+    return busy
+
+
+def abandon_ranges(tokens: List[int]) -> None:
+    """Avisa a los workers que ya nadie espera estos rangos (se cortan en la siguiente página)"""
+    global _abandoned_next
+    with _pool_lock:
+        abandoned = _abandoned
+        if abandoned is None:
+            return
+        for token in tokens:
+            abandoned[_abandoned_next] = token
+            _abandoned_next = (_abandoned_next + 1) % len(abandoned)
+
+
+atexit.register(shutdown_process_pool)
+
+
+# Lado del worker: cada proceso mantiene abiertos los últimos WORKER_PDFS
+# documentos que procesó (LRU por ruta, mtime y tamaño), de modo que los
+# rangos de páginas de un mismo documento no lo reabren. Un hilo cierra cada
+# uno en cuanto su archivo se borra o cambia: el mmap retendría el archivo
+# temporal (en tmpfs, memoria) mientras el worker espera otro trabajo.
+_worker_pdfs: "OrderedDict[Tuple[str, int, int], Tuple[object, ExitStack]]" = OrderedDict()
+_worker_lock = threading.Lock()  # Tomado mientras un rango usa un PDF abierto
+_worker_slot: Optional[int] = None
+
+
+def _init_worker(heartbeats, abandoned) -> None:
+    """Inicializador de cada worker: reserva su lugar en el arreglo de latidos"""
+    global _heartbeats, _abandoned, _worker_slot
+    _heartbeats = heartbeats
+    _abandoned = abandoned
+    with heartbeats.get_lock():
+        for slot in range(0, len(heartbeats), HEARTBEAT_FIELDS):
+            if not heartbeats[slot]:
+                heartbeats[slot] = os.getpid()
+                _worker_slot = slot
+                break
+    if WORKER_PDF_CHECK_INTERVAL > 0:
+        threading.Thread(target=_release_removed_pdf, name="scaner-worker-pdf", daemon=True).start()
+
+
+def worker_heartbeat(token: int = 0, page_idx: int = -1) -> None:
+    """Informa la página que el worker empieza a procesar (token 0 = inactivo)"""
+    if _heartbeats is None or _worker_slot is None:
+        return
+    _heartbeats[_worker_slot + 1:_worker_slot + HEARTBEAT_FIELDS] = [token, page_idx, time.monotonic()]
+
+
+def range_abandoned(token: int) -> bool:
+    """Si la extracción que envió el rango ya no espera su resultado"""
+    return bool(token) and _abandoned is not None and token in _abandoned[:]
+
+
+def _file_key(pdf_path: str) -> Optional[Tuple[str, int, int]]:
+    """(ruta, mtime_ns, tamaño) del archivo, o None si ya no existe"""
+    try:
+        stat = os.stat(pdf_path)
+    except OSError:
+        return None
+    return pdf_path, stat.st_mtime_ns, stat.st_size
+
+
+def _close_worker_pdf(key: Tuple[str, int, int]) -> None:
+    _, stack = _worker_pdfs.pop(key)
+    stack.close()
+
+
+def _release_removed_pdf() -> None:
+    """Hilo del worker: cierra los PDFs abiertos cuyo archivo ya no está (o cambió)"""
+    while True:
+        time.sleep(WORKER_PDF_CHECK_INTERVAL)
+        with _worker_lock:
+            for key in [key for key in _worker_pdfs if _file_key(key[0]) != key]:
+                _close_worker_pdf(key)
+
+
+@contextmanager
+def worker_pdf(pdf_path: str) -> Iterator:
+    """Abre (una sola vez por worker, vía mmap) el PDF compartido en disco.
+
+    El documento queda reservado mientras dura el bloque, para que no se
+    cierre a mitad de un rango.
+    """
+    with _worker_lock:
+        key = _file_key(pdf_path)
+        if key is None:
+            raise FileNotFoundError(pdf_path)
+        if key in _worker_pdfs:
+            _worker_pdfs.move_to_end(key)
+        else:
+            # Versiones anteriores del mismo archivo y, si no hay lugar, el menos usado
+            for old in [old for old in _worker_pdfs if old[0] == pdf_path]:
+                _close_worker_pdf(old)
+            while _worker_pdfs and len(_worker_pdfs) >= max(1, WORKER_PDFS):
+                _close_worker_pdf(next(iter(_worker_pdfs)))
+            stack = ExitStack()
+            _worker_pdfs[key] = (stack.enter_context(open_pdf(pdf_path)), stack)
+        yield _worker_pdfs[key][0]
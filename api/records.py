@@ -0,0 +1,267 @@
+import math
+import re
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from api.fields import FIELD_SPECS, NOT_ANALYZED, NOT_AVAILABLE, NOT_FOUND
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional (requirements-light.txt)
+    np = None
+
+# Almacén compacto de registros.
+#
+# Cada registro de una página tiene el mismo esquema de unas 65 claves y la
+# mayoría de sus valores son los mismos pocos literales. En lugar de
+# conservar un dict por muestra, los registros se guardan por columnas: los
+# valores numéricos en arrays de floats y el resto como códigos enteros sobre
+# la lista de valores distintos de cada columna. Los dicts solo se
+# reconstruyen al entregar los datos (JSON, caché, exportaciones).
+
+NOT_APPLICABLE = "N/A"
+
+FERTILITY_KEYS = ("mo", "fosforo", "nitrogeno", "potasio", "calcio", "magnesio", "sodio", "azufre")
+CHEMICAL_KEYS = ("ph_agua", "ph_cacl2", "ph_kcl", "carbonato_calcio", "conductividad_electrica")
+MICRO_KEYS = ("hierro", "cobre", "zinc", "manganeso", "boro")
+RELATION_KEYS = ("rel_ca_mg", "rel_mg_k", "rel_ca_k", "rel_ca_mg_k", "rel_k_mg")
+
+# Archivo de origen de cada registro en los lotes de varios PDFs
+SOURCE_KEY = "archivo"
+
+# Claves de un registro, en el orden en que las arma el extractor, más el
+# archivo de origen al final (ausente en los registros de un solo PDF)
+RECORD_KEYS: Tuple[str, ...] = (
+    tuple(spec.key for spec in FIELD_SPECS)
+    + FERTILITY_KEYS + tuple(f"interp_{key}" for key in FERTILITY_KEYS)
+    + CHEMICAL_KEYS + tuple(f"interp_{key}" for key in CHEMICAL_KEYS)
+    + tuple(k for key in MICRO_KEYS for k in (key, f"unidad_{key}", f"interp_{key}"))
+    + tuple(k for key in RELATION_KEYS for k in (key, f"interp_{key}"))
+    + (SOURCE_KEY,)
+)
+
+# Columnas cuyos valores son números (guardados como float cuando el texto lo permite)
+NUMERIC_FIELDS = frozenset(
+    ("meta_rendimiento", "arcilla", "limo", "arena", "porcentaje_saturacion", "capacidad_campo",
+     "punto_marchitez", "conductividad_hidraulica", "densidad_aparente")
+    + FERTILITY_KEYS + CHEMICAL_KEYS + MICRO_KEYS + RELATION_KEYS
+)
+
+# Códigos reservados en todas las columnas; los literales comunes tienen
+# siempre el mismo código
+_NUMBER = 0   # El valor está en la columna de floats
+_ABSENT = 1   # El registro no tiene la clave
+SENTINELS = (NOT_FOUND, NOT_AVAILABLE, NOT_ANALYZED, NOT_APPLICABLE)
+_RESERVED: List[Optional[str]] = [None, None, *SENTINELS]
+
+ITER_BLOCK_ROWS = 1024  # Filas decodificadas a la vez al recorrer el almacén
+
+# Número dentro de un texto con unidades ("1,58 g/cm³", "<0.5", "12.3 %")
+_NUMBER_IN_TEXT_RE = re.compile(r"[-+]?(?:\d+(?:[.,]\d+)*|[.,]\d+)")
+
+
+def _as_number(value: str) -> Optional[float]:
+    """Float que reproduce exactamente el texto, o None si no lo hay"""
+    if not value or not (value[0].isdigit() or value[0] in "-."):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    if not math.isfinite(number) or repr(number) != value:
+        return None
+    return number
+
+
+def parse_number(text: str) -> Tuple[Optional[float], str]:
+    """(número, unidad) de un texto: coma decimal normalizada y unidad separada.
+
+    Con punto y coma a la vez, el último separador es el decimal. Devuelve
+    (None, "") si el texto no contiene un número.
+    """
+    m = _NUMBER_IN_TEXT_RE.search(text)
+    if m is None:
+        return None, ""
+    digits = m.group(0)
+    if "," in digits:
+        if "." in digits and digits.rfind(".") > digits.rfind(","):
+            digits = digits.replace(",", "")
+        else:
+            digits = digits.replace(".", "").replace(",", ".") if "." in digits else digits.replace(",", ".")
+    try:
+        number = float(digits)
+    except ValueError:
+        return None, ""
+    return number, text[m.end():].strip()
+
+
+class _Column:
+    """Columna codificada: códigos por fila, valores distintos y floats opcionales"""
+
+    __slots__ = ("codes", "levels", "index", "numbers", "_parsed")
+
+    def __init__(self, numeric: bool):
+        self.codes = array("I")
+        self.levels: List[Optional[str]] = list(_RESERVED)
+        self.index: Dict[str, int] = {value: code for code, value in enumerate(_RESERVED) if value is not None}
+        self.numbers = array("d") if numeric else None
+        self._parsed: List[Tuple[float, str]] = []
+
+    def extend(self, values: List[Optional[str]]) -> None:
+        codes, index, levels, numbers = self.codes, self.index, self.levels, self.numbers
+        for value in values:
+            if numbers is not None:
+                number = _as_number(value) if isinstance(value, str) else None
+                if number is not None:
+                    codes.append(_NUMBER)
+                    numbers.append(number)
+                    continue
+                numbers.append(math.nan)
+            code = index.get(value) if value is not None else _ABSENT
+            if code is None:
+                code = index[value] = len(levels)
+                levels.append(sys.intern(value) if isinstance(value, str) else value)
+            codes.append(code)
+
+    def get(self, row: int):
+        code = self.codes[row]
+        if code == _NUMBER:
+            return repr(self.numbers[row])
+        return self.levels[code]
+
+    def parsed_levels(self) -> List[Tuple[float, str]]:
+        """(número o NaN, unidad) de cada valor distinto; cada texto se analiza una sola vez"""
+        for level in self.levels[len(self._parsed):]:
+            number, unit = (None, "")
+            if isinstance(level, str) and level not in SENTINELS:
+                number, unit = parse_number(level)
+            elif isinstance(level, (int, float)) and not isinstance(level, bool):
+                number = float(level)
+            self._parsed.append((math.nan if number is None else number, unit))
+        return self._parsed
+
+    def values(self, start: int, stop: int) -> List[Optional[str]]:
+        """Valores decodificados de las filas start..stop-1 (None si falta la clave)"""
+        levels = self.levels
+        if self.numbers is None:
+            return [levels[code] for code in self.codes[start:stop]]
+        return [levels[code] if code else repr(number)
+                for code, number in zip(self.codes[start:stop], self.numbers[start:stop])]
+
+
+class RecordStore:
+    """Registros de extracción en columnas, con acceso como lista de dicts.
+
+    ``store[i]`` y la iteración devuelven dicts nuevos con las mismas claves y
+    valores que los registros agregados. Las claves fuera de RECORD_KEYS se
+    conservan aparte, por registro.
+    """
+
+    __slots__ = ("_size", "_columns", "_extra")
+
+    def __init__(self, records: Iterable[Dict[str, str]] = ()):
+        self._size = 0
+        self._columns = {key: _Column(key in NUMERIC_FIELDS) for key in RECORD_KEYS}
+        self._extra: Dict[int, Dict[str, str]] = {}
+        self.extend(records)
+
+    def append(self, record: Dict[str, str]) -> None:
+        self.extend([record])
+
+    def extend(self, records: Iterable[Dict[str, str]]) -> None:
+        records = list(records)
+        if not records:
+            return
+        for key, column in self._columns.items():
+            column.extend([record.get(key) for record in records])
+        for offset, record in enumerate(records):
+            extra_keys = record.keys() - self._columns.keys()
+            if extra_keys:
+                self._extra[self._size + offset] = {k: v for k, v in record.items() if k in extra_keys}
+        # El tamaño se actualiza al final: los lectores concurrentes solo ven filas completas
+        self._size += len(records)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __getitem__(self, row: int) -> Dict[str, str]:
+        if row < 0:
+            row += self._size
+        if not 0 <= row < self._size:
+            raise IndexError("registro fuera de rango")
+        record = {}
+        for key, column in self._columns.items():
+            value = column.get(row)
+            if value is not None:
+                record[key] = value
+        extra = self._extra.get(row)
+        if extra:
+            record.update(extra)
+        return record
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        # Se decodifica por bloques de filas, columna a columna
+        for start in range(0, self._size, ITER_BLOCK_ROWS):
+            stop = min(start + ITER_BLOCK_ROWS, self._size)
+            columns = [column.values(start, stop) for column in self._columns.values()]
+            for offset, values in enumerate(zip(*columns)):
+                record = dict(zip(RECORD_KEYS, values))
+                if values[-1] is None:
+                    # Sin archivo de origen (registros de un solo PDF)
+                    del record[SOURCE_KEY]
+                if None in record.values():
+                    record = {key: value for key, value in record.items() if value is not None}
+                extra = self._extra.get(start + offset)
+                if extra:
+                    record.update(extra)
+                yield record
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """Lista de dicts para serializar (JSON, caché)"""
+        return list(self)
+
+    def column(self, key: str) -> List[Optional[str]]:
+        """Valores de una columna, sin reconstruir los registros"""
+        return self._columns[key].values(0, self._size)
+
+    def numbers(self, key: str, rows: Optional[Sequence[int]] = None):
+        """Columna como floats (NaN donde falta el valor o no es numérico).
+
+        Los textos con unidades o coma decimal se convierten una sola vez por
+        valor distinto y se reparten por código. Con numpy devuelve un
+        ``ndarray``; sin él, un ``array('d')``. ``rows`` selecciona y ordena filas.
+        """
+        column = self._columns[key]
+        size = self._size
+        level_numbers = [number for number, _ in column.parsed_levels()]
+        codes = column.codes[:size]
+        stored = column.numbers[:size] if column.numbers is not None else None
+
+        if np is not None:
+            codes_np = np.frombuffer(codes, dtype=np.uint32) if size else np.zeros(0, dtype=np.uint32)
+            values = np.asarray(level_numbers, dtype=np.float64)[codes_np]
+            if stored is not None and size:
+                values = np.where(codes_np == _NUMBER, np.frombuffer(stored, dtype=np.float64), values)
+            return values[np.asarray(rows, dtype=np.intp)] if rows is not None else values
+
+        if stored is not None:
+            values = array("d", (stored[i] if code == _NUMBER else level_numbers[code]
+                                 for i, code in enumerate(codes)))
+        else:
+            values = array("d", (level_numbers[code] for code in codes))
+        return array("d", (values[i] for i in rows)) if rows is not None else values
+
+    def units(self, key: str) -> List[str]:
+        """Unidad separada del número en cada fila ("" si no había)"""
+        column = self._columns[key]
+        level_units = [unit for _, unit in column.parsed_levels()]
+        return [level_units[code] for code in column.codes[:self._size]]
+
+    def order_by(self, key: str) -> List[int]:
+        """Índices de las filas ordenadas por el texto de ``key`` sin distinguir mayúsculas"""
+        keys = [(value or "").upper() for value in self._columns[key].values(0, self._size)]
+        return sorted(range(self._size), key=keys.__getitem__)
@@ -0,0 +1,243 @@
+import json
+import os
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pdfminer.layout import LTChar, LTContainer
+from pdfplumber.page import DerivedPage
+
+from api.fields import NOT_AVAILABLE, NOT_FOUND
+
+# Extracción por regiones: los extractores solo leen cinco bloques de la
+# página (datos de la muestra, parámetros físicos y químicos, fertilidad,
+# micronutrientes y relaciones entre cationes). Una vez conocidas sus
+# regiones, solo los caracteres que caen dentro se convierten a objetos de
+# pdfplumber y se agrupan en palabras; encabezados, logotipos, pies de página
+# y notas de metodología se descartan antes de ese trabajo.
+#
+# Cada región es una banda horizontal de página completa: un valor más ancho
+# que los vistos al aprender no se recorta, porque las filas se conservan
+# enteras.
+
+# "off" (por defecto), "learn" (regiones aprendidas por documento), o la ruta
+# de un JSON con regiones fijas: {"nombre": [x0, top, x1, bottom], ...} en
+# puntos de página (solo se usan top y bottom)
+REGIONS_SETTING = os.environ.get("SCANER_REGIONS", "off")
+
+REGION_PAGES = 3        # Páginas en que el recorte debe dar el mismo registro que la página completa
+REGION_MARGIN = 6.0     # Margen alrededor de cada región (puntos)
+REGION_MAX_FAILURES = 3  # Desacuerdos tolerados antes de dejar de aprender en el documento
+
+# Secciones en orden vertical y la palabra que abre cada una
+SECTION_ANCHORS: Tuple[Tuple[str, str], ...] = (
+    ("datos", "DATOS"),
+    ("parametros", "RESULTADOS"),
+    ("fertilidad", "FERTILIDAD"),
+    ("micronutrientes", "MICRONUTRIENTES"),
+    ("relaciones", "RELACIONES"),
+)
+RELATIONS_ROWS = 4  # Título, encabezado, valores e interpretación
+ROW_GAP = 3         # Separación vertical mínima entre filas distintas (puntos)
+
+Region = Tuple[float, float, float, float]  # (x0, top, x1, bottom)
+Regions = Dict[str, Region]
+
+
+class RegionPage(DerivedPage):
+    """Vista de una página con solo los caracteres cuyo centro cae en la banda de alguna región.
+
+    A diferencia de ``page.crop()``/``within_bbox()``, que filtran los objetos
+    ya convertidos de la página completa, aquí los caracteres de fuera no
+    llegan a convertirse. Las coordenadas son las de la página original.
+    """
+
+    def __init__(self, parent_page, regions: Regions):
+        self.bbox = parent_page.bbox
+        self.initial_doctop = parent_page.initial_doctop
+        self.rotation = parent_page.rotation
+        self.bands = [(top, bottom) for _, top, _, bottom in regions.values()]
+        super().__init__(parent_page)
+
+    def _inside(self, y0: float, y1: float) -> bool:
+        y = self.height - (y0 + y1) / 2.0
+        for top, bottom in self.bands:
+            if top <= y <= bottom:
+                return True
+        return False
+
+    @property
+    def objects(self) -> Dict[str, List[dict]]:
+        if hasattr(self, "_objects"):
+            return self._objects
+        parent = self.parent_page
+        if hasattr(parent, "_objects"):
+            # La página completa ya se convirtió: basta con filtrar
+            chars = [c for c in parent.chars if self._inside(c["y0"], c["y1"])]
+        else:
+            chars = [self.process_object(obj) for obj in _iter_chars(parent.layout._objs)
+                     if self._inside(obj.y0, obj.y1)]
+        self._objects = {"char": chars}
+        return self._objects
+
+
+def _iter_chars(objs):
+    for obj in objs:
+        if isinstance(obj, LTChar):
+            yield obj
+        elif isinstance(obj, LTContainer):
+            yield from _iter_chars(obj._objs)
+
+
+def section_regions(layout) -> Optional[Regions]:
+    """Regiones de las secciones a partir de sus anclas en una página completa.
+
+    Cada sección va desde su título hasta el título de la siguiente, con el
+    ancho completo de la página; la última termina en su fila de
+    interpretación. Devuelve None si falta alguna ancla, no están en orden o
+    faltan filas de la última sección.
+    """
+    rows = layout.rows
+    anchors = []
+    for name, text in SECTION_ANCHORS:
+        w = rows.first(lambda w, text=text: w["text"].upper() == text)
+        if w is None or (anchors and w["top"] <= anchors[-1][1]["top"]):
+            return None
+        anchors.append((name, w))
+
+    last_name, last = anchors[-1]
+    # Filas de la última sección; las coordenadas redondeadas de una misma
+    # fila (con ruido de posición) se agrupan
+    lines: List[int] = []
+    for y in rows.ys_between(last["ymid"] - 1, last["ymid"] + 200):
+        if not lines or y - lines[-1] > ROW_GAP:
+            lines.append(y)
+        if len(lines) > RELATIONS_ROWS:
+            break
+    if len(lines) < RELATIONS_ROWS:
+        return None
+    end = max(w["bottom"] for w in rows.within(lines[RELATIONS_ROWS - 1] - ROW_GAP,
+                                                lines[RELATIONS_ROWS - 1] + ROW_GAP))
+
+    x_min, top_min, x_max, bottom_max = layout.page.bbox
+    regions: Regions = {}
+    for i, (name, w) in enumerate(anchors):
+        top = w["top"] - REGION_MARGIN
+        bottom = anchors[i + 1][1]["top"] - REGION_MARGIN if i + 1 < len(anchors) else end + REGION_MARGIN
+        regions[name] = (x_min, max(top, top_min), x_max, min(bottom, bottom_max))
+    return regions
+
+
+def found_fields(record: Dict[str, str]) -> int:
+    """Campos del registro con valor encontrado"""
+    return sum(1 for value in record.values() if value not in (NOT_FOUND, NOT_AVAILABLE))
+
+
+def _envelope(samples: List[Regions]) -> Regions:
+    return {
+        name: (min(s[name][0] for s in samples), min(s[name][1] for s in samples),
+               max(s[name][2] for s in samples), max(s[name][3] for s in samples))
+        for name in samples[0]
+    }
+
+
+class DocumentRegions:
+    """Regiones de extracción de un documento.
+
+    En las primeras páginas de reporte se extrae la página completa y, además,
+    solo las regiones candidatas (las configuradas o las derivadas de las
+    anclas); tras ``pages`` coincidencias exactas quedan activas. Un registro
+    recortado se rechaza, y la página se procesa completa, si a la página
+    recortada le falta alguna sección entera (anclas y filas de relaciones) o
+    si tiene menos campos encontrados que los vistos al aprender; varios
+    rechazos seguidos descartan las regiones aprendidas para reaprenderlas.
+    """
+
+    def __init__(self, configured: Optional[Regions] = None, pages: int = REGION_PAGES):
+        self.configured = configured
+        self.pages = pages
+        self.regions: Optional[Regions] = None
+        self.min_found = 0
+        self.hits = 0
+        self.misses = 0
+        self._samples: List[Regions] = []
+        self._found: List[int] = []
+        self._failures = 0
+        self._misses_in_row = 0
+        self._lock = threading.Lock()
+
+    @property
+    def learning(self) -> bool:
+        return self.regions is None and self._failures < REGION_MAX_FAILURES
+
+    def observe(self, layout, record: Dict[str, str],
+                extract: Callable[[Regions], Dict[str, str]]) -> None:
+        """Compara el registro de la página completa con el de las regiones candidatas"""
+        if not self.learning:
+            return
+        candidate = self.configured or section_regions(layout)
+        if candidate is None:
+            return
+        matched = extract(candidate) == record
+
+        with self._lock:
+            if self.regions is not None:
+                return
+            if not matched:
+                self._failures += 1
+                self._samples, self._found = [], []
+                if self._failures == REGION_MAX_FAILURES:
+                    print("Regiones: el recorte no reproduce la página completa; se usa la página completa")
+                return
+            self._samples.append(candidate)
+            self._found.append(found_fields(record))
+            if len(self._samples) == self.pages:
+                self.regions = _envelope(self._samples)
+                self.min_found = min(self._found)
+                self._samples, self._found = [], []
+
+    def accept(self, layout, record: Dict[str, str]) -> bool:
+        """Decide si el registro extraído de las regiones (con su layout recortado) es confiable"""
+        # Una página desplazada respecto de las aprendidas deja filas fuera de las bandas
+        matched = section_regions(layout) is not None and found_fields(record) >= self.min_found
+        with self._lock:
+            if matched:
+                self.hits += 1
+                self._misses_in_row = 0
+                return True
+            self.misses += 1
+            self._misses_in_row += 1
+            if self._misses_in_row >= self.pages and self.configured is None:
+                self.regions = None
+                self._misses_in_row = 0
+            return False
+
+
+def _load_configured(setting: str) -> Optional[Regions]:
+    if setting.lower() in ("learn", "off", ""):
+        return None
+    try:
+        with open(setting, encoding="utf-8") as fh:
+            data = json.load(fh)
+        return {name: tuple(float(v) for v in bbox) for name, bbox in data.items()}
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Regiones: no se pudo leer {setting} ({e}); se aprenderán por documento")
+        return None
+
+
+REGIONS_ENABLED = REGIONS_SETTING.lower() != "off"
+CONFIGURED_REGIONS = _load_configured(REGIONS_SETTING)
+
+_regions: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_regions_lock = threading.Lock()
+
+
+def regions_for(pdf) -> Optional[DocumentRegions]:
+    """Regiones asociadas a un documento abierto, o None si el modo está desactivado"""
+    if not REGIONS_ENABLED:
+        return None
+    with _regions_lock:
+        regions = _regions.get(pdf)
+        if regions is None:
+            regions = _regions[pdf] = DocumentRegions(CONFIGURED_REGIONS)
+        return regions
@@ -1,142 +1,890 @@
-import pdfplumber
 import re
-import io
 import unicodedata
-from typing import Dict, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 import time
 import gc
-import psutil
+import contextlib
+import itertools
 import os
+import queue
+import threading
+from collections import deque
+
+from pdfminer.psparser import PSException
+
+from api.classify import PAGE_OTHER, PAGE_REPORT, classify_page
+from api.deadline import KILL_GRACE, POLL_INTERVAL, ExtractionLimits, PageTimeout, page_deadline
+from api.fields import CHEMICAL_SPECS, NOT_ANALYZED, NOT_AVAILABLE, NOT_FOUND, scan_fields
+from api.layout import PageLayout
+from api.memory import get_memory_governor
+from api.metrics import Timings, TimingsSnapshot, record_extraction, timed
+from api.pagecache import PageFingerprinter, get_page_cache
+from api.regions import RegionPage, regions_for
+from api.template import template_for, templated_search
+from api.records import RecordStore
+from api.pool import (abandon_ranges, busy_workers, get_process_pool, pool_generation, range_abandoned,
+                      shutdown_process_pool, terminate_process_pool, worker_heartbeat, worker_pdf, PROCESS_WORKERS)
+from api.source import PdfSource, materialize, open_pdf, spool_to_disk
 
 # Configuración optimizada para PDFs grandes
 MAX_WORKERS = min(8, os.cpu_count() or 4)  # Máximo 8 workers
 CHUNK_SIZE = 25  # Reducido para mejor manejo de memoria
-MEMORY_THRESHOLD = 80  # Porcentaje de memoria antes de limpiar
+PIPELINE_WINDOW = 25  # Páginas en vuelo al empezar (modo hilos); lo ajusta el gobernador
+MIN_WINDOW = 2        # Ventana mínima cuando la memoria está cerca del presupuesto
+MAX_WINDOW = 50       # Ventana máxima cuando sobra memoria
+REORDER_SLACK = 4     # Páginas despachadas por delante de la próxima a entregar, en ventanas
+DISPATCH_WINDOW = 2   # Rangos en vuelo por worker del pool de procesos
+EXTRACTION_MODE = os.environ.get("SCANER_MODE", "process")  # "process" o "thread"
+ITER_QUEUE_GROUPS = 4  # Grupos de registros sin consumir antes de frenar la extracción (iter_records)
+
+# Callback de avance: (páginas procesadas, total de páginas, registros encontrados)
+ProgressCallback = Callable[[int, int, int], None]
+# Callback de registros: recibe cada grupo de registros nuevos en cuanto está listo
+RecordsCallback = Callable[[List[Dict[str, str]]], None]
+# Registro con el número de página (desde 1) del que salió
+PageRecordPair = Tuple[int, Dict[str, str]]
+# Callback interno de los modos de extracción: los registros nuevos con su página
+PageRecordsCallback = Callable[[List[PageRecordPair]], None]
+# Resultado de una página: (registro o None, motivo de descarte: SKIP_CLASSIFIED, SKIP_ERROR o None)
+PageOutcome = Tuple[Optional[Dict[str, str]], Optional[str]]
+
+SKIP_CLASSIFIED = "clasificador"  # Motivo de descarte de las páginas que no son reportes
+SKIP_ERROR = "error"              # La página falló al procesarse: no se guarda en la caché de páginas
+
+# Identificador de cada rango enviado al pool, para reconocerlo en los latidos de los workers
+_range_tokens = itertools.count(1)
+
+_ITER_DONE = object()  # Fin de la extracción en la cola de iter_records
+
+# Expresiones compiladas una sola vez al importar el módulo
+_RELEVANT_RE = re.compile("|".join([
+    r"DATOS\s+Y\s+CONDICIONES",
+    r"Nombre\s+del\s+productor",
+    r"MICRONUTRIENTES",
+    r"FERTILIDAD\s+DEL\s+SUELO",
+    r"Hierro\s*\(Fe\)",
+    r"pH\s*\(",
+    r"Fósforo.*mg/kg",
+    r"RELACIONES\s+ENTRE\s+CATIONES"
+]), re.IGNORECASE)
+_DECIMAL_RE = re.compile(r"^\d+(?:[.,]\d+)?$")
+_NUMERIC_RE = re.compile(r"^[\d.,]+$")
+_LEADING_DIGIT_RE = re.compile(r"^\d")
+_MICRO_PARAM_RE = re.compile(r'(Hierro|Cobre|Zinc|Manganeso|Boro)\b.*', re.I)
+_WS_RE = re.compile(r'\s+')
+_MUY_BAJO_SPLIT_RE = re.compile(r"muy\s*baj\s*o")
+_MUY_BAJO_SPLIT2_RE = re.compile(r"muy\s*ba\s*jo")
+_MICRO_LABELS = [
+    (lab, re.compile(r'\b' + re.escape(lab) + r'\b'))
+    for lab in [
+        'moderadamente alto',
+        'moderadamente bajo',
+        'muy alto',
+        'muy bajo',
+        'alto',
+        'medio',
+        'bajo',
+    ]
+]
+_REL_ME100_RE = re.compile(r"\bme\s*/\s*100\b")
+_REL_NA_RE = re.compile(r"\bn\s*/\s*a\b")
+_REL_G_RE = re.compile(r"\bg\b")
+_FERT_HEADER_LABELS = ("M.O", "Fósforo", "Potasio", "Calcio", "Azufre")
+
+class _ProcessPoolFailure(Exception):
+    """El pool de procesos falló; conserva lo extraído antes de la falla"""
+
+    def __init__(self, cause: Exception, pages_done: int, resultados: RecordStore):
+        super().__init__(str(cause))
+        self.pages_done = pages_done
+        self.resultados = resultados
+
+class ExtractionError(Exception):
+    """La extracción no produjo resultado; el mensaje es el que se muestra al usuario"""
+
+class InvalidPdfError(ExtractionError):
+    """El archivo no es un PDF legible o no tiene páginas"""
+
+class NoRecordsError(ExtractionError):
+    """El PDF no contiene secciones de reporte reconocibles"""
+
+class PdfTooLargeError(ExtractionError):
+    """El PDF no cabe en la memoria disponible"""
+
+class ExtractionStopped(ExtractionError):
+    """La extracción se detuvo por plazo o cancelación; ``reason`` es STOP_DEADLINE o STOP_CANCELLED"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Extracción detenida ({reason})")
+        self.reason = reason
+
+class PageRecord(NamedTuple):
+    """Registro entregado por iter_records, con el número de página (desde 1) de la que salió"""
+    page: int
+    record: Dict[str, str]
+
+class _RecordCounter:
+    """Ocupa el lugar del RecordStore cuando los registros solo se entregan por callback"""
+
+    def __init__(self):
+        self.count = 0
+
+    def extend(self, records: List[Dict[str, str]]) -> None:
+        self.count += len(records)
+
+    def __len__(self) -> int:
+        return self.count
+
+def extract_data_from_pdf(source: PdfSource, mode: Optional[str] = None, workers: Optional[int] = None,
+                          progress: Optional[ProgressCallback] = None,
+                          on_records: Optional[RecordsCallback] = None,
+                          stats: Optional[Dict[str, Any]] = None,
+                          timings: Optional[Timings] = None,
+                          timeout: Optional[float] = None,
+                          cancel: Optional[threading.Event] = None) -> Sequence[Dict[str, str]]:
+    """Extrae los registros de un PDF dado como ruta en disco (preferido) o como bytes.
+
+    Devuelve un RecordStore con los registros, o una lista con un único dict
+    de error. ``on_records`` recibe los registros a medida que se completan
+    las páginas, para poder transmitirlos antes de que termine todo el
+    documento. Si se da ``stats``, se llena con los contadores de páginas de
+    la extracción, y ``timings`` con la duración de cada etapa (que además
+    se suma a las métricas globales de /metrics).
+
+    La extracción se detiene al vencer ``timeout`` (segundos; por defecto
+    SCANER_REQUEST_TIMEOUT, 0 = sin plazo) o al activarse ``cancel``, y
+    devuelve los registros obtenidos hasta entonces (``stats["stopped"]``
+    indica el motivo). Las páginas que superan SCANER_PAGE_TIMEOUT se
+    omiten y quedan en ``stats["timed_out_pages"]``; si todas las páginas
+    analizadas se omitieron, el resultado es un RecordStore vacío.
+    """
+    def on_page_records(pairs: List[PageRecordPair]) -> None:
+        on_records([registro for _, registro in pairs])
 
-def extract_data_from_pdf(pdf_bytes: bytes) -> List[Dict[str, str]]:
-    resultados: List[Dict[str, str]] = []
+    try:
+        return _run_extraction(source, mode, workers, progress, on_page_records if on_records else None,
+                               stats, timings, timeout, cancel, RecordStore())
+    except ExtractionError as e:
+        return [{"error": str(e)}]
+
+def iter_records(source: Union[PdfSource, BinaryIO], mode: Optional[str] = None, workers: Optional[int] = None,
+                 progress: Optional[ProgressCallback] = None,
+                 stats: Optional[Dict[str, Any]] = None,
+                 timings: Optional[Timings] = None,
+                 timeout: Optional[float] = None,
+                 cancel: Optional[threading.Event] = None) -> Iterator[PageRecord]:
+    """Genera los registros de un PDF (ruta, bytes o archivo abierto) a medida que se procesan sus páginas.
+
+    Cada elemento es un PageRecord (página, registro), en orden de página;
+    ``progress`` se llama desde el hilo de la extracción.
+    La extracción corre en un hilo aparte y deja de despachar páginas cuando
+    hay ITER_QUEUE_GROUPS grupos de registros sin consumir, y los registros
+    entregados no se conservan: la memoria no crece con el documento aunque
+    el consumidor sea lento. Cerrar el generador cancela la extracción.
+
+    En lugar de devolver ``[{"error": ...}]`` lanza InvalidPdfError,
+    NoRecordsError, PdfTooLargeError o ExtractionError; si vence ``timeout``
+    o se activa ``cancel``, lanza ExtractionStopped después de entregar lo
+    extraído hasta ese momento.
+    """
+    stats = stats if stats is not None else {}
+    groups: "queue.Queue" = queue.Queue(maxsize=ITER_QUEUE_GROUPS)
+    stop = threading.Event()    # Detiene la extracción (cancelación externa o generador cerrado)
+    closed = threading.Event()  # El consumidor ya no recibe más grupos
+
+    def put(item) -> None:
+        # Espera lugar en la cola; si el generador se cerró, el grupo se descarta
+        while not closed.is_set():
+            try:
+                groups.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                pass
+
+    def produce(pdf_path: str) -> None:
+        try:
+            _run_extraction(pdf_path, mode, workers, progress, put, stats, timings, timeout, stop, _RecordCounter())
+        except BaseException as e:
+            put(e)
+        else:
+            put(_ITER_DONE)
+
+    def forward_cancel() -> None:
+        # La extracción revisa un solo evento: se le pasa la cancelación externa
+        while not stop.is_set():
+            if cancel.wait(POLL_INTERVAL):
+                stop.set()
+
+    with contextlib.ExitStack() as stack:
+        if isinstance(source, (str, os.PathLike, bytes, bytearray, memoryview)):
+            pdf_path = stack.enter_context(materialize(source))
+        else:
+            # Archivo abierto: se copia a disco por bloques (los workers necesitan una ruta)
+            pdf_path, _, _ = spool_to_disk(source)
+            stack.callback(os.unlink, pdf_path)
+
+        producer = threading.Thread(target=produce, args=(pdf_path,), name="scaner-iter", daemon=True)
+        producer.start()
+        if cancel is not None:
+            threading.Thread(target=forward_cancel, name="scaner-iter-cancel", daemon=True).start()
+        try:
+            while True:
+                item = groups.get()
+                if item is _ITER_DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                for page, registro in item:
+                    yield PageRecord(page, registro)
+        finally:
+            closed.set()
+            stop.set()
+            producer.join()
+
+    if stats.get("stopped"):
+        raise ExtractionStopped(stats["stopped"])
+
+def _run_extraction(source: PdfSource, mode: Optional[str], workers: Optional[int],
+                    progress: Optional[ProgressCallback],
+                    on_records: Optional[PageRecordsCallback],
+                    stats: Optional[Dict[str, Any]],
+                    timings: Optional[Timings],
+                    timeout: Optional[float],
+                    cancel: Optional[threading.Event],
+                    resultados):
+    """Núcleo de extract_data_from_pdf e iter_records: lanza ExtractionError en lugar de devolver el error.
+
+    Los registros se agregan a ``resultados`` (un RecordStore, o un
+    _RecordCounter si solo interesa ``on_records``), que se devuelve.
+    """
+    mode = (mode or EXTRACTION_MODE).lower()
+    stats = stats if stats is not None else {}
+    stats.update(pages_total=0, pages_cached=0, pages_skipped=0, pages_analyzed=0,
+                 pages_timed_out=0, timed_out_pages=[], pages_failed=0, failed_pages=[],
+                 pages_unprocessed=0, stopped=None)
+    timings = timings if timings is not None else Timings()
+    limits = ExtractionLimits(timeout=timeout, cancel=cancel)
+    governor = get_memory_governor()
+    ok = False
     
     try:
-        # Monitoreo de memoria inicial
-        initial_memory = psutil.virtual_memory().percent
-        print(f"Memoria inicial: {initial_memory:.1f}%")
+        # Memoria del proceso y sus workers (no la del equipo completo)
+        print(f"Memoria inicial: {governor.usage(fresh=True) / 2**20:.0f} MB "
+              f"(presupuesto {governor.budget / 2**20:.0f} MB)")
         
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            total_pages = len(pdf.pages)
-            print(f"Procesando PDF con {total_pages} páginas...")
-            
-            if total_pages == 0:
-                return [{"error": "El PDF no contiene páginas válidas"}]
-            
-            start_time = time.time()
-            
-            # Procesamiento por lotes más pequeños para PDFs grandes
-            batch_size = CHUNK_SIZE if total_pages < 500 else max(10, CHUNK_SIZE // 2)
-            
-            # Procesar en lotes con liberación de memoria
-            for batch_start in range(0, total_pages, batch_size):
-                batch_end = min(batch_start + batch_size, total_pages)
-                batch_pages = list(range(batch_start, batch_end))
-                
-                print(f"Procesando lote {batch_start//batch_size + 1}: páginas {batch_start+1}-{batch_end}")
-                
-                # Procesar lote actual
-                batch_results = process_page_batch(pdf, batch_pages)
-                resultados.extend(batch_results)
-                
-                # Limpieza de memoria cada lote
-                gc.collect()
-                
-                # Verificar memoria y pausar si es necesario
-                current_memory = psutil.virtual_memory().percent
-                if current_memory > MEMORY_THRESHOLD:
-                    print(f"Memoria alta ({current_memory:.1f}%), liberando recursos...")
-                    time.sleep(0.5)  # Pausa breve para liberar memoria
-                    gc.collect()
-            
-            end_time = time.time()
-            final_memory = psutil.virtual_memory().percent
-            print(f"Procesamiento completado en {end_time - start_time:.2f} segundos")
-            print(f"Memoria final: {final_memory:.1f}%")
-            print(f"Registros extraídos: {len(resultados)}")
-            
-            return resultados if resultados else [{"error": "No se encontraron secciones requeridas en el PDF"}]
+        start_time = time.time()
+        
+        with governor.extraction():
+            if mode == "process":
+                try:
+                    total = _extract_with_process_pool(source, workers, progress, on_records, stats, timings,
+                                                       limits, resultados)
+                except _ProcessPoolFailure as e:
+                    # Sin soporte de multiprocessing (p. ej. entornos serverless) o pool roto:
+                    # continuar con hilos desde la primera página pendiente
+                    print(f"Pool de procesos no disponible ({e}), usando hilos desde la página {e.pages_done + 1}")
+                    shutdown_process_pool()
+                    total = _extract_with_threads(source, progress, on_records, stats, timings, limits,
+                                                  resultados, e.pages_done)
+            else:
+                total = _extract_with_threads(source, progress, on_records, stats, timings, limits, resultados)
+        
+        if total is None:
+            raise InvalidPdfError("El PDF no contiene páginas válidas")
+        
+        end_time = time.time()
+        print(f"Procesamiento completado en {end_time - start_time:.2f} segundos")
+        print(f"Memoria final: {governor.usage(fresh=True) / 2**20:.0f} MB (pico {governor.peak / 2**20:.0f} MB)")
+        print(f"Registros extraídos: {len(resultados)}")
+        print(f"Páginas: {stats['pages_analyzed']} analizadas, {stats['pages_skipped']} descartadas "
+              f"por el clasificador, {stats['pages_cached']} desde la caché")
+        if stats["stopped"] or stats["pages_timed_out"] or stats["pages_failed"]:
+            stats["timed_out_pages"].sort()
+            stats["failed_pages"].sort()
+            stats["pages_unprocessed"] = stats["pages_total"] - sum(
+                stats[key] for key in ("pages_analyzed", "pages_skipped", "pages_cached", "pages_timed_out",
+                                       "pages_failed"))
+            print(f"Resultado parcial: {stats['pages_timed_out']} páginas con tiempo agotado, "
+                  f"{stats['pages_failed']} con error, {stats['pages_unprocessed']} sin procesar "
+                  f"(detenida: {stats['stopped'] or 'no'})")
+        
+        ok = bool(resultados)
+        # Sin registros pero con páginas omitidas (tiempo o error) el resultado es parcial (vacío), no un error
+        if not resultados and not (stats["stopped"] or stats["pages_timed_out"] or stats["pages_failed"]):
+            raise NoRecordsError("No se encontraron secciones requeridas en el PDF")
+        return resultados
     
+    except ExtractionError:
+        raise
     except MemoryError:
         print("Error de memoria durante el procesamiento")
         gc.collect()
-        return [{"error": "El archivo PDF es demasiado grande para la memoria disponible"}]
+        raise PdfTooLargeError("El archivo PDF es demasiado grande para la memoria disponible")
+    except PSException as e:
+        # pdfminer no pudo leer la estructura del archivo
+        print(f"Error general: {str(e)}")
+        raise InvalidPdfError(f"Error al procesar el PDF: {str(e)}") from e
     except Exception as e:
         print(f"Error general: {str(e)}")
-        return [{"error": f"Error al procesar el PDF: {str(e)}"}]
-
-def process_page_batch(pdf, page_indices: List[int]) -> List[Dict[str, str]]:
-    """Procesa un lote de páginas de manera más eficiente"""
-    batch_results = []
+        raise ExtractionError(f"Error al procesar el PDF: {str(e)}") from e
+    finally:
+        record_extraction(timings, stats, ok)
+
+def _extract_with_threads(source: PdfSource, progress: Optional[ProgressCallback] = None,
+                          on_records: Optional[PageRecordsCallback] = None,
+                          stats: Optional[Dict[str, Any]] = None,
+                          timings: Optional[Timings] = None,
+                          limits: Optional[ExtractionLimits] = None,
+                          resultados: Optional[RecordStore] = None,
+                          start_page: int = 0) -> Optional[RecordStore]:
+    """Extracción en flujo continuo con ThreadPoolExecutor sobre un único PDF abierto.
+
+    Un solo pool de hilos para todo el documento: las páginas se despachan en
+    orden manteniendo una ventana de páginas en vuelo (que ajusta el
+    gobernador de memoria), cada hilo toma la siguiente en cuanto termina y
+    los resultados se reordenan para entregarse siempre en orden de página.
+    Una página lenta no detiene a las demás: solo retiene la entrega de las
+    posteriores, con un búfer de reorden acotado. Por ciclo se mide la
+    espera de páginas (``batch_wait``) y el trabajo de despacho y entrega
+    (``batch_schedule``).
+
+    Una página que supera su tiempo se abandona: su hilo no se puede
+    detener, así que las páginas que aún no empezaron pasan a un pool de
+    hilos nuevo y el resultado de la abandonada se descarta. Al vencer el
+    plazo o cancelarse se entregan también las páginas ya terminadas fuera
+    de orden y no se espera a las que siguen en curso.
+    """
+    resultados = resultados if resultados is not None else RecordStore()
+    stats = stats if stats is not None else {}
+    limits = limits if limits is not None else ExtractionLimits()
     
-    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(page_indices))) as executor:
-        # Crear futures para cada página
-        futures = {}
-        for page_idx in page_indices:
-            try:
-                page = pdf.pages[page_idx]
-                future = executor.submit(process_single_page_optimized, page, page_idx + 1)
-                futures[future] = page_idx + 1
-            except Exception as e:
-                print(f"Error al crear future para página {page_idx + 1}: {e}")
-                continue
+    with open_pdf(source) as pdf:
+        total_pages = len(pdf.pages)
+        stats["pages_total"] = total_pages
+        print(f"Procesando PDF con {total_pages} páginas...")
+        
+        if total_pages == 0:
+            return None
+        
+        governor = get_memory_governor()
+        window = PIPELINE_WINDOW
+        page_cache = get_page_cache()
+        fingerprinter = PageFingerprinter() if page_cache.enabled else None
+        
+        in_flight: Dict[Future, Tuple[int, Optional[str]]] = {}
+        ready: Dict[int, Optional[Dict[str, str]]] = {}  # Terminadas, a la espera de las anteriores
+        started: Dict[int, float] = {}  # Inicio de cada página en curso (time.monotonic)
+        next_page = start_page  # Próxima página por despachar
+        next_emit = start_page  # Próxima página por entregar
+        
+        def resubmit(executor: ThreadPoolExecutor, key: Tuple[int, Optional[str]]) -> Future:
+            return executor.submit(_process_and_release, pdf.pages[key[0]], key[0] + 1, timings, started)
         
-        # Recolectar resultados conforme van completándose
-        for future in as_completed(futures):
-            page_num = futures[future]
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        try:
+            while next_emit < total_pages:
+                stopped = limits.stop_reason()
+                if stopped:
+                    stats["stopped"] = stopped
+                    break
+                cycle_started = time.perf_counter()
+                
+                # Despachar mientras haya lugar en la ventana, en el búfer de
+                # reorden y en el presupuesto de memoria
+                while (next_page < total_pages and len(in_flight) < window
+                       and next_page - next_emit < window * REORDER_SLACK):
+                    if in_flight and governor.over_budget():
+                        break
+                    if not in_flight:
+                        governor.wait_for_room()
+                    group = list(range(next_page, min(next_page + window - len(in_flight), total_pages)))
+                    next_page = group[-1] + 1
+                    
+                    # Solo las páginas sin huella conocida pasan por el análisis de layout
+                    fingerprints = _page_fingerprints(pdf, group, fingerprinter)
+                    cached = page_cache.get_many([fp for fp in fingerprints.values() if fp])
+                    for page_idx in group:
+                        fingerprint = fingerprints.get(page_idx)
+                        if fingerprint in cached:
+                            ready[page_idx] = cached[fingerprint]
+                            _count_pages(stats, 1, [])
+                            continue
+                        try:
+                            future = executor.submit(_process_and_release, pdf.pages[page_idx], page_idx + 1,
+                                                     timings, started)
+                        except Exception as e:
+                            print(f"Error al crear future para página {page_idx + 1}: {e}")
+                            ready[page_idx] = None
+                            _fail_page(stats, page_idx + 1)
+                            continue
+                        in_flight[future] = (page_idx, fingerprint)
+                
+                # Esperar solo si la siguiente página en orden aún no terminó,
+                # revisando periódicamente plazos y cancelación
+                waited = 0.0
+                if next_emit not in ready:
+                    wait_started = time.perf_counter()
+                    done, _ = wait(in_flight, timeout=limits.wait_interval(), return_when=FIRST_COMPLETED)
+                    waited = time.perf_counter() - wait_started
+                    outcomes = []
+                    for future in done:
+                        page_idx, fingerprint = in_flight.pop(future)
+                        try:
+                            outcome = _page_outcome(future.result())
+                        except Exception as e:
+                            print(f"Error procesando página {page_idx + 1}: {str(e)}")
+                            ready[page_idx] = None
+                            _fail_page(stats, page_idx + 1)
+                            continue
+                        ready[page_idx] = outcome[0]
+                        outcomes.append((page_idx, fingerprint, outcome))
+                    page_cache.put_many((fingerprint, outcome[0]) for _, fingerprint, outcome in outcomes
+                                        if fingerprint and outcome[1] != SKIP_ERROR)
+                    _count_pages(stats, 0, [(page_idx + 1, outcome) for page_idx, _, outcome in outcomes])
+                    
+                    expired = _expired_pages(in_flight, started, limits)
+                    for page_idx in expired:
+                        ready[page_idx] = None
+                        _time_out_page(stats, page_idx + 1)
+                    if expired:
+                        executor = _replace_executor(executor, in_flight, resubmit, MAX_WORKERS)
+                
+                # Entregar el tramo contiguo ya terminado
+                registros = []
+                emitted = next_emit
+                while next_emit in ready:
+                    registro = ready.pop(next_emit)
+                    if registro:
+                        registros.append((next_emit + 1, registro))
+                    next_emit += 1
+                if registros:
+                    resultados.extend([registro for _, registro in registros])
+                    if on_records:
+                        on_records(registros)
+                if progress and next_emit > emitted:
+                    progress(next_emit, total_pages, len(resultados))
+                
+                window = governor.window_size(window, MIN_WINDOW, MAX_WINDOW)
+                
+                if timings is not None:
+                    timings.observe("batch_wait", waited)
+                    timings.observe("batch_schedule", time.perf_counter() - cycle_started - waited)
+            
+            if stats.get("stopped"):
+                # Resultado parcial: lo ya terminado después del último tramo entregado, en orden
+                print(f"Extracción detenida ({stats['stopped']}) en la página {next_emit + 1} de {total_pages}")
+                registros = [(idx + 1, ready[idx]) for idx in sorted(ready) if ready[idx]]
+                if registros:
+                    resultados.extend([registro for _, registro in registros])
+                    if on_records:
+                        on_records(registros)
+        finally:
+            # Al detenerse no se espera a las páginas en curso; las pendientes se cancelan
+            executor.shutdown(wait=not in_flight, cancel_futures=True)
+    
+    return resultados
+
+def _extract_with_process_pool(source: PdfSource, workers: Optional[int] = None,
+                               progress: Optional[ProgressCallback] = None,
+                               on_records: Optional[PageRecordsCallback] = None,
+                               stats: Optional[Dict[str, Any]] = None,
+                               timings: Optional[Timings] = None,
+                               limits: Optional[ExtractionLimits] = None,
+                               resultados: Optional[RecordStore] = None) -> Optional[RecordStore]:
+    """Extracción con el pool de procesos persistente.
+
+    Los workers comparten el PDF en disco (si llegó como bytes se escribe una
+    vez a un archivo temporal); cada worker lo abre una sola vez y procesa
+    rangos de páginas, devolviendo solo los registros válidos. Los rangos se
+    recogen en orden de envío, por lo que el resultado respeta el orden de
+    las páginas. Las páginas cuya huella ya está en la caché de páginas no se
+    envían a los workers. Cada worker devuelve también la duración de sus
+    etapas, que se suma a ``timings``.
+
+    Se mantienen como mucho ``DISPATCH_WINDOW`` rangos por worker en vuelo;
+    si la memoria del proceso y sus workers supera el presupuesto, no se
+    envían rangos nuevos hasta recoger los pendientes.
+
+    Cada worker corta por sí mismo las páginas que superan su tiempo. Si uno
+    no responde (por ejemplo, bloqueado en código nativo), su latido lo
+    delata: se recicla el pool, la página se da por agotada y los rangos en
+    vuelo se vuelven a enviar sin ella.
+    """
+    page_cache = get_page_cache()
+    stats = stats if stats is not None else {}
+    limits = limits if limits is not None else ExtractionLimits()
+    
+    with materialize(source) as pdf_path:
+        with open_pdf(pdf_path) as pdf:
+            total_pages = len(pdf.pages)
+            fingerprints = _page_fingerprints(pdf, range(total_pages),
+                                              PageFingerprinter() if page_cache.enabled else None)
+        stats["pages_total"] = total_pages
+        print(f"Procesando PDF con {total_pages} páginas (pool de procesos)...")
+        
+        if total_pages == 0:
+            return None
+        
+        cached = page_cache.get_many([fp for fp in fingerprints.values() if fp])
+        pending = [idx for idx in range(total_pages) if fingerprints.get(idx) not in cached]
+        if cached:
+            print(f"{total_pages - len(pending)} páginas sin cambios recuperadas de la caché")
+        
+        def collect(pages: List[int], future: Optional[Future]) -> List[PageRecordPair]:
+            """(página, registro) de un rango terminado; suma contadores, caché y tiempos"""
+            if future is None:
+                _count_pages(stats, len(pages), [])
+                return [(idx + 1, cached[fingerprints[idx]]) for idx in pages if cached[fingerprints[idx]]]
             try:
-                result = future.result(timeout=30)  # Timeout de 30 segundos por página
-                if result and not result.get('skip', False):
-                    batch_results.append(result)
+                page_results, worker_timings, timed_out = future.result()
+            except BrokenProcessPool:
+                raise
             except Exception as e:
-                print(f"Error procesando página {page_num}: {str(e)}")
-                continue
+                # El rango entero se pierde: sus páginas cuentan como fallidas (resultado parcial)
+                print(f"Error procesando páginas desde {pages[0] + 1}: {str(e)}")
+                for page_idx in pages:
+                    _fail_page(stats, page_idx + 1)
+                page_results, worker_timings, timed_out = [], {}, []
+            if timings is not None:
+                timings.merge(worker_timings)
+            for page_num in timed_out:
+                _time_out_page(stats, page_num)
+            page_cache.put_many((fingerprints[page_num - 1], registro) for page_num, (registro, reason) in page_results
+                                if fingerprints.get(page_num - 1) and reason != SKIP_ERROR)
+            _count_pages(stats, 0, page_results)
+            return [(page_num, registro) for page_num, (registro, _) in page_results if registro]
+        
+        resultados = resultados if resultados is not None else RecordStore()
+        pages_done = 0
+        try:
+            workers = workers or PROCESS_WORKERS
+            
+            # Rangos pequeños para repartir la carga, pero sin pasar de CHUNK_SIZE
+            range_size = max(1, min(CHUNK_SIZE, -(-len(pending) // (workers * 4))))
+            units = deque(_page_units(total_pages, set(pending), range_size))
+            window = workers * DISPATCH_WINDOW
+            governor = get_memory_governor()
+            # En vuelo: (páginas, future o None si vienen de la caché, token, generación del pool)
+            in_flight = deque()
+            
+            while units or in_flight:
+                stopped = limits.stop_reason()
+                if stopped:
+                    stats["stopped"] = stopped
+                    break
+                
+                # Enviar rangos mientras haya lugar en la ventana y memoria disponible
+                while units and len(in_flight) < window:
+                    pages, computed = units[0]
+                    if computed:
+                        if in_flight and governor.over_budget():
+                            break
+                        if not in_flight:
+                            governor.wait_for_room()
+                    units.popleft()
+                    if computed:
+                        token = next(_range_tokens)
+                        generation = pool_generation()
+                        future = get_process_pool(workers).submit(_process_page_range, pdf_path, pages, token,
+                                                                  limits.page_timeout)
+                        in_flight.append((pages, future, token, generation))
+                    else:
+                        in_flight.append((pages, None, 0, 0))
+                
+                pages, future, _, generation = in_flight[0]
+                unit_started = time.perf_counter()
+                waited = 0.0
+                if future is not None:
+                    # Esperar el rango más antiguo revisando plazos, cancelación y workers colgados
+                    hung = None
+                    while not future.done() and not limits.stop_reason():
+                        wait([future], timeout=limits.wait_interval())
+                        hung = _hung_page(in_flight, limits)
+                        if hung is not None:
+                            break
+                    waited = time.perf_counter() - unit_started
+                    
+                    if hung is not None:
+                        print(f"Página {hung + 1}: el worker no responde tras "
+                              f"{limits.page_timeout + KILL_GRACE:.0f} s, se recicla el pool")
+                        terminate_process_pool()
+                        _time_out_page(stats, hung + 1)
+                        _requeue_in_flight(in_flight, units, hung)
+                        continue
+                    if not future.done():
+                        continue  # Plazo vencido o cancelada: se detiene al inicio del ciclo
+                    if generation != pool_generation() and (future.cancelled()
+                                                            or isinstance(future.exception(), BrokenProcessPool)):
+                        # Otra extracción recicló el pool: volver a enviar lo que estaba en vuelo
+                        _requeue_in_flight(in_flight, units)
+                        continue
+                
+                in_flight.popleft()
+                registros = collect(pages, future)
+                end = pages[-1] + 1
+                resultados.extend([registro for _, registro in registros])
+                if on_records and registros:
+                    on_records(registros)
+                pages_done = end
+                if progress:
+                    progress(end, total_pages, len(resultados))
+                if timings is not None:
+                    if future is not None:
+                        timings.observe("batch_wait", waited)
+                    timings.observe("batch_schedule", time.perf_counter() - unit_started - waited)
+            
+            if stats.get("stopped"):
+                # Resultado parcial: los rangos en vuelo que ya terminaron, en orden; el resto se cancela
+                # (los que un worker ya tomó se cortan en su siguiente página)
+                print(f"Extracción detenida ({stats['stopped']}) en la página {pages_done + 1} de {total_pages}")
+                registros = []
+                abandoned = []
+                for pages, future, token, _ in in_flight:
+                    if future is None or (future.done() and not future.cancelled() and future.exception() is None):
+                        registros.extend(collect(pages, future))
+                    elif not future.cancel():
+                        abandoned.append(token)
+                abandon_ranges(abandoned)
+                if registros:
+                    resultados.extend([registro for _, registro in registros])
+                    if on_records:
+                        on_records(registros)
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            raise _ProcessPoolFailure(e, pages_done, resultados)
+        
+        return resultados
+
+def _hung_page(in_flight, limits: ExtractionLimits) -> Optional[int]:
+    """Página de esta extracción en la que un worker lleva más que su tiempo más el margen"""
+    tokens = {token for _, future, token, _ in in_flight if future is not None}
+    for token, page_idx, started in busy_workers():
+        if token in tokens and limits.page_expired(started, KILL_GRACE):
+            return page_idx
+    return None
+
+def _requeue_in_flight(in_flight, units, skip_page: Optional[int] = None) -> None:
+    """Devuelve al frente de la cola, en orden, los rangos en vuelo (sin la página colgada)"""
+    for pages, future, _, _ in reversed(in_flight):
+        if future is not None:
+            future.cancel()
+        pages = [idx for idx in pages if idx != skip_page]
+        if pages:
+            units.appendleft((pages, future is not None))
+    in_flight.clear()
+
+def _page_fingerprints(pdf, page_indices, fingerprinter: Optional[PageFingerprinter]) -> Dict[int, str]:
+    """Huella de cada página (las que no se pueden calcular simplemente no se cachean)"""
+    fingerprints = {}
+    if fingerprinter is None:
+        return fingerprints
+    
+    for page_idx in page_indices:
+        try:
+            fingerprints[page_idx] = fingerprinter.page(pdf.pages[page_idx])
+        except Exception as e:
+            print(f"No se pudo calcular la huella de la página {page_idx + 1}: {e}")
+    return fingerprints
+
+def _page_units(total_pages: int, pending: set, range_size: int) -> List[Tuple[List[int], bool]]:
+    """Divide el documento en tramos consecutivos: en caché o por procesar (de hasta range_size)"""
+    units = []
+    for page_idx in range(total_pages):
+        computed = page_idx in pending
+        if units and units[-1][1] == computed and (not computed or len(units[-1][0]) < range_size):
+            units[-1][0].append(page_idx)
+        else:
+            units.append(([page_idx], computed))
+    return units
+
+def _page_outcome(result: Optional[Dict[str, str]]) -> PageOutcome:
+    """Registro de la página (None si se descartó) y el motivo del descarte, si lo hay"""
+    if result and not result.get('skip', False):
+        return result, None
+    return None, result.get('reason') if result else None
+
+def _count_pages(stats: Dict[str, Any], cached: int, outcomes: Iterable[Tuple[int, PageOutcome]]) -> None:
+    """Suma a los contadores las páginas de caché y las procesadas (número de página, resultado)"""
+    stats["pages_cached"] = stats.get("pages_cached", 0) + cached
+    for page_num, (_, reason) in outcomes:
+        if reason == SKIP_ERROR:
+            _fail_page(stats, page_num)
+            continue
+        key = "pages_skipped" if reason == SKIP_CLASSIFIED else "pages_analyzed"
+        stats[key] = stats.get(key, 0) + 1
+
+def _time_out_page(stats: Dict[str, Any], page_num: int) -> None:
+    """Registra una página omitida por superar su tiempo"""
+    stats["pages_timed_out"] = stats.get("pages_timed_out", 0) + 1
+    stats.setdefault("timed_out_pages", []).append(page_num)
+
+def _fail_page(stats: Dict[str, Any], page_num: int) -> None:
+    """Registra una página omitida porque su procesamiento falló"""
+    stats["pages_failed"] = stats.get("pages_failed", 0) + 1
+    stats.setdefault("failed_pages", []).append(page_num)
+
+def _process_page_range(pdf_path: str, page_indices: List[int], token: int = 0,
+                        page_timeout: float = 0.0) -> Tuple[List[Tuple[int, PageOutcome]], TimingsSnapshot, List[int]]:
+    """Procesa páginas dentro de un worker del pool de procesos.
+
+    Devuelve (número de página, resultado) para todas las páginas, con None
+    como registro en las descartadas, para que también queden en la caché de
+    páginas, junto con la duración de las etapas medidas en el worker y los
+    números de las páginas que superaron ``page_timeout``. Antes de cada
+    página se actualiza el latido del worker con ``token``, y el rango se
+    corta si la extracción que lo envió lo abandonó.
+    """
+    registros = []
+    timed_out = []
+    timings = Timings()
     
-    return batch_results
+    with worker_pdf(pdf_path) as pdf:
+        try:
+            for page_idx in page_indices:
+                if range_abandoned(token):
+                    break  # La extracción se detuvo: el resto del rango ya no se espera
+                worker_heartbeat(token, page_idx)
+                page = pdf.pages[page_idx]
+                try:
+                    with page_deadline(page_timeout):
+                        result = process_single_page_optimized(page, page_idx + 1, timings)
+                except PageTimeout:
+                    print(f"Página {page_idx + 1}: tiempo agotado ({page_timeout:.0f} s), se omite")
+                    timed_out.append(page_idx + 1)
+                    continue
+                finally:
+                    # Liberar el layout de la página (también el de una interrumpida);
+                    # el worker vive entre peticiones
+                    release_page(page)
+            
+                registros.append((page_idx + 1, _page_outcome(result)))
+        finally:
+            worker_heartbeat()
+    
+    return registros, timings.snapshot(), timed_out
+
+def _expired_pages(futures: Dict[Future, Tuple[int, Optional[str]]], started: Dict[int, float],
+                   limits: ExtractionLimits) -> List[int]:
+    """Quita de ``futures`` las páginas en curso que superaron su tiempo y devuelve sus índices"""
+    expired = []
+    for future, (page_idx, _) in list(futures.items()):
+        if page_idx in started and not future.done() and limits.page_expired(started[page_idx]):
+            print(f"Página {page_idx + 1}: tiempo agotado ({limits.page_timeout:.0f} s), se omite")
+            del futures[future]
+            expired.append(page_idx)
+    return expired
+
+def _replace_executor(executor: ThreadPoolExecutor, futures: Dict[Future, Any],
+                      resubmit: Callable[[ThreadPoolExecutor, Any], Future], workers: int) -> ThreadPoolExecutor:
+    """Deja el pool con hilos colgados y reenvía a uno nuevo las páginas que aún no empezaron"""
+    replacement = ThreadPoolExecutor(max_workers=workers)
+    for future, key in list(futures.items()):
+        if future.cancel():
+            del futures[future]
+            futures[resubmit(replacement, key)] = key
+    executor.shutdown(wait=False)
+    return replacement
+
+def release_page(page) -> None:
+    """Libera los objetos y el layout que pdfplumber guarda en caché para la página"""
+    page.flush_cache()
+    page.get_textmap.cache_clear()
+
+def _process_and_release(page, page_num: int, timings: Optional[Timings],
+                         started: Optional[Dict[int, float]] = None) -> Optional[Dict[str, str]]:
+    """Procesa la página y libera sus cachés en cuanto termina (el PDF sigue abierto).
+
+    En ``started`` se anota el inicio de la página (por índice) para controlar su tiempo.
+    """
+    if started is not None:
+        started[page_num - 1] = time.monotonic()
+    try:
+        return process_single_page_optimized(page, page_num, timings)
+    finally:
+        release_page(page)
+
+def process_single_page_optimized(page, page_num: int, timings: Optional[Timings] = None) -> Optional[Dict[str, str]]:
+    """Versión optimizada del procesamiento de una sola página.
+
+    Con ``timings`` se mide cada etapa y el total de la página (``page``).
+    """
+    with timed(timings, "page"):
+        return _process_page(page, page_num, timings)
 
-def process_single_page_optimized(page, page_num: int) -> Optional[Dict[str, str]]:
-    """Versión optimizada del procesamiento de una sola página"""
+def _process_page(page, page_num: int, timings: Optional[Timings]) -> Optional[Dict[str, str]]:
+    started = time.perf_counter()
     try:
-        # Extraer texto una sola vez
-        page_text = page.extract_text() or ""
+        # Pre-clasificación barata con el texto del content stream: las páginas
+        # que no son reportes de muestra no pasan por el análisis de layout
+        with timed(timings, "classify"):
+            page_kind = classify_page(page)
+        if page_kind == PAGE_OTHER:
+            return {"skip": True, "reason": SKIP_CLASSIFIED}
         
-        # Pre-filtro rápido - más específico
-        if not has_relevant_content(page_text):
+        template = template_for(page.pdf)
+        regions = regions_for(page.pdf) if page_kind == PAGE_REPORT else None
+
+        # Con las regiones del documento ya aprendidas, solo se analizan los
+        # caracteres de las secciones; si el resultado no es confiable se
+        # vuelve a la página completa
+        if regions is not None and regions.regions is not None:
+            registro = _extract_from_regions(page, regions, template, timings)
+            if registro is not None:
+                return registro
+        
+        # Layout de la página compartido por todos los extractores, con la
+        # plantilla de secciones aprendida para el documento
+        layout = PageLayout(page, template, timings)
+        
+        # Si el clasificador no pudo decidir, filtro sobre el texto completo;
+        # el tiempo gastado en las páginas rechazadas se mide aparte
+        if page_kind != PAGE_REPORT and not has_relevant_content(layout.text):
+            if timings is not None:
+                timings.observe("relevance_rejected", time.perf_counter() - started)
             return {"skip": True}
         
         # Extraer registro completo
-        registro = _extract_page_record_optimized(page, page_text)
+        registro = _extract_page_record_optimized(layout)
         
         # Validar que el registro tenga contenido útil
         if is_valid_record(registro):
+            if regions is not None and regions.learning:
+                with timed(timings, "regions_learn"):
+                    _learn_regions(page, regions, layout, registro)
             return registro
         else:
             return {"skip": True}
             
     except Exception as e:
+        # Incluye MemoryError: la página se reporta como fallida y no se cachea como "sin registro"
         print(f"Error procesando página {page_num}: {str(e)}")
-        return {"skip": True}
+        return {"skip": True, "reason": SKIP_ERROR}
+
+def _extract_from_regions(page, regions, template, timings: Optional[Timings] = None) -> Optional[Dict[str, str]]:
+    """Registro extraído solo de las regiones del documento, o None si no es confiable"""
+    try:
+        layout = PageLayout(RegionPage(page, regions.regions), template, timings)
+        registro = _extract_page_record_optimized(layout)
+        accepted = regions.accept(layout, registro)
+    except Exception as e:
+        print(f"Error en la extracción por regiones de la página {page.page_number}: {e}")
+        return None
+    if accepted and is_valid_record(registro):
+        return registro
+    return None
+
+def _learn_regions(page, regions, layout: PageLayout, registro: Dict[str, str]) -> None:
+    """Compara la página completa con sus regiones candidatas (sin plantilla)"""
+    try:
+        regions.observe(layout, registro,
+                        lambda bands: _extract_page_record_optimized(PageLayout(RegionPage(page, bands))))
+    except Exception as e:
+        print(f"Error aprendiendo las regiones en la página {page.page_number}: {e}")
 
 def has_relevant_content(text: str) -> bool:
     """Filtro más preciso para identificar páginas relevantes"""
-    indicators = [
-        r"DATOS\s+Y\s+CONDICIONES",
-        r"Nombre\s+del\s+productor",
-        r"MICRONUTRIENTES",
-        r"FERTILIDAD\s+DEL\s+SUELO",
-        r"Hierro\s*\(Fe\)",
-        r"pH\s*\(",
-        r"Fósforo.*mg/kg",
-        r"RELACIONES\s+ENTRE\s+CATIONES"
-    ]
-    
-    return any(re.search(pattern, text, re.IGNORECASE) for pattern in indicators)
+    return _RELEVANT_RE.search(text) is not None
 
 def is_valid_record(record: Dict[str, str]) -> bool:
     """Verifica si un registro contiene datos útiles"""
@@ -153,54 +901,23 @@ def is_valid_record(record: Dict[str, str]) -> bool:
     
     return any(required_indicators)
 
-def _extract_page_record_optimized(page: pdfplumber.page.Page, page_text: str) -> Dict[str, str]:
+def _extract_page_record_optimized(layout: PageLayout) -> Dict[str, str]:
     """Versión optimizada de extracción con mejor manejo de memoria"""
     
-    # Extraer sección de datos una sola vez
-    datos_sec = _slice_between(
-        page_text,
-        r"DATOS Y CONDICIONES DE LA MUESTRA",
-        r"(?:RESULTADOS|PARÁMETROS QUÍMICOS DEL SUELO)"
-    ) or page_text
-
-    def find_in_text(pattern: str, source_text: str = None, default: str = "No encontrado") -> str:
-        search_text = source_text if source_text is not None else datos_sec
-        match = re.search(pattern, search_text, re.IGNORECASE)
-        if match:
-            result = match.group(1).strip()
-            return result if result else default
-        return default
-
-    # Datos básicos - optimizados
-    productor = find_in_text(r"Nombre del productor\s+([A-ZÁÉÍÓÚÑ\s]+?)(?=\s*Coordenadas|$)", page_text)
-    cultivo = find_in_text(r"Cultivo a establecer\s+([A-ZÁÉÍÓÚÑ\s]+?)(?=\s+Meta de rendimiento|\n)")
-    rendimiento = find_in_text(r"Meta de rendimiento\s+([\d.]+)\s*t/ha")
-    municipio = find_in_text(r"Municipio\s+([A-ZÁÉÍÓÚÑ\s]+?)(?=\s+\bLocalidad\b)")
-    localidad = find_in_text(r"Localidad\s+([A-ZÁÉÍÓÚÑ\s]+?)(?=\s+\bCantidad\b|\n)")
-
-    # Parámetros físicos - búsqueda directa
-    physical_params = {}
-    physical_patterns = {
-        "arcilla": r"Arcilla\s*\(%\)\s+([\d.]+)",
-        "limo": r"Limo\s*\(%\)\s+([\d.]+)",
-        "arena": r"Arena\s*\(%\)\s+([\d.]+)",
-        "textura": r"Textura\s+([A-Za-zÁÉÍÓÚÑáéíóúñ]+)",
-        "porcentaje_saturacion": r"Porcentaje de saturación\s*\(PS\)\s+([^\s]+)",
-        "capacidad_campo": r"Capacidad de campo\s*\(cc\)\s+([^\s]+)",
-        "punto_marchitez": r"Punto de marchitez permanente\s*\(pmp\)\s+([^\s]+)",
-        "conductividad_hidraulica": r"Conductividad hidráulica\s+([^\s]+)",
-        "densidad_aparente": r"Densidad aparente\s*\(Dap\)\s+([^\s]+)"
-    }
-    
-    for key, pattern in physical_patterns.items():
-        physical_params[key] = find_in_text(pattern, page_text)
+    # Datos básicos y parámetros físicos - una pasada por la tabla de campos
+    campos = scan_fields(layout.text)
 
     # Extraer otros parámetros usando métodos optimizados
+    timings = layout.timings
     try:
-        fert_vals, fert_interps = _extract_fertility_optimized(page)
-        quim_vals, quim_interps = _extract_chemical_params_optimized(page)
-        micro_vals, micro_units, micro_interps = _extract_micronutrients_optimized(page)
-        rel_vals, rel_interps = _extract_cation_relations_optimized(page)
+        with timed(timings, "fertility"):
+            fert_vals, fert_interps = _extract_fertility_optimized(layout)
+        with timed(timings, "chemical"):
+            quim_vals, quim_interps = _extract_chemical_params_optimized(layout)
+        with timed(timings, "micronutrients"):
+            micro_vals, micro_units, micro_interps = _extract_micronutrients_optimized(layout)
+        with timed(timings, "relations"):
+            rel_vals, rel_interps = _extract_cation_relations_optimized(layout)
     except Exception as e:
         print(f"Error en extracción de parámetros: {e}")
         fert_vals, fert_interps = [], []
@@ -209,20 +926,10 @@ def _extract_page_record_optimized(page: pdfplumber.page.Page, page_text: str) -
         rel_vals, rel_interps = [], []
 
     # Construir resultado
-    resultado = {
-        "nombre_productor": productor,
-        "cultivo_establecer": cultivo,
-        "meta_rendimiento": rendimiento,
-        "municipio": municipio,
-        "localidad": localidad,
-        **physical_params
-    }
+    resultado = campos
 
-    # Agregar valores por defecto y datos extraídos
-    resultado.update(_create_default_fertility_data())
-    resultado.update(_create_default_chemical_data())
-    resultado.update(_create_default_micro_data())
-    resultado.update(_create_default_rel_data())
+    # Agregar valores por defecto (armados una sola vez) y datos extraídos
+    resultado.update(_DEFAULT_VALUES)
 
     # Asignar datos de fertilidad
     _assign_fertility_data(resultado, fert_vals, fert_interps)
@@ -240,7 +947,7 @@ def _assign_fertility_data(resultado: Dict, vals: List, interps: List):
     for i, key in enumerate(fertility_keys):
         if i < len(vals):
             v = vals[i]
-            resultado[key] = "No analizado" if v.upper() == "N/A" else v
+            resultado[key] = NOT_ANALYZED if v.upper() == "N/A" else v
         
         if i < len(interps):
             resultado[f"interp_{key}"] = interps[i].title()
@@ -252,7 +959,7 @@ def _assign_chemical_data(resultado: Dict, vals: List, interps: List):
     for i, key in enumerate(chemical_keys):
         if i < len(vals):
             v = vals[i]
-            resultado[key] = "No analizado" if v.upper() == "N/A" else v
+            resultado[key] = NOT_ANALYZED if v.upper() == "N/A" else v
         
         if i < len(interps):
             resultado[f"interp_{key}"] = interps[i].title()
@@ -280,99 +987,92 @@ def _assign_relation_data(resultado: Dict, vals: List, interps: List):
             resultado[f"interp_{key}"] = interps[i].capitalize()
 
 # Versiones optimizadas de las funciones de extracción
-def _extract_fertility_optimized(page: pdfplumber.page.Page) -> Tuple[List[str], List[str]]:
+def _extract_fertility_optimized(layout: PageLayout) -> Tuple[List[str], List[str]]:
     """Versión optimizada con mejor manejo de memoria"""
     try:
-        words = page.extract_words(x_tolerance=2, y_tolerance=2, keep_blank_chars=False)
-        if not words:
+        if not layout.words:
             return [], []
         
         # Resto de la lógica original pero optimizada
-        return _extract_fertility_by_layout(page)
+        return _extract_fertility_by_layout(layout)
     except Exception:
         return [], []
 
-def _extract_chemical_params_optimized(page: pdfplumber.page.Page) -> Tuple[List[str], List[str]]:
+def _extract_chemical_params_optimized(layout: PageLayout) -> Tuple[List[str], List[str]]:
     """Versión optimizada de extracción de parámetros químicos"""
     try:
-        return _extract_chemical_params_by_layout(page)
+        return _extract_chemical_params_by_layout(layout)
     except Exception:
         return [], []
 
-def _extract_micronutrients_optimized(page: pdfplumber.page.Page):
+def _extract_micronutrients_optimized(layout: PageLayout):
     """Versión optimizada de extracción de micronutrientes"""
     try:
-        return _extract_micronutrients(page)
+        return _extract_micronutrients(layout)
     except Exception:
         return [], [], []
 
-def _extract_cation_relations_optimized(page: pdfplumber.page.Page) -> Tuple[List[str], List[str]]:
+def _extract_cation_relations_optimized(layout: PageLayout) -> Tuple[List[str], List[str]]:
     """Versión optimizada de extracción de relaciones"""
     try:
-        return _extract_cation_relations(page)
+        return _extract_cation_relations(layout)
     except Exception:
         return [], []
 
 # Mantener todas las funciones auxiliares originales
-def _slice_between(text: str, start_pat: str, end_pat: str) -> Optional[str]:
-    m = re.search(start_pat + r"(.*?)" + end_pat, text, re.IGNORECASE | re.DOTALL)
-    return m.group(1) if m else None
-
 def _normalize_text(s: str) -> str:
     s = s.lower()
     s = ''.join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
-    return re.sub(r'\s+', ' ', s).strip()
-
-def _clean_interpretation(texto: str) -> str:
-    LABELS = [
-        "muy alto", "alto",
-        "moderadamente alto", "mod. alto",
-        "medio",
-        "moderadamente bajo", "mod. bajo",
-        "bajo", "muy bajo"
-    ]
-    CANON = {
-        "mod. alto": "moderadamente alto",
-        "mod. bajo": "moderadamente bajo",
-    }
-    t = _normalize_text(texto)
-    for lab in LABELS:
-        if lab in t:
-            return CANON.get(lab, lab)
-    return texto.strip()
-
-def _extract_fertility_by_layout(page: pdfplumber.page.Page) -> Tuple[List[str], List[str]]:
-    words = page.extract_words(x_tolerance=2, y_tolerance=2, keep_blank_chars=False)
-    for w in words:
-        w["ymid"] = (w["top"] + w["bottom"]) / 2.0
-
-    header_candidates: Dict[int, set] = {}
-    for w in words:
-        if w["text"] in ("M.O", "Fósforo", "Potasio", "Calcio", "Azufre"):
-            y = round(w["ymid"])
-            header_candidates.setdefault(y, set()).add(w["text"])
-    if not header_candidates:
+    return _WS_RE.sub(' ', s).strip()
+
+def _extract_fertility_by_layout(layout: PageLayout) -> Tuple[List[str], List[str]]:
+    rows = layout.rows
+    template = layout.template
+
+    def header_row(words, majority_only):
+        header_candidates: Dict[int, set] = {}
+        for w in words:
+            if w["text"] in _FERT_HEADER_LABELS:
+                y = round(w["ymid"])
+                header_candidates.setdefault(y, set()).add(w["text"])
+        if not header_candidates:
+            return None
+        y, labels = max(header_candidates.items(), key=lambda kv: len(kv[1]))
+        if majority_only and len(labels) * 2 <= len(_FERT_HEADER_LABELS):
+            return None
+        return y, y
+
+    # Con plantilla solo se acepta una fila con la mayoría de las etiquetas; el
+    # ruido de posición puede repartir el encabezado en dos filas redondeadas
+    y_header = templated_search(template, "fert_encabezado", 0.0,
+                                lambda lo, hi: header_row(rows.within(lo, hi), True),
+                                lambda: header_row(layout.words, False))
+    if y_header is None:
         return [], []
 
-    y_header = max(header_candidates.items(), key=lambda kv: len(kv[1]))[0]
-
-    resultado_tokens = [w for w in words if w["text"].lower().startswith("resultado") and y_header + 5 < w["ymid"] < y_header + 80]
-    if not resultado_tokens:
+    is_resultado = lambda w: w["text"].lower().startswith("resultado")
+    resultado_tok = templated_search(template, "fert_resultado", y_header,
+                                     lambda lo, hi: _first_word(rows, max(lo, y_header + 5), min(hi, y_header + 80), is_resultado),
+                                     lambda: _first_word(rows, y_header + 5, y_header + 80, is_resultado))
+    if resultado_tok is None:
         return [], []
 
-    y_res = sorted(resultado_tokens, key=lambda w: w["ymid"])[0]["ymid"]
-    line_res = _words_at_y(words, y_res)
+    y_res = resultado_tok["ymid"]
+    line_res = rows.line_at(y_res)
 
     idx_res = _index_of(line_res, lambda t: t["text"].lower().startswith("resultado"))
     right_res = line_res[idx_res + 1:] if idx_res is not None else []
-    isnum = lambda t: bool(re.match(r"^\d+(?:[.,]\d+)?$", t)) or t.upper() == "N/A"
+    isnum = lambda t: bool(_DECIMAL_RE.match(t)) or t.upper() == "N/A"
     vals = [t["text"].replace(",", ".") for t in right_res if isnum(t["text"])]
 
-    interp_tokens = [w for w in words if w["text"].lower().startswith("interpretación") and y_res + 5 < w["ymid"] < y_res + 40]
+    is_interp = lambda w: w["text"].lower().startswith("interpretación")
+    interp_tok = templated_search(template, "fert_interpretacion", y_res,
+                                  lambda lo, hi: _first_word(rows, max(lo, y_res + 5), min(hi, y_res + 40), is_interp),
+                                  lambda: _first_word(rows, y_res + 5, y_res + 40, is_interp))
     interps: List[str] = []
-    if interp_tokens:
-        y_int = sorted(interp_tokens, key=lambda w: w["ymid"])[0]["ymid"]
-        line_int = _words_at_y(words, y_int)
+    if interp_tok is not None:
+        y_int = interp_tok["ymid"]
+        line_int = rows.line_at(y_int)
         idx_int = _index_of(line_int, lambda t: t["text"].lower().startswith("interpretación"))
         tail = [t["text"].lower() for t in (line_int[idx_int + 1:] if idx_int is not None else [])]
 
@@ -393,94 +1093,70 @@ def _extract_fertility_by_layout(page: pdfplumber.page.Page) -> Tuple[List[str],
 
     return vals[:8], interps[:8]
 
-def _extract_chemical_params_by_layout(page: pdfplumber.page.Page) -> Tuple[List[str], List[str]]:
-    text = page.extract_text() or ""
-
-    expected_params = [
-        "pH (Relación 2:1 agua suelo)",
-        "pH (CaCl2 0.01 M)",
-        "pH (KCl 1 M)",
-        "Carbonato de calcio equivalente (%)",
-        "Conductividad eléctrica"
-    ]
+def _extract_chemical_params_by_layout(layout: PageLayout) -> Tuple[List[str], List[str]]:
+    text = layout.text
 
     result_vals: List[str] = []
     interp_vals: List[str] = []
 
-    for param in expected_params:
-        if "Conductividad eléctrica" in param:
-            val_match = re.search(r"Conductividad eléctrica.*?\s([\d.,]+)", text, re.IGNORECASE)
-            interp_match = re.search(
-                r"Conductividad eléctrica.*?[\d.,]+\s+([A-Za-zÁÉÍÓÚÜÑáéíóúü\s]+?)(?=\sM\.O|\sN\s|\sP\s|$)",
-                text, re.IGNORECASE)
-        else:
-            val_match = re.search(re.escape(param) + r"\s+([^\s]+)", text, re.IGNORECASE)
-            interp_match = re.search(re.escape(param) + r"\s+[^\s]+\s+(.+)", text, re.IGNORECASE)
+    for spec in CHEMICAL_SPECS:
+        val_match = spec.value_re.search(text)
+        interp_match = spec.interp_re.search(text)
 
-        result_vals.append(val_match.group(1) if val_match else "No encontrado")
-        interp_vals.append(interp_match.group(1).strip() if interp_match else "No disponible")
+        result_vals.append(val_match.group(1) if val_match else NOT_FOUND)
+        interp_vals.append(interp_match.group(1).strip() if interp_match else NOT_AVAILABLE)
 
     return result_vals, interp_vals
 
-def _extract_micronutrients(page):
-    import re, unicodedata
+def _norm_micro(s: str) -> str:
+    s = ''.join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+    s = s.lower()
+    s = s.replace('mod. ', 'mod ').replace('mod  ', 'mod ')
+    s = s.replace('mod alto', 'moderadamente alto')
+    s = s.replace('mod bajo', 'moderadamente bajo')
+    
+    s = s.replace("baj o", "bajo")
+    s = s.replace("muy baj", "muy bajo")
+    s = s.replace("muy ba jo", "muy bajo")
+    s = _WS_RE.sub(' ', s).strip()
+    return s
+
+def _classify_micro_label(text: str) -> str:
+    t = _norm_micro(text)
+    
+    t = _MUY_BAJO_SPLIT_RE.sub("muy bajo", t)
+    t = _MUY_BAJO_SPLIT2_RE.sub("muy bajo", t)
+    
+    for lab, lab_re in _MICRO_LABELS:
+        if lab_re.search(t):
+            return lab.title()
+    return 'No disponible'
 
-    def _norm(s: str) -> str:
-        import unicodedata, re
-        s = ''.join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
-        s = s.lower()
-        s = s.replace('mod. ', 'mod ').replace('mod  ', 'mod ')
-        s = s.replace('mod alto', 'moderadamente alto')
-        s = s.replace('mod bajo', 'moderadamente bajo')
-        
-        s = s.replace("baj o", "bajo")
-        s = s.replace("muy baj", "muy bajo")
-        s = s.replace("muy ba jo", "muy bajo")
-        s = re.sub(r'\s+', ' ', s).strip()
-        return s
-
-    def _classify_label(text: str) -> str:
-        t = _norm(text)
-        
-        t = re.sub(r"muy\s*baj\s*o", "muy bajo", t)
-        t = re.sub(r"muy\s*ba\s*jo", "muy bajo", t)
-        
-        labels = [
-            'moderadamente alto',
-            'moderadamente bajo',
-            'muy alto',
-            'muy bajo',
-            'alto',
-            'medio',
-            'bajo',
-        ]
-        for lab in labels:
-            if re.search(r'\b' + re.escape(lab) + r'\b', t):
-                return lab.title()
-        return 'No disponible'
-
-    words = page.extract_words(x_tolerance=3, y_tolerance=3, keep_blank_chars=False)
+def _extract_micronutrients(layout: PageLayout):
+    words = layout.words_loose
     if not words:
         return ([], [], [])
+    rows = layout.rows_loose
 
-    for w in words:
-        w['ymid'] = (w['top'] + w['bottom']) / 2.0
-
-    micro_hdr = [w for w in words if w['text'].upper() == 'MICRONUTRIENTES']
-    if not micro_hdr:
+    micro_hdr = rows.first(lambda w: w['text'].upper() == 'MICRONUTRIENTES')
+    if micro_hdr is None:
         return ([], [], [])
 
-    y_hdr = sorted(micro_hdr, key=lambda w: w['ymid'])[0]['ymid']
+    y_hdr = micro_hdr['ymid']
 
-    header_row = None
-    for y in sorted({round(w['ymid']) for w in words if y_hdr + 2 < w['ymid'] < y_hdr + 60}):
-        line = sorted([w for w in words if abs(w['ymid'] - y) <= 3], key=lambda t: t['x0'])
-        texts = [t['text'] for t in line]
-        if (any(t in ['Parámetro', 'Parametro'] for t in texts)
-                and 'Unidad' in texts and 'Resultado' in texts
-                and any(t in ['Interpretación', 'Interpretacion'] for t in texts)):
-            header_row = (y, line)
-            break
+    def find_header(lo, hi):
+        for y in rows.ys_between(lo, hi):
+            line = rows.line_at(y, 3)
+            texts = [t['text'] for t in line]
+            if (any(t in ['Parámetro', 'Parametro'] for t in texts)
+                    and 'Unidad' in texts and 'Resultado' in texts
+                    and any(t in ['Interpretación', 'Interpretacion'] for t in texts)):
+                return y, (y, line)
+        return None
+
+    header_row = templated_search(layout.template, "micro_encabezado", y_hdr,
+                                  lambda lo, hi: find_header(max(lo, y_hdr + 2), min(hi, y_hdr + 60)),
+                                  lambda: find_header(y_hdr + 2, y_hdr + 60))
 
     if not header_row:
         return ([], [], [])
@@ -504,8 +1180,8 @@ def _extract_micronutrients(page):
         return b
 
     lines = []
-    for y in sorted({round(w['ymid']) for w in words if y_cols + 2 < w['ymid'] < y_cols + 180}):
-        line = sorted([w for w in words if abs(w['ymid'] - y) <= 3], key=lambda t: t['x0'])
+    for y in rows.ys_between(y_cols + 2, y_cols + 180):
+        line = rows.line_at(y, 3)
         if any('RELACIONES' in w['text'].upper() for w in line):
             break
         lines.append((y, line))
@@ -516,7 +1192,7 @@ def _extract_micronutrients(page):
         b = _bucket(line)
 
         param_text = " ".join(t['text'] for t in b['parametro']).strip()
-        m = re.search(r'(Hierro|Cobre|Zinc|Manganeso|Boro)\b.*', param_text, flags=re.I)
+        m = _MICRO_PARAM_RE.search(param_text)
         if not m:
             continue
         nutriente = m.group(1).capitalize()
@@ -524,28 +1200,27 @@ def _extract_micronutrients(page):
             continue
 
         unidad = " ".join(t['text'] for t in b['unidad']).strip() or "mg kg¯¹"
-        val_tokens = [t['text'] for t in b['resultado'] if re.match(r'^[\d.,]+$', t['text'])]
+        val_tokens = [t['text'] for t in b['resultado'] if _NUMERIC_RE.match(t['text'])]
         valor = val_tokens[-1].replace(',', '.') if val_tokens else 'No encontrado'
 
-        interp_tokens = [t["text"] for t in b["interpretacion"] if not re.match(r"^[\d.,]+$", t["text"])]
+        interp_tokens = [t["text"] for t in b["interpretacion"] if not _NUMERIC_RE.match(t["text"])]
         interp_raw = " ".join(interp_tokens).strip()
 
         if not interp_raw:
             forbidden = set([nutriente, valor, unidad])
-            all_tokens = [t["text"] for t in line if t["text"] not in forbidden and not re.match(r"^[\d.,]+$", t["text"])]
+            all_tokens = [t["text"] for t in line if t["text"] not in forbidden and not _NUMERIC_RE.match(t["text"])]
             interp_raw = " ".join(all_tokens).strip()
 
         if not interp_raw and c_interp is not None and c_res is not None:
             x_left = (c_res + c_interp) / 2.0
             nearby = [
-                tok for tok in words
-                if (y - 30) <= tok["ymid"] <= (y + 30)
-                and ((tok["x0"] + tok["x1"]) / 2.0) >= (x_left - 10)
-                and not re.match(r"^[\d.,]+$", tok["text"])
+                tok for tok in rows.within(y - 30, y + 30)
+                if ((tok["x0"] + tok["x1"]) / 2.0) >= (x_left - 10)
+                and not _NUMERIC_RE.match(tok["text"])
             ]
-            interp_raw = " ".join(t["text"] for t in sorted(nearby, key=lambda t: t["x0"])).strip()
+            interp_raw = " ".join(t["text"] for t in nearby).strip()
 
-        interpretacion = _classify_label(interp_raw)
+        interpretacion = _classify_micro_label(interp_raw)
 
         encontrados[nutriente] = {
             'valor': valor,
@@ -571,40 +1246,52 @@ def _is_rel_interp_noise(s: str) -> bool:
     t = _normalize_text(s)
     return (
         t in {"g", "n/a", "na", "me", "me/100", "me 100"} or
-        bool(re.search(r"\bme\s*/\s*100\b", t))
+        bool(_REL_ME100_RE.search(t))
     )
 
 def _clean_rel_interp(s: str) -> str:
     t = _normalize_text(s)
-    t = re.sub(r"\bme\s*/\s*100\b", "", t)
-    t = re.sub(r"\bn\s*/\s*a\b", "", t)
+    t = _REL_ME100_RE.sub("", t)
+    t = _REL_NA_RE.sub("", t)
     t = t.replace("n/a", "")
-    t = re.sub(r"\bg\b", "", t)
-    t = re.sub(r"\s+", " ", t).strip()
+    t = _REL_G_RE.sub("", t)
+    t = _WS_RE.sub(" ", t).strip()
     return t
 
-def _extract_cation_relations(page: pdfplumber.page.Page) -> Tuple[List[str], List[str]]:
-    words = page.extract_words(x_tolerance=2, y_tolerance=2, keep_blank_chars=False)
-    for w in words:
-        w["ymid"] = (w["top"] + w["bottom"]) / 2.0
+def _extract_cation_relations(layout: PageLayout) -> Tuple[List[str], List[str]]:
+    rows = layout.rows
+    template = layout.template
 
-    title_ws = [w for w in words if "RELACIONES" in w["text"].upper()]
-    if not title_ws:
+    title_w = rows.first(lambda w: "RELACIONES" in w["text"].upper())
+    if title_w is None:
         return [], []
-    y_title = sorted(title_ws, key=lambda w: w["ymid"])[0]["ymid"]
+    y_title = title_w["ymid"]
 
     labels = ["Ca/Mg", "Mg/K", "Ca/K", "(Ca+Mg)/K", "K/Mg"]
-    candidate_rows = []
-    for y in sorted({round(w["ymid"]) for w in words if y_title + 5 < w["ymid"] < y_title + 120}):
-        line = _words_at_y(words, y)
-        texts = " ".join(t["text"] for t in line)
-        hits = sum(1 for lab in labels if lab in texts)
-        if hits >= 3:
-            candidate_rows.append((y, line, hits))
-    if not candidate_rows:
+
+    def find_header(lo, hi, complete_only):
+        candidate_rows = []
+        for y in rows.ys_between(lo, hi):
+            line = rows.line_at(y)
+            texts = " ".join(t["text"] for t in line)
+            hits = sum(1 for lab in labels if lab in texts)
+            if hits >= 3:
+                candidate_rows.append((y, line, hits))
+        if not candidate_rows:
+            return None
+        best = sorted(candidate_rows, key=lambda t: (-t[2], t[0]))[0]
+        if complete_only and best[2] < len(labels):
+            return None
+        return best[0], best
+
+    # Con plantilla solo se acepta una fila con las cinco etiquetas (el máximo posible)
+    header = templated_search(template, "rel_encabezado", y_title,
+                              lambda lo, hi: find_header(max(lo, y_title + 5), min(hi, y_title + 120), True),
+                              lambda: find_header(y_title + 5, y_title + 120, False))
+    if header is None:
         return [], []
 
-    y_header, header_line, _ = sorted(candidate_rows, key=lambda t: (-t[2], t[0]))[0]
+    y_header, header_line, _ = header
 
     header_tokens = []
     for lab in labels:
@@ -622,25 +1309,27 @@ def _extract_cation_relations(page: pdfplumber.page.Page) -> Tuple[List[str], Li
         approx = [100 + i * 120 for i in range(len(labels))]
         header_tokens = [(lab, approx[i]) for i, lab in enumerate(labels)]
 
-    number_rows = []
-    for y in sorted({round(w["ymid"]) for w in words if y_header + 5 < w["ymid"] < y_header + 80}):
-        line = _words_at_y(words, y)
-        if not line:
-            continue
-        nums = [t for t in line if re.match(r"^\d+(?:[.,]\d+)?$", t["text"])]
-        if len(nums) >= 1:
-            number_rows.append((y, line))
-    if not number_rows:
+    # Primera fila con números y, debajo, primera fila con palabras
+    def first_line(lo, hi, pred):
+        for y in rows.ys_between(lo, hi):
+            line = rows.line_at(y)
+            if any(pred(t["text"]) for t in line):
+                return y, (y, line)
+        return None
+
+    has_number = lambda text: bool(_DECIMAL_RE.match(text))
+    values_row = templated_search(template, "rel_valores", y_header,
+                                  lambda lo, hi: first_line(max(lo, y_header + 5), min(hi, y_header + 80), has_number),
+                                  lambda: first_line(y_header + 5, y_header + 80, has_number))
+    if values_row is None:
         return [], []
-    y_values, line_values = sorted(number_rows, key=lambda t: t[0])[0]
+    y_values, line_values = values_row
 
-    interp_rows = []
-    for y in sorted({round(w["ymid"]) for w in words if y_values + 2 < w["ymid"] < y_values + 60}):
-        line = _words_at_y(words, y)
-        words_only = [t for t in line if not re.match(r"^\d", t["text"])]
-        if len(words_only) >= 1:
-            interp_rows.append((y, line))
-    line_interp = interp_rows[0][1] if interp_rows else []
+    has_word = lambda text: not _LEADING_DIGIT_RE.match(text)
+    interp_row = templated_search(template, "rel_interpretacion", y_values,
+                                  lambda lo, hi: first_line(max(lo, y_values + 2), min(hi, y_values + 60), has_word),
+                                  lambda: first_line(y_values + 2, y_values + 60, has_word))
+    line_interp = interp_row[1] if interp_row else []
 
     def bucket_by_header(line_tokens):
         buckets = {lab: [] for lab, _ in header_tokens}
@@ -650,10 +1339,10 @@ def _extract_cation_relations(page: pdfplumber.page.Page) -> Tuple[List[str], Li
             buckets[lab_near].append(tok["text"])
         return buckets
 
-    b_vals = bucket_by_header([t for t in line_values if re.match(r"^[\d.,]+$", t["text"])])
+    b_vals = bucket_by_header([t for t in line_values if _NUMERIC_RE.match(t["text"])])
     interp_tokens_filtered = [
         t for t in line_interp
-        if not re.match(r"^[\d.,]+$", t["text"]) and not _is_rel_interp_noise(t["text"])
+        if not _NUMERIC_RE.match(t["text"]) and not _is_rel_interp_noise(t["text"])
     ]
     b_interps = bucket_by_header(interp_tokens_filtered)
 
@@ -673,9 +1362,10 @@ def _extract_cation_relations(page: pdfplumber.page.Page) -> Tuple[List[str], Li
 
     return values, interps
 
-def _words_at_y(words: List[dict], y: float, tol: float = 3.0) -> List[dict]:
-    line = [w for w in words if abs(w["ymid"] - y) <= tol]
-    return sorted(line, key=lambda w: w["x0"])
+def _first_word(rows, lo: float, hi: float, pred) -> Optional[Tuple[float, dict]]:
+    """(ymid, palabra) de la primera palabra entre lo y hi que cumple pred"""
+    w = rows.first_between(lo, hi, pred)
+    return (w["ymid"], w) if w is not None else None
 
 def _index_of(seq: List[dict], pred) -> Optional[int]:
     for i, el in enumerate(seq):
@@ -733,4 +1423,12 @@ def _create_default_rel_data() -> Dict[str, str]:
         "rel_ca_k": "No encontrado",  "interp_rel_ca_k": "No disponible",
         "rel_ca_mg_k": "No encontrado","interp_rel_ca_mg_k": "No disponible",
         "rel_k_mg": "No encontrado",  "interp_rel_k_mg": "No disponible",
-    }
\ No newline at end of file
+    }
+
+# Valores por defecto de las secciones, compartidos por todos los registros
+_DEFAULT_VALUES: Dict[str, str] = {
+    **_create_default_fertility_data(),
+    **_create_default_chemical_data(),
+    **_create_default_micro_data(),
+    **_create_default_rel_data(),
+}
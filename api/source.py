@@ -0,0 +1,77 @@
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Tuple, Union
+
+import pdfplumber
+
+# Origen de un PDF: ruta en disco o bytes en memoria
+PdfSource = Union[str, os.PathLike, bytes]
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Copiar subidas en bloques de 1 MB
+SPOOL_DIR = os.environ.get("SCANER_SPOOL_DIR") or None  # None = directorio temporal del sistema
+
+
+def spool_to_disk(stream: BinaryIO, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[str, int, str]:
+    """Copia un stream a un archivo temporal por bloques, sin cargarlo completo en memoria.
+
+    Devuelve la ruta del archivo, el número de bytes escritos y el SHA-256 del
+    contenido (calculado durante la copia). El llamador es responsable de
+    borrar el archivo.
+    """
+    size = 0
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(suffix=".pdf", dir=SPOOL_DIR, delete=False) as tmp:
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                tmp.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    return tmp.name, size, digest.hexdigest()
+
+
+@contextmanager
+def materialize(source: PdfSource) -> Iterator[str]:
+    """Garantiza una ruta en disco para el PDF (necesaria para compartirlo entre procesos)"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", dir=SPOOL_DIR, delete=False) as tmp:
+            tmp.write(source)
+        try:
+            yield tmp.name
+        finally:
+            os.unlink(tmp.name)
+    else:
+        yield os.fspath(source)
+
+
+@contextmanager
+def open_pdf(source: PdfSource) -> Iterator[pdfplumber.PDF]:
+    """Abre el PDF desde bytes o desde disco; los archivos se leen mediante mmap"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        with pdfplumber.open(io.BytesIO(source)) as pdf:
+            yield pdf
+        return
+
+    with open(source, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            # mmap no admite archivos vacíos; pdfplumber reportará el PDF inválido
+            with pdfplumber.open(fh) as pdf:
+                yield pdf
+            return
+
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            with pdfplumber.open(mapped) as pdf:
+                yield pdf
+        finally:
+            mapped.close()
@@ -0,0 +1,104 @@
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+# Plantilla de documento: todas las páginas de un reporte INIFAP comparten el
+# mismo layout, así que la posición de cada fila de encabezado respecto a su
+# ancla (título de sección o fila anterior) se aprende en las primeras páginas
+# de datos y en las siguientes se busca solo en una banda estrecha alrededor
+# de esa posición. Si la página no coincide, se vuelve a la búsqueda completa.
+
+TEMPLATE_PAGES = 3          # Páginas coincidentes necesarias para fijar un offset
+TEMPLATE_TOLERANCE = 4.0    # Variación vertical admitida (puntos)
+
+T = TypeVar("T")
+
+
+class SectionTemplate:
+    """Offsets verticales aprendidos para un documento"""
+
+    def __init__(self, pages: int = TEMPLATE_PAGES, tolerance: float = TEMPLATE_TOLERANCE):
+        self.pages = pages
+        self.tolerance = tolerance
+        self.offsets: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self._samples: Dict[str, List[float]] = {}
+        self._misses_in_row: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def window(self, name: str, base: float) -> Optional[Tuple[float, float]]:
+        """Banda donde se espera la fila ``name`` dada la posición de su ancla"""
+        offset = self.offsets.get(name)
+        if offset is None:
+            return None
+        return base + offset - self.tolerance, base + offset + self.tolerance
+
+    def learn(self, name: str, base: float, y: float) -> None:
+        """Registra la posición encontrada por la búsqueda completa"""
+        with self._lock:
+            if name in self.offsets:
+                return
+            samples = self._samples.setdefault(name, [])
+            samples.append(y - base)
+            if len(samples) > self.pages:
+                samples.pop(0)
+            if len(samples) == self.pages and max(samples) - min(samples) <= self.tolerance:
+                self.offsets[name] = sorted(samples)[len(samples) // 2]
+                del self._samples[name]
+
+    def record(self, name: str, matched: bool) -> None:
+        """Cuenta aciertos; varios fallos seguidos descartan el offset para reaprenderlo"""
+        with self._lock:
+            if matched:
+                self.hits += 1
+                self._misses_in_row[name] = 0
+                return
+            self.misses += 1
+            self._misses_in_row[name] = self._misses_in_row.get(name, 0) + 1
+            if self._misses_in_row[name] >= self.pages:
+                self.offsets.pop(name, None)
+                self._misses_in_row[name] = 0
+
+    def search(self, name: str, base: float,
+               narrow: Callable[[float, float], Optional[Tuple[float, T]]],
+               full: Callable[[], Optional[Tuple[float, T]]]) -> Optional[T]:
+        """Busca con la plantilla y, si no coincide, con la búsqueda completa.
+
+        ``narrow(lo, hi)`` y ``full()`` devuelven ``(y, resultado)`` o None.
+        """
+        window = self.window(name, base)
+        if window is not None:
+            found = narrow(*window)
+            self.record(name, found is not None)
+            if found is not None:
+                return found[1]
+
+        found = full()
+        if found is not None:
+            self.learn(name, base, found[0])
+            return found[1]
+        return None
+
+
+_templates: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_templates_lock = threading.Lock()
+
+
+def template_for(pdf) -> SectionTemplate:
+    """Plantilla asociada a un documento abierto (vive mientras el documento)"""
+    with _templates_lock:
+        template = _templates.get(pdf)
+        if template is None:
+            template = _templates[pdf] = SectionTemplate()
+        return template
+
+
+def templated_search(template: Optional[SectionTemplate], name: str, base: float,
+                     narrow: Callable[[float, float], Optional[Tuple[float, T]]],
+                     full: Callable[[], Optional[Tuple[float, T]]]) -> Optional[T]:
+    """Igual que ``SectionTemplate.search``, o solo la búsqueda completa sin plantilla"""
+    if template is None:
+        found = full()
+        return found[1] if found is not None else None
+    return template.search(name, base, narrow, full)
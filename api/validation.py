@@ -0,0 +1,80 @@
+import math
+from typing import Dict, List, NamedTuple, Optional
+
+from api.records import RecordStore, np
+
+# Verificaciones de rango sobre las columnas numéricas de un resultado.
+# Se evalúan por columna sobre todos los registros a la vez (con numpy si
+# está instalado) y marcan valores sospechosos sin modificarlos.
+
+TEXTURE_KEYS = ("arcilla", "limo", "arena")
+TEXTURE_TOTAL = 100.0
+TEXTURE_TOLERANCE = 2.0  # Puntos porcentuales admitidos por redondeo
+
+
+class RangeCheck(NamedTuple):
+    name: str                  # nombre de la verificación en el reporte
+    key: str                   # columna del registro
+    low: Optional[float]       # mínimo admitido (inclusive)
+    high: Optional[float]      # máximo admitido (inclusive)
+
+
+RANGE_CHECKS: List[RangeCheck] = [
+    RangeCheck("ph_agua_rango", "ph_agua", 0.0, 14.0),
+    RangeCheck("ph_cacl2_rango", "ph_cacl2", 0.0, 14.0),
+    RangeCheck("ph_kcl_rango", "ph_kcl", 0.0, 14.0),
+    RangeCheck("arcilla_rango", "arcilla", 0.0, 100.0),
+    RangeCheck("limo_rango", "limo", 0.0, 100.0),
+    RangeCheck("arena_rango", "arena", 0.0, 100.0),
+    RangeCheck("mo_rango", "mo", 0.0, 100.0),
+    RangeCheck("carbonato_calcio_rango", "carbonato_calcio", 0.0, 100.0),
+    RangeCheck("densidad_aparente_rango", "densidad_aparente", 0.5, 2.65),
+    RangeCheck("conductividad_electrica_rango", "conductividad_electrica", 0.0, None),
+]
+TEXTURE_CHECK = "textura_suma"
+
+
+def _out_of_range(values, low: Optional[float], high: Optional[float]) -> List[int]:
+    if np is not None:
+        bad = np.zeros(len(values), dtype=bool)
+        if low is not None:
+            bad |= values < low
+        if high is not None:
+            bad |= values > high
+        return np.flatnonzero(bad).tolist()
+    # Las comparaciones con NaN son falsas: los valores faltantes no se marcan
+    return [i for i, v in enumerate(values)
+            if (low is not None and v < low) or (high is not None and v > high)]
+
+
+def _texture_off(store: RecordStore) -> List[int]:
+    columns = [store.numbers(key) for key in TEXTURE_KEYS]
+    if np is not None:
+        total = columns[0] + columns[1] + columns[2]
+        return np.flatnonzero(np.abs(total - TEXTURE_TOTAL) > TEXTURE_TOLERANCE).tolist()
+    return [i for i, values in enumerate(zip(*columns))
+            if not any(math.isnan(v) for v in values) and abs(sum(values) - TEXTURE_TOTAL) > TEXTURE_TOLERANCE]
+
+
+def check_ranges(store: RecordStore) -> Dict[str, List[int]]:
+    """{verificación: índices de los registros que no la cumplen}, solo las que fallan"""
+    flagged: Dict[str, List[int]] = {}
+    for check in RANGE_CHECKS:
+        rows = _out_of_range(store.numbers(check.key), check.low, check.high)
+        if rows:
+            flagged[check.name] = rows
+    rows = _texture_off(store)
+    if rows:
+        flagged[TEXTURE_CHECK] = rows
+    return flagged
+
+
+def validation_summary(store: RecordStore) -> Dict:
+    """Resumen para las respuestas de la API: registros sospechosos por verificación"""
+    flagged = check_ranges(store)
+    suspect = sorted({row for rows in flagged.values() for row in rows})
+    return {
+        "suspect_records": len(suspect),
+        "checks": {name: rows for name, rows in flagged.items()},
+    }
+
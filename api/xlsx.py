@@ -0,0 +1,84 @@
+import os
+import re
+import tempfile
+from typing import Iterable, Iterator, Optional, Sequence, Union
+
+import xlsxwriter
+
+# Escritura del XLSX con xlsxwriter en modo constant_memory: cada fila se
+# vuelca a disco al pasar a la siguiente, así que la memoria no crece con el
+# número de registros. El libro se arma en un archivo temporal que luego se
+# entrega por bloques y se borra.
+
+CHUNK_SIZE = 1 << 16  # Bytes por bloque entregado
+
+# Formatos del ejemplo: encabezado, celda y celda de fila par
+HEADER_FORMAT = {
+    'bold': True,
+    'font_color': '#FFFFFF',
+    'bg_color': '#4472C4',
+    'align': 'center',
+    'valign': 'vcenter',
+    'border': 1,
+}
+CELL_FORMAT = {'border': 1}
+CELL_EVEN_FORMAT = {'border': 1, 'bg_color': '#F2F2F2'}
+
+_WORKBOOK_OPTIONS = {
+    'constant_memory': True,
+    # Los textos de los reportes se escriben tal cual, aunque empiecen con "=" o parezcan URLs
+    'strings_to_formulas': False,
+    'strings_to_urls': False,
+}
+
+# Caracteres de control que XML no admite; se eliminan en lugar de escaparse como _xHHHH_
+_ILLEGAL_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _write_workbook(path: str, rows: Iterable[Sequence[Union[str, float]]], headers: Sequence[str],
+                    sheet_title: str, widths: Optional[Sequence[float]]) -> None:
+    workbook = xlsxwriter.Workbook(path, _WORKBOOK_OPTIONS)
+    try:
+        header_format = workbook.add_format(HEADER_FORMAT)
+        cell_format = workbook.add_format(CELL_FORMAT)
+        cell_even_format = workbook.add_format(CELL_EVEN_FORMAT)
+
+        sheet = workbook.add_worksheet(sheet_title[:31])
+        for idx, width in enumerate(widths or ()):
+            sheet.set_column(idx, idx, width)
+        sheet.freeze_panes(1, 0)
+        sheet.write_row(0, 0, headers, header_format)
+
+        for row_idx, row in enumerate(rows, 1):
+            # Alternar colores de filas para mejor legibilidad (las filas pares de Excel)
+            fmt = cell_even_format if row_idx % 2 == 1 else cell_format
+            for col_idx, value in enumerate(row):
+                if isinstance(value, float):
+                    sheet.write_number(row_idx, col_idx, value, fmt)
+                elif value == "" or value is None:
+                    sheet.write_blank(row_idx, col_idx, None, fmt)
+                else:
+                    sheet.write_string(row_idx, col_idx, _ILLEGAL_XML_RE.sub("", str(value)), fmt)
+    finally:
+        workbook.close()
+
+
+def iter_xlsx(rows: Iterable[Sequence[Union[str, float]]], headers: Sequence[str], sheet_title: str = "Hoja1",
+              widths: Optional[Sequence[float]] = None) -> Iterator[bytes]:
+    """Genera el XLSX por bloques a partir de filas de texto y números (float).
+
+    La primera fila (encabezados) queda congelada; las filas de datos llevan
+    borde fino y fondo gris en las filas pares.
+    """
+    fd, path = tempfile.mkstemp(prefix="scaner-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        _write_workbook(path, rows, headers, sheet_title, widths)
+        with open(path, "rb") as fh:
+            while True:
+                chunk = fh.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.unlink(path)
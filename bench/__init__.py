@@ -0,0 +1,5 @@
+"""Benchmarks de extracción sobre reportes INIFAP sintéticos.
+
+    python -m bench.run --pages 200 --output resultados.json
+    python -m bench.run --compare base.json resultados.json
+"""
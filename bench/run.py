@@ -0,0 +1,389 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# La caché de páginas reutilizaría los registros de una repetición a la
+# siguiente; se desactiva antes de importar el extractor (y los workers la
+# heredan por el entorno)
+os.environ.setdefault("SCANER_PAGE_CACHE_MAX_ENTRIES", "0")
+
+import psutil  # noqa: E402
+
+from api import scaner  # noqa: E402
+from api.classify import PAGE_OTHER, PAGE_REPORT, classify_page  # noqa: E402
+from api.fields import scan_fields  # noqa: E402
+from api.layout import PageLayout  # noqa: E402
+from api.source import open_pdf  # noqa: E402
+from bench.synthetic import build_pdf  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows: sin ru_maxrss, solo el muestreo
+    resource = None
+
+# Benchmark de extracción: mide páginas por segundo de extract_data_from_pdf
+# en cada modo, la latencia de cada etapa por página (percentiles) y el pico
+# de memoria residente. El resultado es un JSON para comparar entre commits:
+#
+#     python -m bench.run --pages 200 --output base.json
+#     python -m bench.run --pages 200 --output nuevo.json
+#     python -m bench.run --compare base.json nuevo.json
+
+SCHEMA_VERSION = 1
+PERCENTILES = (50, 90, 99)
+DEFAULT_THRESHOLD = 0.10  # Empeoramiento relativo que cuenta como regresión
+RSS_SAMPLE_INTERVAL = 0.05  # Segundos entre muestras de memoria
+
+# Etapas de una página, en el orden en que se ejecutan
+SECTION_EXTRACTORS: List[Tuple[str, Callable]] = [
+    ("fertility", scaner._extract_fertility_by_layout),
+    ("chemical", scaner._extract_chemical_params_by_layout),
+    ("micronutrients", scaner._extract_micronutrients),
+    ("relations", scaner._extract_cation_relations),
+]
+PIPELINE_STAGE = "process_single_page_optimized"
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Percentil con interpolación lineal sobre valores ya ordenados"""
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100.0
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Resumen de latencias en milisegundos"""
+    ordered = sorted(samples)
+    summary = {"count": len(ordered)}
+    if not ordered:
+        return summary
+    summary["total_s"] = round(sum(ordered), 6)
+    summary["mean_ms"] = round(sum(ordered) / len(ordered) * 1000, 4)
+    for q in PERCENTILES:
+        summary[f"p{q}_ms"] = round(_percentile(ordered, q) * 1000, 4)
+    summary["max_ms"] = round(ordered[-1] * 1000, 4)
+    return summary
+
+
+class StageTimer:
+    """Acumula duraciones por etapa"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def time(self, stage: str, fn: Callable, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: summarize(samples) for stage, samples in self.samples.items()}
+
+
+def _release(page) -> None:
+    page.flush_cache()
+    page.get_textmap.cache_clear()
+
+
+def measure_stages(pdf_path: str) -> Tuple[Dict[str, Dict[str, float]], Dict[str, int]]:
+    """Latencia por página de cada etapa, en un solo hilo.
+
+    Primero se recorre el documento por etapas separadas (sin plantilla ni
+    regiones, para aislar cada extractor) y después con
+    ``process_single_page_optimized``, que es el camino real de cada página.
+    """
+    timer = StageTimer()
+    counts = {"pages": 0, "skipped_classifier": 0, "rejected_relevance": 0, "analyzed": 0}
+
+    with open_pdf(pdf_path) as pdf:
+        for page in pdf.pages:
+            counts["pages"] += 1
+            try:
+                kind = timer.time("classify", classify_page, page)
+                if kind == PAGE_OTHER:
+                    counts["skipped_classifier"] += 1
+                    continue
+                layout = PageLayout(page)
+                timer.time("chars", lambda: layout.chars)
+                text = timer.time("extract_text", lambda: layout.text)
+                if kind != PAGE_REPORT and not timer.time("has_relevant_content", scaner.has_relevant_content, text):
+                    counts["rejected_relevance"] += 1
+                    continue
+                counts["analyzed"] += 1
+                timer.time("extract_words", lambda: layout.words)
+                timer.time("extract_words_loose", lambda: layout.words_loose)
+                timer.time("row_index", lambda: (layout.rows, layout.rows_loose))
+                timer.time("scan_fields", scan_fields, text)
+                for stage, extractor in SECTION_EXTRACTORS:
+                    timer.time(stage, extractor, layout)
+            finally:
+                _release(page)
+
+    with open_pdf(pdf_path) as pdf:
+        for page in pdf.pages:
+            try:
+                timer.time(PIPELINE_STAGE, scaner.process_single_page_optimized, page, page.page_number)
+            finally:
+                _release(page)
+
+    return timer.summary(), counts
+
+
+def _extraction_run(pdf_bytes: bytes, mode: str, workers: Optional[int], verbose: bool) -> Tuple[float, int, int]:
+    """(segundos, registros, páginas) de una corrida con un archivo nuevo, para que
+    los workers no reutilicen el documento (ni lo aprendido) de la anterior"""
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(pdf_bytes)
+    stats: Dict[str, int] = {}
+    try:
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            start = time.perf_counter()
+            result = scaner.extract_data_from_pdf(tmp.name, mode=mode, workers=workers, stats=stats)
+            elapsed = time.perf_counter() - start
+    finally:
+        os.unlink(tmp.name)
+    if len(result) == 1 and "error" in result[0]:
+        raise RuntimeError(f"extract_data_from_pdf ({mode}): {result[0]['error']}")
+    return elapsed, len(result), stats.get("pages_total", 0)
+
+
+def measure_extraction(pdf_bytes: bytes, mode: str, repeat: int, warmup: int,
+                       workers: Optional[int], verbose: bool) -> Dict:
+    """Tiempo de extract_data_from_pdf completo y pico de memoria durante las corridas"""
+    seconds: List[float] = []
+    records = pages = 0
+    with RssSampler() as sampler:
+        for run in range(warmup + repeat):
+            elapsed, records, pages = _extraction_run(pdf_bytes, mode, workers, verbose)
+            if run >= warmup:
+                seconds.append(elapsed)
+
+    median = sorted(seconds)[len(seconds) // 2]
+    return {
+        "mode": mode,
+        "workers": workers or (scaner.PROCESS_WORKERS if mode == "process" else scaner.MAX_WORKERS),
+        "pages": pages,
+        "records": records,
+        "seconds": [round(s, 4) for s in seconds],
+        "best_s": round(min(seconds), 4),
+        "median_s": round(median, 4),
+        "pages_per_sec": round(pages / median, 3) if median else None,
+        "peak_rss_mb": sampler.summary(),
+    }
+
+
+class RssSampler:
+    """Pico de memoria residente del proceso más sus workers, muestreado en un hilo.
+
+    ``ru_maxrss`` de los hijos solo cuenta procesos ya terminados, y los
+    workers del pool siguen vivos entre corridas; por eso se muestrea.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self.peak_workers = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self) -> None:
+        process = psutil.Process()
+        workers = 0
+        for child in process.children(recursive=True):
+            try:
+                workers += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak_workers = max(self.peak_workers, workers)
+        self.peak = max(self.peak, process.memory_info().rss + workers)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "RssSampler":
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        return {
+            "total": round(self.peak / 2**20, 2),
+            "workers": round(self.peak_workers / 2**20, 2),
+            "self_max": _self_max_rss_mb(),
+        }
+
+
+def _self_max_rss_mb() -> Optional[float]:
+    """Pico de memoria del proceso desde que arrancó (ru_maxrss), si está disponible"""
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2**20, 2)
+
+
+def _git_revision() -> Dict[str, Optional[str]]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip() != ""
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def run_benchmark(args) -> Dict:
+    if args.pdf:
+        with open(args.pdf, "rb") as fh:
+            pdf_bytes = fh.read()
+    else:
+        pdf_bytes = build_pdf(args.pages, args.seed, args.noise, args.irrelevant, args.footer_lines)
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        **_git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "pdf": args.pdf,
+            "pages": None if args.pdf else args.pages,
+            "seed": args.seed,
+            "noise": args.noise,
+            "irrelevant": args.irrelevant,
+            "footer_lines": args.footer_lines,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+        },
+        "document_bytes": len(pdf_bytes),
+    }
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(pdf_bytes)
+    try:
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output, RssSampler() as sampler:
+            stages, counts = measure_stages(tmp.name)
+    finally:
+        os.unlink(tmp.name)
+    report["pages"] = counts
+    report["stages"] = stages
+    report["peak_rss_mb"] = {"stages": sampler.summary()}
+
+    report["extraction"] = {}
+    for mode in args.modes:
+        result = measure_extraction(pdf_bytes, mode, args.repeat, args.warmup, args.workers, args.verbose)
+        report["extraction"][mode] = result
+        report["peak_rss_mb"][mode] = result.pop("peak_rss_mb")
+    return report
+
+
+def _metrics(report: Dict) -> Dict[str, Tuple[float, bool]]:
+    """Métricas comparables: {nombre: (valor, mayor es mejor)}"""
+    metrics = {}
+    for mode, result in report.get("extraction", {}).items():
+        if result.get("pages_per_sec"):
+            metrics[f"extraction.{mode}.pages_per_sec"] = (result["pages_per_sec"], True)
+    for stage, summary in report.get("stages", {}).items():
+        for q in PERCENTILES:
+            if f"p{q}_ms" in summary:
+                metrics[f"stages.{stage}.p{q}_ms"] = (summary[f"p{q}_ms"], False)
+    for phase, rss in report.get("peak_rss_mb", {}).items():
+        if rss.get("total"):
+            metrics[f"peak_rss_mb.{phase}"] = (rss["total"], False)
+    return metrics
+
+
+def compare(base: Dict, new: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """Cambio relativo de cada métrica presente en ambos reportes (positivo = peor)"""
+    old_metrics, new_metrics = _metrics(base), _metrics(new)
+    rows = []
+    for name, (old, higher_is_better) in old_metrics.items():
+        if name not in new_metrics or not old:
+            continue
+        value = new_metrics[name][0]
+        change = (value - old) / old
+        worse = -change if higher_is_better else change
+        rows.append({"metric": name, "base": old, "new": value, "change": round(change, 4),
+                     "regression": worse > threshold})
+    return rows
+
+
+def _print_comparison(rows: List[Dict], base: Dict, new: Dict) -> None:
+    print(f"base {base.get('commit') or '?'}  ->  nuevo {new.get('commit') or '?'}")
+    if base.get("config") != new.get("config"):
+        print("Aviso: los reportes se generaron con configuraciones distintas")
+    width = max((len(row["metric"]) for row in rows), default=10)
+    for row in rows:
+        mark = "  REGRESIÓN" if row["regression"] else ""
+        print(f"{row['metric']:<{width}}  {row['base']:>12.4f}  {row['new']:>12.4f}  "
+              f"{row['change'] * 100:>+8.1f}%{mark}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de extracción sobre reportes INIFAP sintéticos")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.4, help="desplazamiento máximo de cada texto (puntos)")
+    parser.add_argument("--irrelevant", type=float, default=0.1, help="fracción de páginas sin datos")
+    parser.add_argument("--footer-lines", type=int, default=0, help="líneas de notas al pie de cada reporte")
+    parser.add_argument("--pdf", help="medir un PDF existente en lugar del sintético")
+    parser.add_argument("--modes", default="thread,process",
+                        type=lambda s: [m.strip() for m in s.split(",") if m.strip()],
+                        help="modos de extract_data_from_pdf a medir (vacío = solo etapas)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1, help="corridas descartadas por modo (arranque del pool)")
+    parser.add_argument("--output", help="archivo JSON de salida (por defecto, salida estándar)")
+    parser.add_argument("--verbose", action="store_true", help="mostrar los mensajes del extractor")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NUEVO"),
+                        help="comparar dos reportes; sale con código 1 si hay regresiones")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="empeoramiento relativo considerado regresión (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as fh:
+            base = json.load(fh)
+        with open(args.compare[1], encoding="utf-8") as fh:
+            new = json.load(fh)
+        rows = compare(base, new, args.threshold)
+        _print_comparison(rows, base, new)
+        return 1 if any(row["regression"] for row in rows) else 0
+
+    report = run_benchmark(args)
+    data = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(data + "\n")
+    else:
+        print(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import argparse
+import random
+import zlib
+from typing import List, Tuple
+
+# Generador de PDFs sintéticos con el layout de los reportes INIFAP: bloque de
+# datos de la muestra, parámetros físicos y químicos (tabla de pH), tabla de
+# fertilidad, micronutrientes y relaciones entre cationes, más un pie de
+# metodología. El PDF se escribe directamente (Helvetica, WinAnsiEncoding,
+# contenido comprimido con FlateDecode), sin dependencias externas.
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+FONT_SIZE = 8
+
+# Ítem de texto: (x, top, texto) en puntos, con top medido desde arriba
+TextItem = Tuple[float, float, str]
+
+PRODUCERS = ["JUAN PEREZ LOPEZ", "MARIA GARCIA RUIZ", "JOSÉ HERNÁNDEZ NUÑEZ", "ANA LUISA TORRES"]
+CROPS = ["MAIZ", "FRIJOL", "SORGO", "TRIGO"]
+MUNICIPALITIES = ["TEXCOCO", "CHALCO", "ATENCO"]
+LOCALITIES = ["SAN MIGUEL", "LA PAZ", "EL ROSARIO"]
+INTERPRETATIONS = ["Muy alto", "Alto", "Medio", "Mod. bajo", "Bajo", "Muy bajo"]
+FERTILITY_HEADERS = ["M.O", "Fósforo", "Nitrógeno", "Potasio", "Calcio", "Magnesio", "Sodio", "Azufre"]
+MICRONUTRIENTS = ["Hierro (Fe)", "Cobre (Cu)", "Zinc (Zn)", "Manganeso (Mn)", "Boro (B)"]
+RELATIONS = ["Ca/Mg", "Mg/K", "Ca/K", "(Ca+Mg)/K", "K/Mg"]
+
+
+def report_page(rng: random.Random, number: int, noise: float = 0.4, footer_lines: int = 0) -> List[TextItem]:
+    """Ítems de texto de una página de reporte; ``noise`` desplaza cada ítem hasta ±noise puntos"""
+    items: List[TextItem] = []
+
+    def put(x: float, top: float, text: str) -> None:
+        items.append((x + rng.uniform(-noise, noise), top + rng.uniform(-noise, noise), text))
+
+    put(40, 40, "INSTITUTO NACIONAL DE INVESTIGACIONES FORESTALES, AGRÍCOLAS Y PECUARIAS")
+    put(40, 70, "DATOS Y CONDICIONES DE LA MUESTRA")
+    put(40, 90, "Nombre del productor")
+    put(160, 90, rng.choice(PRODUCERS))
+    put(400, 90, "Coordenadas")
+    put(460, 90, "19.45 -99.12")
+    put(40, 105, "Cultivo a establecer")
+    put(160, 105, rng.choice(CROPS))
+    put(300, 105, "Meta de rendimiento")
+    put(400, 105, "%.1f t/ha" % rng.uniform(2, 12))
+    put(40, 120, "Municipio")
+    put(160, 120, rng.choice(MUNICIPALITIES))
+    put(300, 120, "Localidad")
+    put(360, 120, rng.choice(LOCALITIES))
+    put(480, 120, "Cantidad")
+    put(530, 120, "1")
+
+    put(40, 140, "RESULTADOS")
+    clay, silt = rng.uniform(10, 50), rng.uniform(10, 40)
+    physical = [
+        ("Arcilla (%)", "%.1f" % clay),
+        ("Limo (%)", "%.1f" % silt),
+        ("Arena (%)", "%.1f" % (100 - clay - silt)),
+        ("Textura", rng.choice(["Franco", "Arcilloso", "Arenoso"])),
+        ("Porcentaje de saturación (PS)", "%.1f" % rng.uniform(20, 60)),
+        ("Capacidad de campo (cc)", "%.1f" % rng.uniform(10, 40)),
+        ("Punto de marchitez permanente (pmp)", "%.1f" % rng.uniform(5, 20)),
+        ("Conductividad hidráulica", "%.2f" % rng.uniform(0.1, 5)),
+        ("Densidad aparente (Dap)", "%.2f" % rng.uniform(0.9, 1.6)),
+    ]
+    for i, (label, value) in enumerate(physical):
+        put(40, 160 + i * 12, label)
+        put(260, 160 + i * 12, value)
+    chemical = [
+        ("pH (Relación 2:1 agua suelo)", "%.2f" % rng.uniform(4, 9), "Neutro"),
+        ("pH (CaCl2 0.01 M)", "%.2f" % rng.uniform(4, 9), "Moderadamente ácido"),
+        ("pH (KCl 1 M)", "%.2f" % rng.uniform(4, 9), "Ácido"),
+        ("Carbonato de calcio equivalente (%)", rng.choice(["N/A", "1.2"]), "Bajo"),
+        ("Conductividad eléctrica (dS/m)", "%.2f" % rng.uniform(0.1, 3), "Libre de sales"),
+    ]
+    for i, (label, value, interp) in enumerate(chemical):
+        put(40, 275 + i * 12, label)
+        put(260, 275 + i * 12, value)
+        put(330, 275 + i * 12, interp)
+
+    put(40, 350, "FERTILIDAD DEL SUELO")
+    put(40, 370, "Parámetro")
+    for i, header in enumerate(FERTILITY_HEADERS):
+        put(130 + i * 55, 370, header)
+    put(40, 390, "Resultado")
+    for i in range(len(FERTILITY_HEADERS)):
+        put(130 + i * 55, 390, "N/A" if rng.random() < 0.05 else "%.1f" % rng.uniform(0.5, 300))
+    put(40, 410, "Interpretación")
+    for i in range(len(FERTILITY_HEADERS)):
+        put(130 + i * 55, 410, rng.choice(INTERPRETATIONS))
+
+    put(40, 440, "MICRONUTRIENTES")
+    put(40, 460, "Parámetro")
+    put(200, 460, "Unidad")
+    put(300, 460, "Resultado")
+    put(400, 460, "Interpretación")
+    for i, label in enumerate(MICRONUTRIENTS):
+        top = 478 + i * 16
+        put(40, top, label)
+        put(200, top, "mg kg¯¹")
+        put(310, top, "%.2f" % rng.uniform(0.1, 50))
+        put(400, top, rng.choice(INTERPRETATIONS))
+
+    put(40, 580, "RELACIONES ENTRE CATIONES")
+    for i, label in enumerate(RELATIONS):
+        put(60 + i * 100, 600, label)
+        put(62 + i * 100, 618, "%.1f" % rng.uniform(0.5, 40))
+        put(60 + i * 100, 636, rng.choice(["Adecuada", "Baja", "Alta"]))
+
+    put(40, 700, "Muestra %d. Metodología: NOM-021-RECNAT-2000. "
+                 "Los resultados corresponden a la muestra recibida." % number)
+    for i in range(footer_lines):
+        items.append((40, 712 + i * 5, "Nota metodológica %d: los métodos de análisis siguen "
+                                         "la norma oficial y el laboratorio acreditado." % i))
+    return items
+
+
+def filler_page(number: int, lines: int = 30) -> List[TextItem]:
+    """Página sin datos de muestra (anexos, portadas)"""
+    return [(40, 60 + i * 14, "Anexo metodológico %d. Línea de texto de relleno %d para la página." % (number, i))
+            for i in range(lines)]
+
+
+def _escape(text: str) -> bytes:
+    data = text.encode("cp1252")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _content_stream(items: List[TextItem]) -> bytes:
+    ops = [b"BT /F1 %d Tf" % FONT_SIZE]
+    for x, top, text in items:
+        # El origen del texto es la línea base: top + tamaño aproximado de la fuente
+        y = PAGE_HEIGHT - top - (FONT_SIZE - 2)
+        ops.append(b"1 0 0 1 %.2f %.2f Tm (" % (x, y) + _escape(text) + b") Tj")
+    ops.append(b"ET")
+    return b"\n".join(ops)
+
+
+def build_pdf(pages: int, seed: int = 0, noise: float = 0.4, irrelevant: float = 0.1,
+              footer_lines: int = 0) -> bytes:
+    """PDF de ``pages`` páginas; una fracción ``irrelevant`` son páginas de relleno.
+
+    El mismo ``seed`` produce siempre el mismo archivo.
+    """
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = add(b"")  # Se completa al conocer las páginas
+    kids = []
+    for number in range(pages):
+        if rng.random() < irrelevant:
+            items = filler_page(number)
+        else:
+            items = report_page(rng, number, noise, footer_lines)
+        data = zlib.compress(_content_stream(items))
+        contents = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data) + data + b"\nendstream")
+        kids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                        b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+                        % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font, contents)))
+    objects[pages_id - 1] = (b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids)
+                             + b"] /Count %d >>" % len(kids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Genera un reporte INIFAP sintético")
+    parser.add_argument("output", help="ruta del PDF a escribir")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.4, help="desplazamiento máximo de cada texto (puntos)")
+    parser.add_argument("--irrelevant", type=float, default=0.1, help="fracción de páginas sin datos")
+    parser.add_argument("--footer-lines", type=int, default=0, help="líneas de notas al pie de cada reporte")
+    args = parser.parse_args()
+    with open(args.output, "wb") as fh:
+        fh.write(build_pdf(args.pages, args.seed, args.noise, args.irrelevant, args.footer_lines))
+
+
+if __name__ == "__main__":
+    main()
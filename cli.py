@@ -0,0 +1,283 @@
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from api.cache import EXTRACTOR_VERSION
+from api.export import iter_csv, iter_excel
+from api.jobs import BATCH_DOCUMENTS
+from api.records import SOURCE_KEY, RecordStore
+from api.scaner import ExtractionError, ExtractionStopped, iter_records
+
+# Procesamiento por lotes sin servidor: extrae todos los PDFs de directorios o
+# patrones glob y escribe un XLSX/CSV combinado, con la columna ARCHIVO. Tras
+# cada archivo se agrega una línea al checkpoint (JSONL con sus registros),
+# así que una corrida interrumpida continúa donde quedó:
+#
+#     python cli.py reportes/ --recursive -o resultados.xlsx
+#     python cli.py "archivo/2023/**/*.pdf" -o resultados.xlsx -o resultados.csv
+#
+# Un archivo se considera hecho si su checkpoint tiene el mismo tamaño, fecha
+# de modificación y versión del extractor, sin error, detención por plazo ni
+# páginas fallidas.
+
+OUTPUT_FORMATS: Dict[str, Callable[[RecordStore], Iterator[bytes]]] = {
+    ".xlsx": iter_excel,
+    ".csv": iter_csv,
+}
+CHECKPOINT_SUFFIX = ".checkpoint.jsonl"
+EXIT_FAILED = 1       # Algún archivo no se pudo extraer
+EXIT_USAGE = 2        # Argumentos inválidos o sin archivos
+EXIT_INTERRUPTED = 130
+
+
+def _log(message: str) -> None:
+    # Los mensajes del CLI van a stderr; stdout queda para el extractor (--verbose)
+    print(message, file=sys.stderr, flush=True)
+
+
+def find_pdfs(inputs: List[str], recursive: bool = False) -> List[str]:
+    """Rutas absolutas, ordenadas y sin repetir, de los PDFs de directorios, patrones o archivos"""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                candidates = [os.path.join(root, name) for root, _, names in os.walk(item) for name in names]
+            else:
+                candidates = [os.path.join(item, name) for name in os.listdir(item)]
+            found.update(os.path.abspath(path) for path in candidates
+                         if path.lower().endswith(".pdf") and os.path.isfile(path))
+        elif glob.has_magic(item):
+            found.update(os.path.abspath(path) for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        elif os.path.isfile(item):
+            found.add(os.path.abspath(item))
+        else:
+            _log(f"Aviso: no existe {item}")
+    return sorted(found)
+
+
+def _file_identity(path: str) -> Tuple[int, int]:
+    info = os.stat(path)
+    return info.st_size, info.st_mtime_ns
+
+
+class Checkpoint:
+    """Registro de archivos procesados: una línea JSON por archivo, agregada al terminarlo.
+
+    Las entradas repetidas de un archivo se resuelven por la última. Solo se
+    guarda en memoria la posición de cada línea; los registros se vuelven a
+    leer del disco al escribir la salida combinada.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}  # ruta -> metadatos (sin registros)
+        self.offsets: Dict[str, int] = {}
+        self._load()
+        self._fh = open(path, "ab")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as fh:
+            data = fh.read()
+        # Una corrida cortada a mitad de escritura deja una línea incompleta al final
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            os.truncate(self.path, complete)
+        offset = 0
+        for line in data[:complete].splitlines(keepends=True):
+            try:
+                entry = json.loads(line)
+                path = entry["path"]
+            except (ValueError, KeyError, TypeError):
+                _log(f"Aviso: línea inválida en el checkpoint (byte {offset})")
+            else:
+                entry.pop("records", None)
+                self.entries[path] = entry
+                self.offsets[path] = offset
+            offset += len(line)
+
+    def is_done(self, path: str) -> bool:
+        entry = self.entries.get(path)
+        if entry is None or entry.get("error") or entry.get("stopped") or entry.get("failed_pages"):
+            return False
+        if entry.get("version") != EXTRACTOR_VERSION:
+            return False
+        try:
+            return tuple(entry.get("identity") or ()) == _file_identity(path)
+        except OSError:
+            return False
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """Agrega la entrada y la lleva a disco antes de continuar"""
+        offset = self._fh.tell()
+        self._fh.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        meta = {key: value for key, value in entry.items() if key != "records"}
+        self.entries[entry["path"]] = meta
+        self.offsets[entry["path"]] = offset
+
+    def records(self, path: str) -> List[Dict[str, str]]:
+        """Registros guardados del archivo (vacío si no tiene entrada)"""
+        if path not in self.offsets:
+            return []
+        with open(self.path, "rb") as fh:
+            fh.seek(self.offsets[path])
+            return json.loads(fh.readline()).get("records") or []
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _extract(path: str, name: str, mode: Optional[str], timeout: Optional[float],
+             cancel: threading.Event) -> Dict[str, Any]:
+    """Entrada de checkpoint para un archivo: sus registros (con ARCHIVO) o el error"""
+    entry: Dict[str, Any] = {"path": path, "archivo": name, "version": EXTRACTOR_VERSION}
+    stats: Dict[str, Any] = {}
+    records: List[Dict[str, str]] = []
+    start = time.time()
+    try:
+        entry["identity"] = list(_file_identity(path))
+        for _, record in iter_records(path, mode=mode, stats=stats, timeout=timeout, cancel=cancel):
+            record[SOURCE_KEY] = name
+            records.append(record)
+        entry["records"] = records
+    except ExtractionStopped:
+        entry["records"] = records  # Parcial: se vuelve a procesar completo al continuar
+    except ExtractionError as e:
+        entry["error"] = str(e)
+    except Exception as e:
+        entry["error"] = f"Error al procesar PDF: {str(e)}"
+    entry.update(
+        elapsed_seconds=round(time.time() - start, 2),
+        pages_total=stats.get("pages_total", 0),
+        timed_out_pages=stats.get("timed_out_pages", []),
+        failed_pages=stats.get("failed_pages", []),
+        stopped=stats.get("stopped"),
+    )
+    return entry
+
+
+def write_outputs(outputs: List[str], checkpoint: Checkpoint, paths: List[str]) -> int:
+    """Escribe las salidas combinadas con los registros del checkpoint, en el orden de ``paths``"""
+    store = RecordStore()
+    for path in paths:
+        store.extend(checkpoint.records(path))
+    for output in outputs:
+        writer = OUTPUT_FORMATS[os.path.splitext(output)[1].lower()]
+        tmp = f"{output}.tmp"
+        with open(tmp, "wb") as fh:
+            for chunk in writer(store):
+                fh.write(chunk)
+        os.replace(tmp, output)  # La salida anterior se reemplaza solo si la nueva quedó completa
+        _log(f"Salida escrita: {output} ({len(store)} registros)")
+    return len(store)
+
+
+def run(args) -> int:
+    paths = find_pdfs(args.inputs, args.recursive)
+    if not paths:
+        _log("No se encontraron archivos PDF")
+        return EXIT_USAGE
+
+    checkpoint_path = args.checkpoint or args.output[0] + CHECKPOINT_SUFFIX
+    if args.restart and os.path.exists(checkpoint_path):
+        os.unlink(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path)
+    # Nombre en la columna ARCHIVO: ruta relativa al directorio actual
+    names = {path: os.path.relpath(path) for path in paths}
+    pending = [path for path in paths if not checkpoint.is_done(path)]
+    _log(f"{len(paths)} PDF(s): {len(paths) - len(pending)} ya procesado(s) según {checkpoint_path}, "
+         f"{len(pending)} pendiente(s); {args.jobs} documento(s) a la vez")
+
+    cancel = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=args.jobs, thread_name_prefix="scaner-cli")
+    futures: Dict[Future, str] = {}
+    queue = iter(pending)
+    done = failed = 0
+    started = time.time()
+    interrupted = False
+    with contextlib.ExitStack() as stack:
+        if not args.verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        try:
+            # Se mantienen como mucho ``jobs`` archivos en curso para poder detenerse sin cola pendiente
+            for path in queue:
+                futures[executor.submit(_extract, path, names[path], args.mode, args.timeout, cancel)] = path
+                if len(futures) >= args.jobs:
+                    break
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    del futures[future]
+                    entry = future.result()
+                    checkpoint.add(entry)
+                    done += 1
+                    if entry.get("error") or entry.get("stopped"):
+                        failed += 1
+                        reason = entry.get("error") or f"detenido ({entry['stopped']})"
+                        _log(f"[{done}/{len(pending)}] {entry['archivo']}: {reason}")
+                    else:
+                        omitted = f", {len(entry['timed_out_pages'])} página(s) omitida(s) por tiempo" \
+                            if entry["timed_out_pages"] else ""
+                        if entry["failed_pages"]:
+                            omitted += f", {len(entry['failed_pages'])} página(s) con error"
+                        _log(f"[{done}/{len(pending)}] {entry['archivo']}: {len(entry['records'])} registro(s) "
+                             f"en {entry['elapsed_seconds']} s{omitted}")
+                    next_path = next(queue, None)
+                    if next_path is not None:
+                        futures[executor.submit(_extract, next_path, names[next_path], args.mode,
+                                                args.timeout, cancel)] = next_path
+        except KeyboardInterrupt:
+            # Los archivos en curso se detienen sin checkpoint: se repiten completos al continuar
+            interrupted = True
+            cancel.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+    executor.shutdown()
+    if interrupted:
+        checkpoint.close()
+        _log(f"Interrumpido: {done} archivo(s) guardados en {checkpoint_path}; "
+             f"vuelva a ejecutar el mismo comando para continuar")
+        return EXIT_INTERRUPTED
+
+    if pending:
+        _log(f"{done} archivo(s) procesados en {time.time() - started:.1f} s ({failed} con error)")
+    write_outputs(args.output, checkpoint, paths)
+    checkpoint.close()
+    failed_total = sum(not checkpoint.is_done(path) for path in paths)
+    return EXIT_FAILED if failed_total else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Extracción por lotes de reportes INIFAP a un XLSX/CSV combinado")
+    parser.add_argument("inputs", nargs="+", help="directorios, patrones glob (entre comillas) o archivos PDF")
+    parser.add_argument("-o", "--output", action="append", required=True,
+                        help="archivo de salida .xlsx o .csv (se puede repetir)")
+    parser.add_argument("--checkpoint", help=f"archivo de checkpoint (por defecto, la primera salida + {CHECKPOINT_SUFFIX})")
+    parser.add_argument("--restart", action="store_true", help="descartar el checkpoint y procesar todo de nuevo")
+    parser.add_argument("-r", "--recursive", action="store_true", help="incluir los subdirectorios")
+    parser.add_argument("-j", "--jobs", type=int, default=BATCH_DOCUMENTS,
+                        help="documentos procesados a la vez (comparten el pool de procesos)")
+    parser.add_argument("--mode", choices=("process", "thread"), help="modo de extracción (por defecto, SCANER_MODE)")
+    parser.add_argument("--timeout", type=float, help="segundos máximos por archivo (0 = sin plazo)")
+    parser.add_argument("--verbose", action="store_true", help="mostrar los mensajes del extractor")
+    args = parser.parse_args(argv)
+
+    for output in args.output:
+        if os.path.splitext(output)[1].lower() not in OUTPUT_FORMATS:
+            parser.error(f"formato de salida no soportado: {output} (use {', '.join(OUTPUT_FORMATS)})")
+    if args.jobs < 1:
+        parser.error("--jobs debe ser al menos 1")
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
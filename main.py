@@ -1,14 +1,22 @@
-from flask import Flask, request, jsonify, send_file, render_template, send_from_directory
-from api.scaner import extract_data_from_pdf
+from flask import Flask, Response, request, jsonify, send_file, render_template, send_from_directory, stream_with_context
+from api.batch import BatchError, spool_batch
+from api.cache import ResultCache
+from api.deadline import REQUEST_TIMEOUT
+from api.export import EXCEL_MIMETYPE, EXPORT_FORMATS, ExportUnavailable, as_store, iter_excel
+from api.validation import validation_summary
+from api.jobs import FAILED, JobManager
+from api.memory import get_memory_governor
+from api.metrics import METRICS, PROMETHEUS_MIMETYPE, render_prometheus, timed_iter
+from api.pagecache import get_page_cache
+from api.source import spool_to_disk
 from flask_cors import CORS
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
-import io
 import os
+import re
 import json
 import gc
 import psutil
 import logging
+import time
 
 # Configurar logging para mejor debugging
 logging.basicConfig(level=logging.INFO)
@@ -22,9 +30,15 @@ app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
 app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024 * 1024  # 2GB max upload
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 
-# Configuraciones de timeout y memoria
-PROCESSING_TIMEOUT = 3600  # 1 hora para PDFs muy grandes
-MAX_MEMORY_USAGE = 85      # % máximo de memoria RAM
+# Configuración de timeout (la memoria la controla el gobernador, ver api/memory.py)
+PROCESSING_TIMEOUT = REQUEST_TIMEOUT  # Plazo por extracción (SCANER_REQUEST_TIMEOUT, 1 hora por defecto)
+DEADLINE_GRACE = 10  # Segundos extra de espera para que la extracción entregue su resultado parcial
+
+# Extracciones en segundo plano (los resultados expiran según SCANER_JOB_RETENTION)
+result_cache = ResultCache()
+jobs = JobManager(cache=result_cache, timeout=PROCESSING_TIMEOUT)
+STREAM_PROGRESS_INTERVAL = 1.0  # Segundos entre marcos de progreso en streaming
+RESULT_ID_RE = re.compile(r"^[0-9a-f]{64}$")  # Id de resultado: SHA-256 del PDF
 
 
 @app.route('/')
@@ -42,117 +56,139 @@ def api_info():
         "message": "API funcionando",
         "status": "active",
         "memory_usage": f"{memory_info.percent:.1f}%",
-        "memory_available": f"{memory_info.available / (1024**3):.1f} GB"
+        "memory_available": f"{memory_info.available / (1024**3):.1f} GB",
+        "memory_governor": get_memory_governor().stats()
     })
 
+def _receive_pdf_upload():
+    """Valida la subida del formulario y la copia a disco.
+
+    Devuelve (ruta, nombre, sha256, None) o (None, None, None, respuesta de error).
+    """
+    # Verificaciones básicas
+    if 'pdf' not in request.files:
+        return None, None, None, (jsonify({
+            "status": "error",
+            "message": "No se envió el archivo PDF",
+            "code": 400
+        }), 400)
+    
+    pdf_file = request.files['pdf']
+    
+    if pdf_file.filename == '':
+        return None, None, None, (jsonify({
+            "status": "error",
+            "message": "No se seleccionó ningún archivo",
+            "code": 400
+        }), 400)
+    
+    # Verificar tamaño del archivo
+    if request.content_length and request.content_length > 2 * 1024 * 1024 * 1024:
+        return None, None, None, (jsonify({
+            "status": "error",
+            "message": "El archivo es demasiado grande (máximo 2GB)",
+            "code": 413
+        }), 413)
+    
+    logger.info(f"Procesando archivo: {pdf_file.filename}")
+    logger.info(f"Tamaño del archivo: {(request.content_length or 0) / (1024*1024):.1f} MB")
+    
+    # Copiar la subida a disco por bloques; el PDF nunca se carga completo en memoria
+    try:
+        pdf_path, pdf_size, pdf_digest = spool_to_disk(pdf_file.stream)
+        logger.info(f"Archivo guardado en disco: {pdf_size} bytes (sha256 {pdf_digest[:12]})")
+    except OSError as e:
+        logger.error(f"Error al guardar el archivo: {str(e)}")
+        return None, None, None, (jsonify({
+            "status": "error",
+            "message": "No se pudo guardar el archivo para procesarlo",
+            "code": 507
+        }), 507)
+    
+    return pdf_path, pdf_file.filename, pdf_digest, None
+
+def _job_urls(job):
+    return {
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/resultado"
+    }
+
+def _partial_info(job):
+    """Si el resultado está incompleto, por qué y qué páginas se omitieron por tiempo o por error"""
+    return {
+        "partial": job.partial,
+        "stopped": job.page_stats.get("stopped"),
+        "timed_out_pages": job.page_stats.get("timed_out_pages", []),
+        "failed_pages": job.page_stats.get("failed_pages", [])
+    }
+
+def _result_urls(result_id):
+    """Id del resultado guardado y URLs para exportarlo sin reenviar los datos"""
+    if not result_id:
+        return {}
+    return {
+        "result_id": result_id,
+        "export_url": f"/api/resultados/{result_id}/excel",
+        "export_urls": {formato: f"/api/resultados/{result_id}/{formato}" for formato in EXPORT_FORMATS}
+    }
+
 @app.route('/api/procesar-pdf', methods=['POST'])
 def procesar_pdf():
-    initial_memory = psutil.virtual_memory().percent
-    logger.info(f"Iniciando procesamiento - Memoria inicial: {initial_memory:.1f}%")
+    """Versión síncrona: encola el trabajo y espera su resultado"""
+    governor = get_memory_governor()
+    initial_memory = governor.usage(fresh=True) / 2**20
+    logger.info(f"Iniciando procesamiento - Memoria del proceso: {initial_memory:.0f} MB")
     
     try:
-        # Verificaciones básicas
-        if 'pdf' not in request.files:
-            return jsonify({
-                "status": "error",
-                "message": "No se envió el archivo PDF",
-                "code": 400
-            }), 400
-        
-        pdf_file = request.files['pdf']
+        pdf_path, filename, digest, error_response = _receive_pdf_upload()
+        if error_response:
+            return error_response
         
-        if pdf_file.filename == '':
-            return jsonify({
-                "status": "error",
-                "message": "No se seleccionó ningún archivo",
-                "code": 400
-            }), 400
+        logger.info("Iniciando extracción de datos...")
+        job = jobs.submit(pdf_path, filename, digest)
         
-        # Verificar tamaño del archivo
-        if request.content_length and request.content_length > 2 * 1024 * 1024 * 1024:
+        # Al vencer el plazo la extracción se detiene sola y devuelve un resultado parcial
+        if not job.wait(PROCESSING_TIMEOUT + DEADLINE_GRACE if PROCESSING_TIMEOUT else None):
+            # Sigue en segundo plano; el cliente puede consultar su avance
             return jsonify({
-                "status": "error",
-                "message": "El archivo es demasiado grande (máximo 2GB)",
-                "code": 413
-            }), 413
-        
-        logger.info(f"Procesando archivo: {pdf_file.filename}")
-        logger.info(f"Tamaño del archivo: {request.content_length / (1024*1024):.1f} MB")
+                "status": "accepted",
+                "message": "El procesamiento continúa en segundo plano",
+                "job_id": job.id,
+                **_job_urls(job),
+                "code": 202
+            }), 202
         
-        # Leer archivo en chunks para PDFs muy grandes
-        try:
-            pdf_bytes = pdf_file.read()
-            logger.info(f"Archivo leído exitosamente: {len(pdf_bytes)} bytes")
-            
-            # Verificar memoria después de leer el archivo
-            current_memory = psutil.virtual_memory().percent
-            if current_memory > MAX_MEMORY_USAGE:
-                logger.warning(f"Memoria alta después de leer archivo: {current_memory:.1f}%")
-                gc.collect()  # Forzar limpieza de memoria
-                
-        except MemoryError:
-            logger.error("Error de memoria al leer el archivo")
-            return jsonify({
-                "status": "error",
-                "message": "El archivo es demasiado grande para cargar en memoria",
-                "code": 507
-            }), 507
-        
-        # Procesar PDF con manejo optimizado
-        try:
-            logger.info("Iniciando extracción de datos...")
-            datos = extract_data_from_pdf(pdf_bytes)
-            
-            # Limpiar datos del archivo de memoria
-            del pdf_bytes
-            gc.collect()
-            
-            if not datos:
-                return jsonify({
-                    "status": "error",
-                    "message": "No se pudieron extraer datos del PDF",
-                    "code": 422
-                }), 422
-            
-            # Verificar si hay errores en los datos
-            if isinstance(datos, list) and len(datos) == 1 and datos[0].get('error'):
-                return jsonify({
-                    "status": "error",
-                    "message": datos[0]['error'],
-                    "code": 422
-                }), 422
-                
-        except MemoryError:
-            logger.error("Error de memoria durante el procesamiento")
-            gc.collect()
-            return jsonify({
-                "status": "error",
-                "message": "El archivo es demasiado grande para procesar en memoria disponible",
-                "code": 507
-            }), 507
-            
-        except Exception as processing_error:
-            logger.error(f"Error durante procesamiento: {str(processing_error)}")
+        if job.status == FAILED:
             return jsonify({
                 "status": "error",
-                "message": f"Error al procesar PDF: {str(processing_error)}",
-                "code": 500
-            }), 500
+                "message": job.error,
+                "code": 422
+            }), 422
         
-        final_memory = psutil.virtual_memory().percent
-        logger.info(f"Procesamiento completado - Memoria final: {final_memory:.1f}%")
-        logger.info(f"Registros extraídos: {len(datos) if isinstance(datos, list) else 1}")
+        datos = job.result
+        final_memory = governor.usage(fresh=True) / 2**20
+        logger.info(f"Procesamiento completado - Memoria del proceso: {final_memory:.0f} MB")
+        logger.info(f"Registros extraídos: {len(datos)}")
         
         # Crear respuesta optimizada
         response_data = {
             "status": "success",
-            "data": datos,
-            "total_records": len(datos) if isinstance(datos, list) else 1,
+            "data": list(datos),
+            "total_records": len(datos),
+            **_partial_info(job),
+            **_result_urls(job.result_id),
+            "validation": validation_summary(datos),
             "processing_stats": {
-                "memory_initial": f"{initial_memory:.1f}%",
-                "memory_final": f"{final_memory:.1f}%",
-                "memory_used": f"{final_memory - initial_memory:.1f}%"
+                "memory_initial": f"{initial_memory:.0f} MB",
+                "memory_final": f"{final_memory:.0f} MB",
+                "memory_used": f"{final_memory - initial_memory:.0f} MB",
+                "memory_peak": f"{governor.peak / 2**20:.0f} MB",
+                "total_pages": job.total_pages,
+                "elapsed_seconds": round(job.elapsed_seconds(), 2),
+                "cached": job.cached,
+                **job.page_stats
             },
+            "timings": job.timings.summary(),
             "code": 200
         }
         
@@ -168,149 +204,443 @@ def procesar_pdf():
             "code": 500
         }), 500
 
-@app.route('/api/descargar-excel', methods=['POST'])
-def descargar_excel():
+@app.route('/api/procesar-pdf/stream', methods=['POST'])
+def procesar_pdf_stream():
+    """Variante en streaming: envía cada registro en cuanto su página termina.
+
+    Formato NDJSON por defecto (un objeto JSON por línea con campo "type");
+    con ?format=sse o Accept: text/event-stream se usan Server-Sent Events.
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({
-                "status": "error",
-                "message": "No se recibieron datos",
-                "code": 400
-            }), 400
-        
-        logger.info(f"Generando Excel para {len(data)} registros")
+        pdf_path, filename, digest, error_response = _receive_pdf_upload()
+        if error_response:
+            return error_response
         
-        # ORDENAR ALFABÉTICAMENTE POR NOMBRE DEL PRODUCTOR
-        data_sorted = sorted(data, key=lambda x: x.get('nombre_productor', '').upper())
+        job = jobs.submit(pdf_path, filename, digest)
+        use_sse = (request.args.get('format') == 'sse'
+                   or 'text/event-stream' in request.headers.get('Accept', ''))
         
-        # Crear libro de Excel de manera más eficiente
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "Analisis_Suelo_INIFAP"
-        
-        # MAPEO DE COLUMNAS EN EL ORDEN CORRECTO (según tu ejemplo)
-        column_mapping = [
-            ('municipio', 'MUNICIPIO'),
-            ('localidad', 'LOCALIDAD'),
-            ('nombre_productor', 'NOMBRE DEL PRODUCTOR'),
-            ('cultivo_establecer', 'CULTIVO ANTERIOR'),
-            ('arcilla', 'ARCILLA'),
-            ('limo', 'LIMO'),
-            ('arena', 'ARENA'),
-            ('textura', 'TEXTURA'),
-            ('densidad_aparente', 'DA.'),
-            ('ph_agua', 'PH'),
-            ('mo', 'MO.'),
-            ('fosforo', 'FOSFORO'),
-            ('nitrogeno', 'N.INORGANICO'),
-            ('potasio', 'K'),
-            ('magnesio', 'MG'),
-            ('calcio', 'CA'),
-            ('sodio', 'NA'),
-            ('azufre', 'AL'),  # Nota: en tu ejemplo parece ser AL, ajustar según necesidad
-            ('conductividad_electrica', 'CIC'),
-            ('capacidad_campo', 'CIC CALCULADA'),  # Mapear según disponibilidad
-            ('punto_marchitez', 'H'),  # Mapear según disponibilidad
-            ('azufre', 'AZUFRE'),
-            ('hierro', 'HIERRO'),
-            ('cobre', 'COBRE'),
-            ('zinc', 'ZINC'),
-            ('manganeso', 'MANGANESO'),
-            ('boro', 'BORO'),
-            ('', 'Columna1'),  # Columnas vacías del ejemplo
-            ('', 'Columna2'),
-            ('rel_ca_mg', 'CA/MG'),
-            ('rel_mg_k', 'MG/K'),
-            ('rel_ca_k', 'CA/K'),
-            ('rel_ca_mg_k', '(CA₊MG)/K'),
-            ('rel_k_mg', 'K/MG')
-        ]
-        
-        # Estilos para el Excel
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
+        return Response(
+            stream_with_context(_stream_job(job, use_sse)),
+            mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
         )
-        center_alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Escribir encabezados con estilo
-        for col_idx, (_, header) in enumerate(column_mapping, 1):
-            cell = sheet.cell(row=1, column=col_idx, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = border
-            cell.alignment = center_alignment
         
-        # Escribir datos fila por fila (USANDO DATA ORDENADA)
-        for row_idx, record in enumerate(data_sorted, 2):
-            for col_idx, (key, _) in enumerate(column_mapping, 1):
-                # Manejar columnas vacías
-                if key == '':
-                    value = ''
-                else:
-                    # Limpiar y formatear valor
-                    raw_value = record.get(key, 'N/A')
-                    if raw_value in ['No encontrado', 'No analizado', None, '']:
-                        value = 'N/A'
-                    else:
-                        value = str(raw_value).strip()
-                        # Limpiar valores numéricos
-                        if key in ['arcilla', 'limo', 'arena', 'ph_agua', 'mo', 'fosforo', 'nitrogeno', 'potasio', 'calcio', 'magnesio', 'sodio']:
-                            # Remover unidades y texto extra, mantener solo números
-                            import re
-                            numeric_match = re.search(r'([\d.,]+)', value)
-                            if numeric_match:
-                                value = numeric_match.group(1).replace(',', '.')
-                
-                cell = sheet.cell(row=row_idx, column=col_idx, value=value)
-                cell.border = border
-                
-                # Alternar colores de filas para mejor legibilidad
-                if row_idx % 2 == 0:
-                    cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
+    except Exception as e:
+        logger.error(f"Error general en procesamiento: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Error interno del servidor: {str(e)}",
+            "code": 500
+        }), 500
+
+def _stream_job(job, use_sse):
+    """Generador de marcos: start, record, progress y finalmente done o error"""
+    def frame(kind, payload):
+        if use_sse:
+            return f"event: {kind}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        return json.dumps({"type": kind, **payload}, ensure_ascii=False) + "\n"
+    
+    sent = 0
+    last_pages = -1
+    last_progress = 0.0
+    try:
+        yield frame("start", {"job_id": job.id, **_job_urls(job)})
         
-        # Ajustar anchos de columna de manera más inteligente
-        for col_idx, (_, header) in enumerate(column_mapping, 1):
-            # Calcular ancho basado en contenido
-            max_length = len(header)
+        while True:
+            job.wait_for_change(sent, last_pages, timeout=STREAM_PROGRESS_INTERVAL)
+            
+            records = job.records
+            while sent < len(records):
+                yield frame("record", {"index": sent, "data": records[sent]})
+                sent += 1
             
-            # Muestrear algunas filas para calcular ancho (más eficiente)
-            sample_size = min(50, len(data_sorted))
-            for row_idx in range(2, min(2 + sample_size, len(data_sorted) + 2)):
-                cell_value = sheet.cell(row=row_idx, column=col_idx).value
-                if cell_value:
-                    max_length = max(max_length, len(str(cell_value)))
+            # Progreso en cada avance y, como latido, al menos una vez por intervalo
+            now = time.time()
+            if job.pages_done != last_pages or now - last_progress >= STREAM_PROGRESS_INTERVAL:
+                last_pages = job.pages_done
+                last_progress = now
+                status = job.to_dict()
+                yield frame("progress", {key: status[key] for key in
+                                         ("pages_done", "total_pages", "records_found", "elapsed_seconds", "eta_seconds")})
             
-            # Establecer ancho con límites razonables
-            adjusted_width = max(10, min(max_length + 3, 35))
-            column_letter = sheet.cell(row=1, column=col_idx).column_letter
-            sheet.column_dimensions[column_letter].width = adjusted_width
+            if job.finished and sent >= len(job.records):
+                break
+    except GeneratorExit:
+        # El cliente se desconectó: nadie recibirá el resultado
+        if not job.finished:
+            logger.info(f"Cliente desconectado, cancelando el trabajo {job.id}")
+            job.cancel()
+        raise
+    
+    if job.status == FAILED:
+        yield frame("error", {"message": job.error})
+    else:
+        yield frame("done", {"total_records": sent, "total_pages": job.total_pages, "job_id": job.id,
+                             **_result_urls(job.result_id), **_partial_info(job),
+                             "validation": validation_summary(job.result),
+                             "timings": job.timings.summary()})
+
+@app.route('/api/jobs', methods=['POST'])
+def crear_trabajo():
+    """Recibe el PDF y devuelve de inmediato el id del trabajo en segundo plano"""
+    try:
+        pdf_path, filename, digest, error_response = _receive_pdf_upload()
+        if error_response:
+            return error_response
         
-        # Congelar primera fila para navegación fácil
-        sheet.freeze_panes = 'A2'
+        job = jobs.submit(pdf_path, filename, digest)
+        logger.info(f"Trabajo {job.id} encolado para {filename}")
         
-        # Guardar en memoria
-        output = io.BytesIO()
-        workbook.save(output)
-        output.seek(0)
+        return jsonify({
+            "status": "accepted",
+            "job_id": job.id,
+            **_job_urls(job),
+            "code": 202
+        }), 202
         
-        # Limpiar workbook de memoria
-        workbook.close()
-        gc.collect()
+    except Exception as e:
+        logger.error(f"Error al crear trabajo: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Error interno del servidor: {str(e)}",
+            "code": 500
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def estado_trabajo(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Trabajo no encontrado o expirado",
+            "code": 404
+        }), 404
+    
+    return jsonify({
+        "status": "success",
+        "job": job.to_dict(),
+        **_job_urls(job),
+        "code": 200
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancelar_trabajo(job_id):
+    """Detiene un trabajo en curso; conserva los registros extraídos hasta ese momento"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Trabajo no encontrado o expirado",
+            "code": 404
+        }), 404
+    
+    if not job.finished:
+        job.cancel()
+        logger.info(f"Trabajo {job.id} cancelado")
+    
+    return jsonify({
+        "status": "accepted",
+        "job": job.to_dict(),
+        **_job_urls(job),
+        "code": 202
+    }), 202
+
+@app.route('/api/jobs/<job_id>/resultado', methods=['GET'])
+def resultado_trabajo(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Trabajo no encontrado o expirado",
+            "code": 404
+        }), 404
+    
+    if not job.finished:
+        return jsonify({
+            "status": "pending",
+            "job": job.to_dict(),
+            "code": 202
+        }), 202
+    
+    if job.status == FAILED:
+        return jsonify({
+            "status": "error",
+            "message": job.error,
+            "code": 422
+        }), 422
+    
+    return jsonify({
+        "status": "success",
+        "data": list(job.result),
+        "total_records": len(job.result),
+        **_partial_info(job),
+        **_result_urls(job.result_id),
+        "validation": validation_summary(job.result),
+        "processing_stats": {
+            "total_pages": job.total_pages,
+            "elapsed_seconds": round(job.elapsed_seconds(), 2),
+            "cached": job.cached,
+            **job.page_stats
+        },
+        "timings": job.timings.summary(),
+        "code": 200
+    })
+
+def _batch_urls(batch):
+    return {
+        "status_url": f"/api/lotes/{batch.id}",
+        "result_url": f"/api/lotes/{batch.id}/resultado"
+    }
+
+def _batch_not_found():
+    return jsonify({
+        "status": "error",
+        "message": "Lote no encontrado o expirado",
+        "code": 404
+    }), 404
+
+@app.route('/api/lotes', methods=['POST'])
+def crear_lote():
+    """Recibe varios PDFs o ZIPs con PDFs (campo "archivos") y extrae todos en segundo plano"""
+    uploads = [f for f in request.files.getlist('archivos') + request.files.getlist('pdf') if f.filename]
+    if not uploads:
+        return jsonify({
+            "status": "error",
+            "message": "No se enviaron archivos",
+            "code": 400
+        }), 400
+    
+    logger.info(f"Lote con {len(uploads)} archivo(s) subido(s)")
+    try:
+        members, rejected = spool_batch((f.filename, f.stream) for f in uploads)
+    except BatchError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e),
+            "code": 413
+        }), 413
+    except OSError as e:
+        logger.error(f"Error al guardar el lote: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": "No se pudieron guardar los archivos para procesarlos",
+            "code": 507
+        }), 507
+    
+    if not members:
+        return jsonify({
+            "status": "error",
+            "message": "El lote no contiene archivos PDF",
+            "files": rejected,
+            "code": 422
+        }), 422
+    
+    batch = jobs.submit_batch(members, rejected)
+    logger.info(f"Lote {batch.id}: {len(members)} PDF(s) encolados, {len(rejected)} rechazado(s)")
+    
+    return jsonify({
+        "status": "accepted",
+        "batch_id": batch.id,
+        **_batch_urls(batch),
+        "files_total": len(members),
+        "files_rejected": rejected,
+        "code": 202
+    }), 202
+
+@app.route('/api/lotes/<batch_id>', methods=['GET'])
+def estado_lote(batch_id):
+    batch = jobs.get_batch(batch_id)
+    if batch is None:
+        return _batch_not_found()
+    
+    return jsonify({
+        "status": "success",
+        "batch": batch.to_dict(),
+        **_batch_urls(batch),
+        "code": 200
+    })
+
+@app.route('/api/lotes/<batch_id>', methods=['DELETE'])
+def cancelar_lote(batch_id):
+    """Detiene los archivos pendientes del lote; conserva lo extraído hasta ese momento"""
+    batch = jobs.get_batch(batch_id)
+    if batch is None:
+        return _batch_not_found()
+    
+    batch.cancel()
+    return jsonify({
+        "status": "accepted",
+        "batch": batch.to_dict(),
+        **_batch_urls(batch),
+        "code": 202
+    }), 202
+
+@app.route('/api/lotes/<batch_id>/resultado', methods=['GET'])
+def resultado_lote(batch_id):
+    """Registros de todos los archivos con su archivo de origen, más el resumen por archivo"""
+    batch = jobs.get_batch(batch_id)
+    if batch is None:
+        return _batch_not_found()
+    
+    if not batch.finished:
+        return jsonify({
+            "status": "pending",
+            "batch": batch.to_dict(),
+            "code": 202
+        }), 202
+    
+    datos = batch.records()
+    return jsonify({
+        "status": "success" if batch.status != FAILED else "error",
+        "data": list(datos),
+        "total_records": len(datos),
+        "partial": any(job.partial for job in batch.jobs),
+        "files": batch.files(),
+        "validation": validation_summary(datos),
+        "code": 200
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metricas():
+    """Histogramas por etapa y contadores de páginas en formato Prometheus"""
+    return Response(render_prometheus(), mimetype=PROMETHEUS_MIMETYPE)
+
+@app.route('/api/cache', methods=['GET'])
+def estado_cache():
+    """Aciertos, fallos y ocupación de las cachés de resultados y de páginas"""
+    return jsonify({
+        "status": "success",
+        "cache": result_cache.stats(),
+        "page_cache": get_page_cache().stats(),
+        "code": 200
+    })
+
+def _load_result(result_id):
+    """Registros guardados: primero la caché en disco, luego los trabajos retenidos"""
+    if not RESULT_ID_RE.match(result_id):
+        return None
+    payload = result_cache.get(result_id)
+    if payload is not None:
+        return as_store(payload["records"])
+    return jobs.find_result(result_id)
+
+@app.route('/api/resultados/<result_id>', methods=['GET'])
+def obtener_resultado(result_id):
+    datos = _load_result(result_id)
+    if datos is None:
+        return jsonify({
+            "status": "error",
+            "message": "Resultado no encontrado o expirado",
+            "code": 404
+        }), 404
+    
+    return jsonify({
+        "status": "success",
+        "data": list(datos),
+        "total_records": len(datos),
+        **_result_urls(result_id),
+        "validation": validation_summary(datos),
+        "code": 200
+    })
+
+@app.route('/api/resultados/<result_id>/<formato>', methods=['GET'])
+def exportar_resultado(result_id, formato):
+    """Exportación generada en el servidor a partir del resultado guardado.
+
+    Formatos: excel, csv, ndjson y parquet (ver EXPORT_FORMATS). El archivo
+    queda en la caché junto al resultado y se identifica con un ETag (versión
+    del extractor + id + formato), así que las descargas repetidas no lo
+    regeneran y los clientes con copia reciben 304.
+    """
+    export = EXPORT_FORMATS.get(formato)
+    if export is None:
+        return jsonify({
+            "status": "error",
+            "message": f"Formato no soportado: {formato}. Formatos: {', '.join(EXPORT_FORMATS)}",
+            "code": 404
+        }), 404
+    
+    try:
+        etag = f"{result_cache.version}-{result_id}-{formato}"
+        download_name = f"analisis_suelo_INIFAP_{result_id[:12]}.{export.extension}"
+        file_path = result_cache.get_file(result_id, export.extension) if RESULT_ID_RE.match(result_id) else None
+        datos = _load_result(result_id) if file_path is None else None
+        if file_path is None and datos is None:
+            return jsonify({
+                "status": "error",
+                "message": "Resultado no encontrado o expirado",
+                "code": 404
+            }), 404
         
-        logger.info("Excel generado exitosamente")
+        # Solo se responde 304 para un resultado que todavía existe
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        
+        if file_path is None:
+            logger.info(f"Generando {formato} del resultado {result_id[:12]} ({len(datos)} registros)")
+            stage = f"export_{formato}"
+            file_path = result_cache.put_file(result_id, export.extension,
+                                              timed_iter(export.writer(datos), METRICS, stage))
+            
+            if file_path is None:
+                # Caché desactivada: generar y transmitir sin guardar
+                response = Response(stream_with_context(timed_iter(export.writer(datos), METRICS, stage)),
+                                    mimetype=export.mimetype)
+                response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+                response.set_etag(etag)
+                return response
         
         return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            file_path,
+            mimetype=export.mimetype,
             as_attachment=True,
-            download_name=f'analisis_suelo_INIFAP_{len(data_sorted)}_registros.xlsx'
+            download_name=download_name,
+            etag=etag,
+            conditional=True,
+            max_age=0
+        )
+        
+    except ExportUnavailable as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e),
+            "code": 501
+        }), 501
+    except Exception as e:
+        logger.error(f"Error al exportar resultado: {str(e)}")
+        return jsonify({
+            "status": "error",
+            "message": f"Error al generar la exportación {formato}: {str(e)}",
+            "code": 500
+        }), 500
+
+@app.route('/api/descargar-excel', methods=['POST'])
+def descargar_excel():
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                "status": "error",
+                "message": "No se recibieron datos",
+                "code": 400
+            }), 400
+        
+        logger.info(f"Generando Excel para {len(data)} registros")
+        
+        # Los registros pasan al almacén por columnas: números y unidades se
+        # resuelven una vez por columna (iter_excel ordena por productor)
+        registros = as_store(data)
+        
+        # El XLSX se genera y se envía por bloques, sin armar el libro en memoria
+        response = Response(stream_with_context(timed_iter(iter_excel(registros), METRICS, "export_excel")),
+                            mimetype=EXCEL_MIMETYPE)
+        response.headers['Content-Disposition'] = (
+            f'attachment; filename=analisis_suelo_INIFAP_{len(registros)}_registros.xlsx'
         )
+        return response
         
     except Exception as e:
         logger.error(f"Error al generar Excel: {str(e)}")
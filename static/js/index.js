@@ -2,6 +2,8 @@
 // Variables globales para el manejo de datos
 
 let currentData = null;
+let currentExportUrl = null;  // Exportación en el servidor a partir del resultado guardado
+const BATCH_POLL_INTERVAL = 1000;  // Milisegundos entre consultas del estado de un lote
 
 
 // Event listener principal para el formulario
@@ -15,6 +17,7 @@ document.getElementById('pdfForm').addEventListener('submit', async (e) => {
     
     // Ocultar botón de descarga superior si existe
     hideTopDownloadButton();
+    currentExportUrl = null;
     
     const fileInput = document.getElementById('pdfFile');
     const submitBtn = document.querySelector('button[type="submit"]');
@@ -29,42 +32,63 @@ document.getElementById('pdfForm').addEventListener('submit', async (e) => {
     submitBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Procesando análisis...';
     submitBtn.style.pointerEvents = 'none';
 
-    const formData = new FormData();
-    formData.append('pdf', fileInput.files[0]);
-
     try {
-        // Cambiar la ruta para usar /api/procesar-pdf
-        const response = await fetch('/api/procesar-pdf', {
+        // Varios archivos o un ZIP: procesar como lote
+        if (isBatchSelection(fileInput.files)) {
+            await processBatch(Array.from(fileInput.files));
+            return;
+        }
+
+        const formData = new FormData();
+        formData.append('pdf', fileInput.files[0]);
+
+        // Usar la variante en streaming: los registros llegan conforme terminan sus páginas
+        const response = await fetch('/api/procesar-pdf/stream', {
             method: 'POST',
             body: formData
         });
 
-        const responseData = await response.json();
-        
-        // CORRECCIÓN: Manejar la estructura correcta de la respuesta
+        // Los errores de validación llegan como un JSON normal
         if (!response.ok) {
+            const responseData = await response.json();
             showError(responseData.message || "Error desconocido al procesar el PDF");
             return;
         }
 
-        // Verificar si hay error en el status
-        if (responseData.status === "error") {
-            showError(responseData.message || "Error al procesar el PDF");
-            return;
-        }
+        const data = [];
+        let streamError = null;
+        let partialResult = null;
+        startStreamingResults();
+
+        await readNdjsonStream(response, (frame) => {
+            switch (frame.type) {
+                case 'record':
+                    data.push(frame.data);
+                    appendStreamingResult(frame.data, data.length);
+                    break;
+                case 'progress':
+                    updateStreamingProgress(frame);
+                    break;
+                case 'done':
+                    currentExportUrl = frame.export_url || null;
+                    partialResult = frame.partial ? frame : null;
+                    break;
+                case 'error':
+                    streamError = frame.message;
+                    break;
+            }
+        });
 
-        // Extraer los datos del objeto respuesta
-        const data = responseData.data;
-        
-        // Verificar si data es un array y no está vacío
-        if (!Array.isArray(data) || data.length === 0) {
-            showError("No se encontraron datos válidos en el archivo PDF");
+        if (streamError) {
+            document.getElementById('resultContainer').classList.add('hidden');
+            showError(streamError);
             return;
         }
 
-        // Verificar si el primer elemento contiene error
-        if (data[0] && data[0].error) {
-            showError(data[0].error);
+        // Verificar si data no está vacío
+        if (data.length === 0) {
+            document.getElementById('resultContainer').classList.add('hidden');
+            showError("No se encontraron datos válidos en el archivo PDF");
             return;
         }
 
@@ -74,11 +98,18 @@ document.getElementById('pdfForm').addEventListener('submit', async (e) => {
         // Mostrar botón de descarga en la parte superior PRIMERO
         showTopDownloadButton();
         
-        // Mostrar resultados con efectos visuales
-        displayResults(data);
+        // Completar la vista con estadísticas y paginación
+        finishStreamingResults(data);
         
-        // Mostrar mensaje de éxito
-        showSuccess(`Análisis completado: ${data.length} muestra(s) procesada(s) exitosamente`);
+        // Mostrar mensaje de éxito (o aviso si el resultado quedó incompleto)
+        if (partialResult) {
+            const omitted = partialResult.timed_out_pages.length
+                ? `; páginas omitidas por tiempo: ${partialResult.timed_out_pages.join(', ')}`
+                : '';
+            showSuccess(`Análisis parcial: ${data.length} muestra(s) procesada(s)${omitted}`);
+        } else {
+            showSuccess(`Análisis completado: ${data.length} muestra(s) procesada(s) exitosamente`);
+        }
         
     } catch (error) {
         showError("Error de conexión: " + error.message);
@@ -90,6 +121,77 @@ document.getElementById('pdfForm').addEventListener('submit', async (e) => {
     }
 });
 
+function isZipFile(file) {
+    return file.name.toLowerCase().endsWith('.zip');
+}
+
+function isBatchSelection(files) {
+    return files.length > 1 || Array.from(files).some(isZipFile);
+}
+
+// Lote de varios PDFs o ZIPs: se envía a /api/lotes y se consulta su avance
+async function processBatch(files) {
+    const formData = new FormData();
+    files.forEach(file => formData.append('archivos', file));
+
+    const response = await fetch('/api/lotes', {
+        method: 'POST',
+        body: formData
+    });
+    const created = await response.json();
+    if (!response.ok) {
+        showError(created.message || "Error desconocido al procesar los archivos");
+        return;
+    }
+
+    startStreamingResults();
+    let batch;
+    do {
+        await new Promise(resolve => setTimeout(resolve, BATCH_POLL_INTERVAL));
+        const statusResponse = await fetch(created.status_url);
+        if (!statusResponse.ok) {
+            throw new Error("No se pudo consultar el avance del lote");
+        }
+        batch = (await statusResponse.json()).batch;
+        updateBatchProgress(batch);
+    } while (!batch.finished);
+
+    const resultResponse = await fetch(created.result_url);
+    const result = await resultResponse.json();
+    if (!resultResponse.ok || result.status !== 'success') {
+        document.getElementById('resultContainer').classList.add('hidden');
+        showError(result.message || "No se pudo extraer ningún archivo del lote");
+        return;
+    }
+
+    const data = result.data;
+    if (data.length === 0) {
+        document.getElementById('resultContainer').classList.add('hidden');
+        showError("No se encontraron datos válidos en los archivos");
+        return;
+    }
+
+    currentData = data;
+    showTopDownloadButton();
+    data.slice(0, RESULTS_BATCH_SIZE).forEach((record, i) => appendStreamingResult(record, i + 1));
+    finishStreamingResults(data);
+
+    const failed = result.files.filter(file => file.state !== 'completed');
+    const omitted = failed.length ? ` · ${failed.length} archivo(s) con error u omitido(s)` : '';
+    showSuccess(`Lote completado: ${data.length} muestra(s) de ${result.files.length} archivo(s)${omitted}`);
+}
+
+function updateBatchProgress(batch) {
+    const progressDiv = document.getElementById('streamProgress');
+    if (!progressDiv) return;
+
+    const pages = batch.total_pages ? ` · ${batch.pages_done}/${batch.total_pages} páginas` : '';
+    progressDiv.innerHTML = `
+        <i class="fas fa-spinner fa-spin"></i>
+        Procesando lote: ${batch.files_done}/${batch.files_total} archivos${pages} · ${batch.records_found} registro(s)
+    `;
+}
+
 // Función para mostrar el botón de descarga en la parte superior
 function showTopDownloadButton() {
     // Verificar si ya existe el contenedor
@@ -141,64 +243,51 @@ function hideTopDownloadButton() {
     }
 }
 
-// Función para mostrar los resultados con diseño mejorado
-// Función optimizada para mostrar resultados de PDFs grandes
-function displayResults(data) {
-    const resultsList = document.getElementById('resultsList');
-    
-    // Limpiar contenido anterior
-    resultsList.innerHTML = '';
-    
-    // Crear estadísticas generales
-    const statsSection = createStatsSection(data);
-    resultsList.appendChild(statsSection);
-    
-    // Para PDFs muy grandes, mostrar en lotes para no sobrecargar el DOM
-    const BATCH_SIZE = 20; // Mostrar 20 registros por lote
-    let currentBatch = 0;
-    
-    function renderBatch() {
-        const start = currentBatch * BATCH_SIZE;
-        const end = Math.min(start + BATCH_SIZE, data.length);
-        
-        for (let i = start; i < end; i++) {
-            const result = data[i];
-            const resultItem = createResultItem(result, i + 1);
-            resultsList.appendChild(resultItem);
-        }
-        
-        currentBatch++;
-        
-        // Si hay más datos, crear botón para cargar más
-        if (end < data.length) {
-            const loadMoreBtn = document.createElement('button');
-            loadMoreBtn.textContent = `Cargar más registros (${end}/${data.length})`;
-            loadMoreBtn.className = 'load-more-btn';
-            loadMoreBtn.style.cssText = `
-                width: 100%;
-                padding: 1rem;
-                margin: 1rem 0;
-                background: var(--accent-color);
-                color: white;
-                border: none;
-                border-radius: 8px;
-                font-size: 1rem;
-                cursor: pointer;
-                transition: all 0.3s ease;
-            `;
-            
-            loadMoreBtn.addEventListener('click', () => {
-                loadMoreBtn.remove();
-                renderBatch();
-            });
-            
-            resultsList.appendChild(loadMoreBtn);
+// Lee una respuesta NDJSON línea por línea conforme llegan los bloques
+async function readNdjsonStream(response, onFrame) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onFrame(JSON.parse(line));
         }
     }
-    
-    // Renderizar primer lote
-    renderBatch();
-    
+
+    buffer += decoder.decode();
+    if (buffer.trim()) onFrame(JSON.parse(buffer));
+}
+
+// Para PDFs muy grandes, mostrar en lotes para no sobrecargar el DOM
+const RESULTS_BATCH_SIZE = 20; // Mostrar 20 registros por lote
+
+// Preparar el contenedor de resultados antes de que llegue el primer registro
+function startStreamingResults() {
+    const resultsList = document.getElementById('resultsList');
+    resultsList.innerHTML = '';
+
+    const progressDiv = document.createElement('div');
+    progressDiv.id = 'streamProgress';
+    progressDiv.style.cssText = `
+        padding: 1rem;
+        margin-bottom: 1rem;
+        background: var(--light-green);
+        border-radius: 8px;
+        border: 1px solid var(--border-color);
+        color: var(--primary-color);
+        font-weight: 500;
+    `;
+    progressDiv.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Iniciando análisis...';
+    resultsList.appendChild(progressDiv);
+
     // Mostrar el contenedor con animación
     document.getElementById('resultContainer').classList.remove('hidden');
     
@@ -211,6 +300,75 @@ function displayResults(data) {
     }, 300);
 }
 
+// Agregar un registro recibido; solo el primer lote se dibuja durante el streaming
+function appendStreamingResult(result, index) {
+    if (index > RESULTS_BATCH_SIZE) return;
+    document.getElementById('resultsList').appendChild(createResultItem(result, index));
+}
+
+function updateStreamingProgress(frame) {
+    const progressDiv = document.getElementById('streamProgress');
+    if (!progressDiv) return;
+
+    const pages = frame.total_pages ? `${frame.pages_done}/${frame.total_pages} páginas` : 'Leyendo PDF...';
+    const eta = frame.eta_seconds != null ? ` · ~${Math.ceil(frame.eta_seconds)} s restantes` : '';
+    progressDiv.innerHTML = `
+        <i class="fas fa-spinner fa-spin"></i>
+        Procesando: ${pages} · ${frame.records_found} registro(s)${eta}
+    `;
+}
+
+// Cerrar el streaming: quitar el progreso, agregar estadísticas y el botón "Cargar más"
+function finishStreamingResults(data) {
+    const resultsList = document.getElementById('resultsList');
+    const progressDiv = document.getElementById('streamProgress');
+    if (progressDiv) progressDiv.remove();
+
+    resultsList.insertBefore(createStatsSection(data), resultsList.firstChild);
+    appendLoadMoreButton(data, Math.min(RESULTS_BATCH_SIZE, data.length));
+}
+
+function renderResultBatch(data, start) {
+    const resultsList = document.getElementById('resultsList');
+    const end = Math.min(start + RESULTS_BATCH_SIZE, data.length);
+    
+    for (let i = start; i < end; i++) {
+        const result = data[i];
+        const resultItem = createResultItem(result, i + 1);
+        resultsList.appendChild(resultItem);
+    }
+    
+    appendLoadMoreButton(data, end);
+}
+
+// Si hay más datos, crear botón para cargar más
+function appendLoadMoreButton(data, next) {
+    if (next >= data.length) return;
+    
+    const loadMoreBtn = document.createElement('button');
+    loadMoreBtn.textContent = `Cargar más registros (${next}/${data.length})`;
+    loadMoreBtn.className = 'load-more-btn';
+    loadMoreBtn.style.cssText = `
+        width: 100%;
+        padding: 1rem;
+        margin: 1rem 0;
+        background: var(--accent-color);
+        color: white;
+        border: none;
+        border-radius: 8px;
+        font-size: 1rem;
+        cursor: pointer;
+        transition: all 0.3s ease;
+    `;
+    
+    loadMoreBtn.addEventListener('click', () => {
+        loadMoreBtn.remove();
+        renderResultBatch(data, next);
+    });
+    
+    document.getElementById('resultsList').appendChild(loadMoreBtn);
+}
+
 // Función auxiliar para crear un item de resultado
 function createResultItem(result, index) {
     const resultItem = document.createElement('div');
@@ -219,6 +377,7 @@ function createResultItem(result, index) {
     // HTML simplificado para mejor rendimiento
     resultItem.innerHTML = `
         <h4><i class="fas fa-seedling"></i> Registro ${index}:</h4>
+        ${result.archivo ? `<p class="source-file"><i class="fas fa-file-pdf"></i> ${result.archivo}</p>` : ''}
         
         <div class="producer-info">
             <p><strong><i class="fas fa-user"></i> Productor:</strong> ${result.nombre_productor || 'No especificado'}</p>
@@ -324,14 +483,18 @@ async function downloadExcel() {
             btn.style.pointerEvents = 'none';
         });
 
-        // Cambiar la ruta para usar /api/descargar-excel
-        const response = await fetch('/api/descargar-excel', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(currentData)
-        });
+        // Preferir la exportación en el servidor (sin reenviar los datos);
+        // si el resultado ya no está guardado, enviar los datos a /api/descargar-excel
+        let response = currentExportUrl ? await fetch(currentExportUrl) : null;
+        if (!response || response.status === 404) {
+            response = await fetch('/api/descargar-excel', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(currentData)
+            });
+        }
 
         if (!response.ok) {
             const errorData = await response.json();
@@ -437,7 +600,7 @@ document.addEventListener('DOMContentLoaded', function() {
     // Actualizar display cuando se selecciona un archivo
     fileInput.addEventListener('change', function() {
         if (this.files && this.files[0]) {
-            updateFileDisplay(this.files[0]);
+            updateFileDisplay(this.files);
         }
     });
     
@@ -479,14 +642,28 @@ document.addEventListener('DOMContentLoaded', function() {
         
         if (files.length > 0) {
             fileInput.files = files;
-            updateFileDisplay(files[0]);
+            updateFileDisplay(files);
         }
     }
 });
 
-// Función para actualizar el display del archivo seleccionado
-function updateFileDisplay(file) {
+// Función para actualizar el display de los archivos seleccionados
+function updateFileDisplay(files) {
     const fileInfo = document.querySelector('.file-info');
+
+    if (isBatchSelection(files)) {
+        const totalSize = Array.from(files).reduce((sum, file) => sum + file.size, 0);
+        fileInfo.innerHTML = `
+            <h3><i class="fas fa-copy" style="color: var(--accent-color);"></i> ${files.length} archivo(s)</h3>
+            <p><i class="fas fa-weight-hanging"></i> Tamaño total: ${(totalSize / 1024 / 1024).toFixed(2)} MB</p>
+            <p style="margin-top: 0.5rem; font-size: 0.8rem; color: var(--accent-color);">
+                <i class="fas fa-check-circle"></i> Lote listo para procesar
+            </p>
+        `;
+        return;
+    }
+
+    const file = files[0];
     const fileSize = (file.size / 1024 / 1024).toFixed(2);
     
     if (file.type !== 'application/pdf') {
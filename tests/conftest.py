@@ -0,0 +1,12 @@
+import pytest
+
+from api import scaner
+from api.pagecache import PageCache
+
+
+@pytest.fixture(autouse=True)
+def page_cache(monkeypatch, tmp_path):
+    """Caché de páginas de las extracciones de cada prueba: desactivada y fuera del directorio real"""
+    disabled = PageCache(str(tmp_path / "pages"), max_entries=0)
+    monkeypatch.setattr(scaner, "get_page_cache", lambda: disabled)
+    return disabled
@@ -0,0 +1,78 @@
+import hashlib
+import io
+import os
+import zipfile
+
+import pytest
+
+from api import batch, source
+from api.batch import BatchError, spool_batch
+from bench import synthetic
+
+# Ingesta de lotes: PDFs sueltos y dentro de ZIP, rechazo de lo que no es
+# PDF y límites de cantidad y de tamaño descomprimido. Ante un BatchError no
+# debe quedar ningún archivo copiado.
+
+PDF = synthetic.build_pdf(1, seed=1)
+
+
+def _zip(members) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def spool_dir(monkeypatch, tmp_path) -> str:
+    path = tmp_path / "spool"
+    path.mkdir()
+    monkeypatch.setattr(source, "SPOOL_DIR", str(path))
+    return str(path)
+
+
+def test_pdfs_and_zip_members_are_accepted_in_order(spool_dir):
+    archive = _zip([
+        ("dir/", b""),
+        ("dir/b.pdf", PDF),
+        ("__MACOSX/._b.pdf", b"x"),
+        ("notas.txt", b"hola"),
+        ("falso.pdf", b"no es un pdf"),
+    ])
+    members, rejected = spool_batch([("a.pdf", io.BytesIO(PDF)), ("lote.zip", io.BytesIO(archive)),
+                                     ("texto.pdf", io.BytesIO(b"hola"))])
+
+    assert [name for _, name, _ in members] == ["a.pdf", "lote.zip/dir/b.pdf"]
+    assert all(digest == hashlib.sha256(PDF).hexdigest() for _, _, digest in members)
+    assert rejected == [
+        {"archivo": "lote.zip/notas.txt", "error": "No es un archivo PDF"},
+        {"archivo": "lote.zip/falso.pdf", "error": "No es un archivo PDF"},
+        {"archivo": "texto.pdf", "error": "No es un archivo PDF"},
+    ]
+    # Solo quedan en disco los PDFs aceptados (el llamador los borra)
+    assert sorted(os.listdir(spool_dir)) == sorted(os.path.basename(path) for path, _, _ in members)
+
+
+def test_too_many_files(spool_dir, monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_MAX_FILES", 2)
+    with pytest.raises(BatchError, match="máximo de 2 archivos"):
+        spool_batch([("a.pdf", io.BytesIO(PDF)), ("lote.zip", io.BytesIO(_zip([("b.pdf", PDF), ("c.pdf", PDF)])))])
+    assert os.listdir(spool_dir) == []
+
+
+def test_too_many_bytes(spool_dir, monkeypatch):
+    monkeypatch.setattr(batch, "BATCH_MAX_BYTES", len(PDF) + 10)
+    with pytest.raises(BatchError, match="descomprimidos"):
+        spool_batch([("a.pdf", io.BytesIO(PDF)), ("b.pdf", io.BytesIO(PDF))])
+    assert os.listdir(spool_dir) == []
+
+
+def test_zip_member_larger_than_budget(spool_dir, monkeypatch):
+    # Un miembro muy comprimible que supera el presupuesto al descomprimirse
+    monkeypatch.setattr(batch, "BATCH_MAX_BYTES", 1 << 20)
+    bomb = _zip([("grande.pdf", b"%PDF" + b"\0" * (4 << 20))])
+    assert len(bomb) < batch.BATCH_MAX_BYTES
+    with pytest.raises(BatchError, match="descomprimidos"):
+        spool_batch([("a.pdf", io.BytesIO(PDF)), ("bomba.zip", io.BytesIO(bomb))])
+    assert os.listdir(spool_dir) == []
@@ -0,0 +1,102 @@
+import os
+import time
+
+import pytest
+
+from api import cache
+from api.cache import ResultCache
+
+# Caché de resultados: desalojo de los archivos menos usados al pasar el
+# límite de tamaño y limpieza de los directorios de otras versiones.
+
+VERSION = "1.0.0-aaaaaaaaaaaa"
+DAY = 86400
+
+
+def _payload(seed: int):
+    # Contenido poco compresible para que cada entrada ocupe lo mismo en disco
+    return {"records": [{"nombre_productor": os.urandom(2048).hex()}], "seed": seed}
+
+
+def _age(path: str, seconds: float) -> None:
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def _digest(char: str) -> str:
+    return char * 64
+
+
+def test_put_evicts_least_recently_used(tmp_path):
+    probe = ResultCache(str(tmp_path / "probe"), max_bytes=1 << 30, version=VERSION)
+    probe.put(_digest("0"), _payload(0))
+    entry_size = probe.stats()["bytes"]
+
+    results = ResultCache(str(tmp_path), max_bytes=int(entry_size * 2.5), version=VERSION)
+    results.put(_digest("a"), _payload(1))
+    results.put(_digest("b"), _payload(2))
+    _age(results._path(_digest("a")), 200)
+    _age(results._path(_digest("b")), 100)
+
+    assert results.get(_digest("a"))["seed"] == 1  # Leer la marca como usada recientemente
+    results.put(_digest("c"), _payload(3))
+
+    assert results.get(_digest("b")) is None
+    assert results.get(_digest("a"))["seed"] == 1
+    assert results.get(_digest("c"))["seed"] == 3
+    assert results.stats()["entries"] == 2
+    assert results.stats()["bytes"] <= results.max_bytes
+
+
+def test_put_file_keeps_the_new_export(tmp_path):
+    results = ResultCache(str(tmp_path), max_bytes=1024, version=VERSION)
+    path = results.put_file(_digest("a"), "csv", [b"x" * 4096])
+
+    assert path is not None and os.path.exists(path)
+    assert results.get_file(_digest("a"), "csv") == path
+    assert results.get_file(_digest("b"), "csv") is None
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    results = ResultCache(str(tmp_path / "off"), max_bytes=0, version=VERSION)
+    results.put(_digest("a"), _payload(1))
+
+    assert results.get(_digest("a")) is None
+    assert not os.path.exists(tmp_path / "off")
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    """Directorio compartido con versiones viejas, recientes y contenido ajeno a la caché"""
+    def version_dir(name: str, age_days: float) -> str:
+        path = tmp_path / name
+        path.mkdir()
+        (path / f"{_digest('d')}.json.gz").write_bytes(b"")
+        for item in (path / f"{_digest('d')}.json.gz", path):
+            _age(str(item), age_days * DAY)
+        return str(path)
+
+    version_dir("1.0.0-000000000000", cache.STALE_VERSION_DAYS + 1)
+    version_dir("1.0.0-111111111111", cache.STALE_VERSION_DAYS - 1)
+    version_dir("mis-datos", cache.STALE_VERSION_DAYS + 30)
+    (tmp_path / "notas.txt").write_text("no es de la caché")
+    return tmp_path
+
+
+def test_stale_versions_are_removed(cache_dir):
+    ResultCache(str(cache_dir), max_bytes=1 << 30, version=VERSION)
+
+    assert sorted(os.listdir(cache_dir)) == [
+        "1.0.0-111111111111",  # Otra versión en uso reciente
+        VERSION,
+        "mis-datos",           # No la creó la caché
+        "notas.txt",
+    ]
+
+
+def test_recently_used_entry_keeps_old_version_dir(cache_dir):
+    old = cache_dir / "1.0.0-000000000000"
+    os.utime(old / f"{_digest('d')}.json.gz")  # Otra instancia la acaba de leer
+    ResultCache(str(cache_dir), max_bytes=1 << 30, version=VERSION)
+
+    assert old.exists()
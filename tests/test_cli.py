@@ -0,0 +1,106 @@
+import csv
+import json
+import os
+
+import pytest
+
+import cli
+from api.deadline import STOP_DEADLINE
+from api.scaner import ExtractionStopped
+from bench import synthetic
+
+# Modo por lotes del CLI: el checkpoint guarda cada archivo terminado y una
+# segunda corrida solo extrae los archivos nuevos, modificados o que no
+# terminaron bien.
+
+PAGES = 2
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    """Directorio con dos reportes; los nombres de ARCHIVO son relativos a tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / "reportes"
+    folder.mkdir()
+    for name, seed in (("a.pdf", 1), ("b.pdf", 2)):
+        (folder / name).write_bytes(synthetic.build_pdf(PAGES, seed=seed, irrelevant=0))
+    return folder
+
+
+@pytest.fixture
+def extracted(monkeypatch):
+    """Archivos que llegan a iter_records, en orden"""
+    paths = []
+    iter_records = cli.iter_records
+
+    def recording(path, **kwargs):
+        paths.append(path)
+        return iter_records(path, **kwargs)
+
+    monkeypatch.setattr(cli, "iter_records", recording)
+    return paths
+
+
+def _run(folder) -> int:
+    return cli.main([str(folder), "-o", "salida.csv", "--mode", "thread", "-j", "1"])
+
+
+def _sources():
+    with open("salida.csv", encoding="utf-8") as fh:
+        return [row["ARCHIVO"] for row in csv.DictReader(fh)]
+
+
+def test_second_run_resumes_from_checkpoint(reports, extracted):
+    assert _run(reports) == 0
+    assert [os.path.basename(path) for path in extracted] == ["a.pdf", "b.pdf"]
+    first = _sources()
+    assert sorted(set(first)) == ["reportes/a.pdf", "reportes/b.pdf"]
+    assert len(first) == 2 * PAGES
+
+    extracted.clear()
+    assert _run(reports) == 0
+    assert extracted == []
+    assert _sources() == first
+
+    # Un archivo modificado se vuelve a extraer; el otro sigue en el checkpoint
+    (reports / "b.pdf").write_bytes(synthetic.build_pdf(PAGES + 1, seed=2, irrelevant=0))
+    assert _run(reports) == 0
+    assert [os.path.basename(path) for path in extracted] == ["b.pdf"]
+    assert sorted(_sources()) == sorted(["reportes/a.pdf"] * PAGES + ["reportes/b.pdf"] * (PAGES + 1))
+
+
+def test_stopped_file_is_extracted_again(reports, extracted, monkeypatch):
+    iter_records = cli.iter_records
+
+    def stops_on_b(path, **kwargs):
+        if path.endswith("b.pdf"):
+            kwargs["stats"]["stopped"] = STOP_DEADLINE  # Como el plazo vencido de iter_records
+            raise ExtractionStopped(STOP_DEADLINE)
+        return iter_records(path, **kwargs)
+
+    monkeypatch.setattr(cli, "iter_records", stops_on_b)
+    assert _run(reports) == cli.EXIT_FAILED
+    assert _sources() == ["reportes/a.pdf"] * PAGES
+
+    monkeypatch.setattr(cli, "iter_records", iter_records)
+    extracted.clear()
+    assert _run(reports) == 0
+    assert [os.path.basename(path) for path in extracted] == ["b.pdf"]
+    assert len(_sources()) == 2 * PAGES
+
+
+def test_incomplete_checkpoint_line_is_discarded(reports, extracted):
+    assert _run(reports) == 0
+    checkpoint = "salida.csv" + cli.CHECKPOINT_SUFFIX
+    with open(checkpoint, "rb") as fh:
+        lines = fh.read().splitlines(keepends=True)
+    # Corrida cortada a mitad de escribir la entrada de b.pdf
+    with open(checkpoint, "wb") as fh:
+        fh.write(lines[0] + lines[1][:40])
+
+    extracted.clear()
+    assert _run(reports) == 0
+    assert [os.path.basename(path) for path in extracted] == ["b.pdf"]
+    with open(checkpoint, "rb") as fh:
+        entries = [json.loads(line) for line in fh]
+    assert [entry["archivo"] for entry in entries] == ["reportes/a.pdf", "reportes/b.pdf"]
@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+import re
+import zipfile
+from xml.etree import ElementTree
+
+import pytest
+
+from api.export import COLUMN_MAPPING, iter_csv, iter_excel, iter_ndjson
+from api.fields import NOT_ANALYZED, NOT_FOUND
+from api.records import SOURCE_KEY, RecordStore
+
+# Exportaciones tipadas: las columnas numéricas salen como números (con la
+# coma decimal y la unidad ya resueltas), los marcadores como nulos y las
+# filas ordenadas por productor.
+
+RECORDS = [
+    {"nombre_productor": "ZOILA RUIZ", "municipio": "TEXCOCO", "arcilla": "12.5",
+     "densidad_aparente": "1,58 g/cm³", "mo": NOT_FOUND, "textura": "Franco"},
+    {"nombre_productor": "ANA LOPEZ", "municipio": "CHALCO", "arcilla": NOT_FOUND,
+     "densidad_aparente": "1.2", "mo": "2.5", "ph_agua": NOT_ANALYZED, "textura": "Arcilloso"},
+]
+HEADERS = [header for _, header in COLUMN_MAPPING]
+NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _column(header: str) -> int:
+    return HEADERS.index(header)
+
+
+def _xlsx_rows(data: bytes):
+    """Filas de la primera hoja: float en las celdas numéricas, texto o None (vacía)"""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    rows = []
+    for row in sheet.iterfind("x:sheetData/x:row", NS):
+        cells = {}
+        for cell in row.iterfind("x:c", NS):
+            letters = re.match(r"[A-Z]+", cell.get("r")).group(0)
+            column = 0
+            for letter in letters:
+                column = column * 26 + ord(letter) - ord("A") + 1
+            if cell.get("t") == "inlineStr":
+                cells[column - 1] = cell.findtext("x:is/x:t", namespaces=NS)
+            elif cell.find("x:v", NS) is not None:
+                cells[column - 1] = float(cell.findtext("x:v", namespaces=NS))
+            else:
+                cells[column - 1] = None
+        rows.append([cells.get(idx) for idx in range(len(HEADERS))])
+    return rows
+
+
+def test_csv_has_typed_cells():
+    rows = list(csv.reader(io.StringIO(b"".join(iter_csv(RecordStore(RECORDS))).decode("utf-8"))))
+
+    assert rows[0] == HEADERS
+    assert [row[_column("NOMBRE DEL PRODUCTOR")] for row in rows[1:]] == ["ANA LOPEZ", "ZOILA RUIZ"]
+    ana, zoila = rows[1:]
+    assert ana[_column("ARCILLA")] == ""
+    assert ana[_column("PH")] == ""
+    assert ana[_column("MO.")] == "2.5"
+    assert zoila[_column("ARCILLA")] == "12.5"
+    assert zoila[_column("DA.")] == "1.58"
+    assert zoila[_column("TEXTURA")] == "Franco"
+
+
+def test_ndjson_has_typed_values():
+    lines = b"".join(iter_ndjson(RECORDS)).decode("utf-8").splitlines()
+    ana, zoila = [json.loads(line) for line in lines]
+
+    assert "Columna1" not in ana
+    assert ana["NOMBRE DEL PRODUCTOR"] == "ANA LOPEZ"
+    assert ana["ARCILLA"] is None
+    assert ana["PH"] is None
+    assert ana["DA."] == 1.2
+    assert zoila["ARCILLA"] == 12.5
+    assert zoila["DA."] == 1.58
+    assert zoila["MO."] is None
+
+
+def test_xlsx_has_numeric_cells():
+    header, ana, zoila = _xlsx_rows(b"".join(iter_excel(RECORDS)))
+
+    assert header == HEADERS
+    assert ana[_column("NOMBRE DEL PRODUCTOR")] == "ANA LOPEZ"
+    assert ana[_column("ARCILLA")] == "N/A"
+    assert ana[_column("MO.")] == 2.5
+    assert ana[_column("Columna1")] is None
+    assert zoila[_column("ARCILLA")] == 12.5
+    assert zoila[_column("DA.")] == 1.58
+    assert zoila[_column("TEXTURA")] == "Franco"
+
+
+@pytest.mark.parametrize("writer", [iter_csv, iter_ndjson])
+def test_source_column_only_with_several_files(writer):
+    single = b"".join(writer(RECORDS)).decode("utf-8")
+    batch = b"".join(writer([dict(record, **{SOURCE_KEY: "lote/a.pdf"}) for record in RECORDS])).decode("utf-8")
+
+    assert "ARCHIVO" not in single
+    assert "ARCHIVO" in batch and "lote/a.pdf" in batch
@@ -0,0 +1,59 @@
+import io
+import re
+
+import pdfplumber
+import pytest
+
+from api.fields import DATA_SCANNER, FIELD_SPECS, NOT_FOUND, PAGE_SCANNER, FieldScanner, scan_fields
+from bench import synthetic
+
+# FieldScanner debe dar, campo por campo, lo mismo que re.search con el
+# patrón de cada spec: la primera coincidencia propia aunque se solape con
+# la de otro campo.
+
+HANDWRITTEN_TEXTS = [
+    # La primera "Arcilla (%)" queda dentro de la coincidencia de "Textura"
+    "Textura Arcilla (%) 12.5 Limo (%) 30.1 Arena (%) 57.4\nArcilla (%) 40.0",
+    "Nombre del productor JUAN PEREZ LOPEZ\nCoordenadas 19.4, -99.1",
+    "DATOS Y CONDICIONES DE LA MUESTRA\nCultivo a establecer MAIZ Meta de rendimiento 8.5 t/ha\n"
+    "Municipio TEXCOCO Localidad SAN MIGUEL\nCantidad 1\nRESULTADOS",
+    "densidad aparente (dap) 1,32 g/cm3\nconductividad hidráulica 2.10",
+    "Arcilla (%)\nLimo (%) Arena (%)",  # Etiquetas sin valores
+    "",
+]
+
+
+def _synthetic_texts():
+    with pdfplumber.open(io.BytesIO(synthetic.build_pdf(6, seed=11))) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+
+def _search_each(specs, text):
+    values = {}
+    for spec in specs:
+        m = re.search(spec.pattern, text, re.IGNORECASE)
+        value = m.group(1).strip() if m and m.group(1) else ""
+        values[spec.key] = value if value else NOT_FOUND
+    return values
+
+
+@pytest.mark.parametrize("text", HANDWRITTEN_TEXTS + _synthetic_texts())
+def test_scan_matches_search_per_spec(text):
+    assert FieldScanner(FIELD_SPECS).scan(text) == _search_each(FIELD_SPECS, text)
+    assert PAGE_SCANNER.scan(text) == _search_each(PAGE_SCANNER.specs, text)
+    assert DATA_SCANNER.scan(text) == _search_each(DATA_SCANNER.specs, text)
+
+
+def test_overlapping_fields_take_their_own_first_match():
+    found = PAGE_SCANNER.scan(HANDWRITTEN_TEXTS[0])
+    assert found["textura"] == "Arcilla"
+    assert found["arcilla"] == "12.5"
+
+
+def test_scan_fields_keeps_table_order():
+    found = scan_fields(HANDWRITTEN_TEXTS[2])
+    assert list(found) == [spec.key for spec in FIELD_SPECS]
+    assert found["cultivo_establecer"] == "MAIZ"
+    assert found["meta_rendimiento"] == "8.5"
+    assert found["municipio"] == "TEXCOCO"
+    assert found["nombre_productor"] == NOT_FOUND
@@ -0,0 +1,67 @@
+import io
+import threading
+
+import pytest
+
+from api import scaner
+from api.deadline import STOP_CANCELLED, STOP_DEADLINE
+from api.scaner import ExtractionStopped, NoRecordsError, extract_data_from_pdf, iter_records
+from bench import synthetic
+
+# iter_records entrega los registros en orden de página y, en lugar de
+# devolver un dict de error, lanza NoRecordsError si el PDF no tiene
+# reportes y ExtractionStopped (después de lo ya extraído) al vencer el
+# plazo o cancelarse.
+
+PAGES = 5
+
+
+def test_records_in_page_order():
+    data = synthetic.build_pdf(PAGES, seed=7, irrelevant=0)
+    stats = {}
+    pages = list(iter_records(io.BytesIO(data), mode="thread", stats=stats))
+
+    assert [page for page, _ in pages] == list(range(1, PAGES + 1))
+    assert [record for _, record in pages] == list(extract_data_from_pdf(data, mode="thread"))
+    assert stats["pages_analyzed"] == PAGES
+
+
+def test_pdf_without_reports_raises_no_records():
+    data = synthetic.build_pdf(3, seed=7, irrelevant=1.0)
+    with pytest.raises(NoRecordsError):
+        list(iter_records(data, mode="thread"))
+
+
+def test_deadline_raises_stopped():
+    data = synthetic.build_pdf(PAGES, seed=7, irrelevant=0)
+    stats = {}
+    with pytest.raises(ExtractionStopped) as excinfo:
+        list(iter_records(data, mode="thread", stats=stats, timeout=1e-6))
+    assert excinfo.value.reason == STOP_DEADLINE
+    assert stats["stopped"] == STOP_DEADLINE
+
+
+def test_cancel_raises_stopped_after_delivered_records(monkeypatch):
+    # Solo la primera página termina; las demás esperan hasta el final de la prueba
+    release = threading.Event()
+    extract_record = scaner._extract_page_record_optimized
+
+    def slow_after_first(layout):
+        if layout.page.page_number > 1:
+            release.wait(10)
+        return extract_record(layout)
+
+    monkeypatch.setattr(scaner, "_extract_page_record_optimized", slow_after_first)
+    data = synthetic.build_pdf(PAGES, seed=7, irrelevant=0)
+    cancel = threading.Event()
+    delivered = []
+    try:
+        with pytest.raises(ExtractionStopped) as excinfo:
+            for page, record in iter_records(data, mode="thread", cancel=cancel):
+                delivered.append(page)
+                cancel.set()
+    finally:
+        release.set()
+
+    assert excinfo.value.reason == STOP_CANCELLED
+    assert delivered == [1]
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from api import scaner
+from api.pagecache import PageCache
+from bench import synthetic
+
+# Caché de páginas: un reporte acumulativo (el mismo documento con páginas
+# nuevas al final) solo analiza las páginas agregadas, y las páginas que
+# fallaron no se guardan como "sin registro".
+
+PAGES = 4
+ADDED_PAGES = 2
+FAILING_PAGE = 3
+VERSION = "1.0.0-aaaaaaaaaaaa"
+
+
+def _enable_cache(monkeypatch, tmp_path) -> PageCache:
+    cache = PageCache(str(tmp_path / "enabled"), max_entries=1000, version=VERSION)
+    monkeypatch.setattr(scaner, "get_page_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def enabled_cache(monkeypatch, tmp_path) -> PageCache:
+    return _enable_cache(monkeypatch, tmp_path)
+
+
+def _extract(data: bytes):
+    stats = {}
+    records = scaner.extract_data_from_pdf(data, mode="thread", stats=stats)
+    return list(records), stats
+
+
+def test_appended_pdf_only_analyzes_new_pages(monkeypatch, tmp_path):
+    first = synthetic.build_pdf(PAGES, seed=5, irrelevant=0)
+    appended = synthetic.build_pdf(PAGES + ADDED_PAGES, seed=5, irrelevant=0)
+    expected, _ = _extract(appended)  # Sin caché
+
+    cache = _enable_cache(monkeypatch, tmp_path)
+    _, stats = _extract(first)
+    assert stats["pages_cached"] == 0
+    records, stats = _extract(appended)
+
+    assert stats["pages_cached"] == PAGES
+    assert stats["pages_analyzed"] + stats["pages_skipped"] == ADDED_PAGES
+    assert cache.hits == PAGES
+    assert records == expected
+
+
+def test_failed_pages_are_not_cached(enabled_cache, monkeypatch):
+    data = synthetic.build_pdf(PAGES, seed=5, irrelevant=0)
+    extract_record = scaner._extract_page_record_optimized
+
+    def failing(layout):
+        if layout.page.page_number == FAILING_PAGE:
+            raise MemoryError()
+        return extract_record(layout)
+
+    monkeypatch.setattr(scaner, "_extract_page_record_optimized", failing)
+    records, stats = _extract(data)
+    assert stats["failed_pages"] == [FAILING_PAGE]
+    assert len(records) == PAGES - 1
+
+    monkeypatch.setattr(scaner, "_extract_page_record_optimized", extract_record)
+    records, stats = _extract(data)
+    assert stats["pages_cached"] == PAGES - 1
+    assert stats["pages_analyzed"] == 1
+    assert stats["failed_pages"] == []
+    assert len(records) == PAGES
+
+
+def test_size_limit_evicts_oldest_entries(tmp_path):
+    cache = PageCache(str(tmp_path), max_entries=100000, version=VERSION, max_bytes=256 * 1024)
+    fingerprints = ["%064x" % idx for idx in range(2000)]
+    for start in range(0, len(fingerprints), 50):
+        cache.put_many((fingerprint, {"nombre_productor": os.urandom(500).hex()})
+                       for fingerprint in fingerprints[start:start + 50])
+
+    stats = cache.stats()
+    assert 0 < stats["entries"] < len(fingerprints)
+    assert stats["bytes"] <= cache.max_bytes
+    assert list(cache.get_many([fingerprints[0], fingerprints[-1]])) == [fingerprints[-1]]
@@ -0,0 +1,85 @@
+import pytest
+
+from api import records as records_module
+from api.fields import NOT_ANALYZED, NOT_FOUND
+from api.records import NOT_APPLICABLE, SOURCE_KEY, RecordStore
+
+# El almacén por columnas debe devolver exactamente los dicts recibidos:
+# números que se guardan como float, textos que parecen números pero no se
+# reproducen con repr(), marcadores, claves ausentes y claves extra.
+
+RECORDS = [
+    {"nombre_productor": "JUAN PEREZ", "arcilla": "12.5", "limo": "30", "densidad_aparente": "1,58 g/cm³",
+     "mo": NOT_FOUND, "ph_agua": "7.10", "hierro": "4.2", "unidad_hierro": "mg/kg", "interp_hierro": "Alto"},
+    {"nombre_productor": "ANA LOPEZ", "arcilla": NOT_FOUND, "limo": "-0.0", "densidad_aparente": "1.2",
+     "mo": NOT_ANALYZED, "ph_agua": "7.1", "rel_ca_mg": NOT_APPLICABLE, SOURCE_KEY: "lote/a.pdf"},
+    {"nombre_productor": "", "arcilla": "1e3", "limo": "nan", "mo": "2.5", "pagina": 3, "notas": ["x"]},
+    {},
+]
+
+
+@pytest.fixture
+def store() -> RecordStore:
+    return RecordStore(RECORDS)
+
+
+def test_iteration_returns_the_same_dicts(store):
+    assert list(store) == RECORDS
+    assert store.to_dicts() == RECORDS
+    assert len(store) == len(RECORDS)
+
+
+def test_indexing_returns_the_same_dicts(store):
+    assert [store[idx] for idx in range(len(RECORDS))] == RECORDS
+    assert store[-1] == RECORDS[-1]
+    with pytest.raises(IndexError):
+        store[len(RECORDS)]
+
+
+def test_numbers_are_stored_as_floats_only_when_exact(store):
+    column = store._columns["arcilla"]
+    assert column.numbers[0] == 12.5
+    assert store.column("arcilla") == ["12.5", NOT_FOUND, "1e3", None]
+    assert store.column("ph_agua") == ["7.10", "7.1", None, None]
+
+
+def test_extend_in_blocks(monkeypatch):
+    monkeypatch.setattr(records_module, "ITER_BLOCK_ROWS", 3)
+    store = RecordStore()
+    assert not store
+    for record in RECORDS * 2:
+        store.append(record)
+    store.extend(RECORDS)
+
+    assert store
+    assert list(store) == RECORDS * 3
+    assert store[len(RECORDS) + 2] == RECORDS[2]  # Claves extra de un registro agregado después
+
+
+def test_order_by_ignores_case():
+    store = RecordStore([{"nombre_productor": "beto"}, {"nombre_productor": "Ana"}, {}, {"nombre_productor": "CARLOS"}])
+    assert store.order_by("nombre_productor") == [2, 1, 0, 3]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12.5", (12.5, "")),
+    ("1,58 g/cm³", (1.58, "g/cm³")),
+    ("12.3 %", (12.3, "%")),
+    ("<0.5", (0.5, "")),
+    ("1.234,5 mg/kg", (1234.5, "mg/kg")),
+    ("1,234.5 mg/kg", (1234.5, "mg/kg")),
+    (",5 dS/m", (0.5, "dS/m")),
+    ("-3 meq/100g", (-3.0, "meq/100g")),
+    ("No encontrado", (None, "")),
+    ("", (None, "")),
+])
+def test_parse_number(text, expected):
+    assert records_module.parse_number(text) == expected
+
+
+def test_numbers_and_units_by_column(store):
+    numbers = list(store.numbers("densidad_aparente"))
+    assert numbers[:2] == [1.58, 1.2]
+    assert all(number != number for number in numbers[2:])  # NaN sin valor
+    assert list(store.numbers("ph_agua", rows=[1, 0])) == [7.1, 7.1]  # "7.10" se guarda como texto
+    assert store.units("densidad_aparente") == ["g/cm³", "", "", ""]
@@ -0,0 +1,52 @@
+import io
+
+import pdfplumber
+import pytest
+
+from api import regions
+from api.scaner import _process_page
+from bench import synthetic
+
+# Las regiones se aprenden en las primeras páginas de reporte; las páginas
+# posteriores traen en las columnas de la derecha valores más anchos que los
+# vistos al aprender y deben extraerse igual que con la página completa.
+
+LEARNING_PAGES = regions.REGION_PAGES + 1
+WIDE_VALUES = {
+    (515, 410): ("Alto", "Mod. bajo"),   # Interpretación de azufre (fertilidad)
+    (460, 636): ("Baja", "Adecuada"),    # Interpretación de K/Mg (relaciones)
+}
+
+
+@pytest.fixture
+def wide_values_pdf(monkeypatch) -> bytes:
+    report_page = synthetic.report_page
+
+    def page_with_wide_values(rng, number, noise=0.4, footer_lines=0):
+        items = []
+        for x, top, text in report_page(rng, number, 0, footer_lines):
+            narrow, wide = WIDE_VALUES.get((round(x), round(top)), (text, text))
+            items.append((x, top, wide if number >= LEARNING_PAGES else narrow))
+        return items
+
+    monkeypatch.setattr(synthetic, "report_page", page_with_wide_values)
+    return synthetic.build_pdf(LEARNING_PAGES + 4, seed=3, irrelevant=0)
+
+
+def _extract(data: bytes, enabled: bool, monkeypatch):
+    monkeypatch.setattr(regions, "REGIONS_ENABLED", enabled)
+    monkeypatch.setattr(regions, "CONFIGURED_REGIONS", None)
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        records = [_process_page(page, idx, None) for idx, page in enumerate(pdf.pages)]
+        return records, regions.regions_for(pdf)
+
+
+def test_wider_values_than_learning_pages_are_not_clipped(wide_values_pdf, monkeypatch):
+    full_page, _ = _extract(wide_values_pdf, False, monkeypatch)
+    from_regions, learned = _extract(wide_values_pdf, True, monkeypatch)
+
+    assert learned.hits > 0  # Las páginas posteriores sí pasaron por las regiones
+    for record in full_page[LEARNING_PAGES:]:
+        assert record["interp_azufre"] == "Mod. Bajo"
+        assert record["interp_rel_k_mg"] == "Adecuada"
+    assert from_regions == full_page